@@ -0,0 +1,51 @@
+"""
+Modo ASGI: as rotas de main.py servidas por um servidor ASGI, em um único
+processo e event loop.
+
+As rotas de src/routes.py são o mesmo app Flask, com os mesmos controllers
+e models síncronos, executado em um pool de threads (a2wsgi) fora do event
+loop; servidor_config['threads'] limita quantas rodam ao mesmo tempo. O
+feed SSE (src/rotas_async.py) é atendido no próprio event loop, então
+milhares de dashboards conectados não ocupam threads.
+
+Requer a2wsgi e um servidor ASGI, ex.:
+  uvicorn asgi:app --host 0.0.0.0 --port 5050
+  hypercorn asgi:app --bind 0.0.0.0:5050
+"""
+import asyncio
+
+from a2wsgi import WSGIMiddleware
+
+from main import app as app_wsgi
+from src.config import servidor_config
+from src.rotas_async import ROTAS_ASYNC
+from src.historico import encerrar_historico
+
+rotas_wsgi = WSGIMiddleware(app_wsgi, workers=servidor_config['threads'])
+
+
+async def _ciclo_de_vida(receber, enviar):
+    while True:
+        mensagem = await receber()
+        if mensagem["type"] == "lifespan.startup":
+            await enviar({"type": "lifespan.startup.complete"})
+        elif mensagem["type"] == "lifespan.shutdown":
+            # Grava o histórico de tarefas pendente sem parar o event loop
+            await asyncio.to_thread(encerrar_historico)
+            await enviar({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(escopo, receber, enviar):
+    if escopo["type"] == "lifespan":
+        return await _ciclo_de_vida(receber, enviar)
+    if escopo["type"] == "http":
+        handler = ROTAS_ASYNC.get((escopo["method"], escopo["path"]))
+        if handler is not None:
+            return await handler(escopo, receber, enviar)
+    return await rotas_wsgi(escopo, receber, enviar)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=5050)
@@ -0,0 +1,434 @@
+"""
+Teste de carga da API: vários clientes concorrentes exercitam todas as rotas
+de src/routes.py contra uma API já rodando (python main.py) e um banco
+populado com benchmarks.semear. Ao final mostra vazão e latência
+p50/p95/p99 por rota.
+
+Uso:
+  python -m benchmarks.carga [--url http://localhost:5050] [--clientes 16] [--duracao 30]
+                             [--streams 0] [--salvar resultado.json] [--comparar base.json]
+                             [--tolerancia 0.2]
+
+Com --comparar, rotas cujo p95 piorou (ou a vazão caiu) mais que a
+tolerância são listadas e o processo sai com código 1.
+
+--streams N mantém N conexões SSE abertas em /tarefas/eventos durante a
+rodada, como navegadores com o painel aberto. Para comparar os modos WSGI
+e ASGI com a mesma carga:
+  python main.py                                      (ou gunicorn)
+  python -m benchmarks.carga --streams 500 --salvar wsgi.json
+  uvicorn asgi:app --port 5050
+  python -m benchmarks.carga --streams 500 --comparar wsgi.json
+"""
+import argparse
+import http.client
+import json
+import math
+import random
+import selectors
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse, quote
+
+from benchmarks.semear import email_carga, SENHA_CARGA, PREFIXO_EMAIL, PREFIXO_SETOR, PREFIXO_TITULO, DOMINIO_EMAIL, STATUS, PALAVRAS
+
+
+class Cliente:
+    """Conexão HTTP keep-alive de um cliente virtual, com o token dele."""
+
+    def __init__(self, url: str, comprimir: bool):
+        alvo = urlparse(url)
+        self.host, self.porta = alvo.hostname, alvo.port or 80
+        self.conn = http.client.HTTPConnection(self.host, self.porta, timeout=30)
+        self.cabecalhos = {"Accept-Encoding": "gzip, br"} if comprimir else {}
+        self.token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.tarefas_criadas: List[int] = []
+
+    def requisitar(self, metodo: str, caminho: str, corpo: Any = None, ler_tudo: bool = True) -> Tuple[int, bytes]:
+        cabecalhos = dict(self.cabecalhos)
+        if self.token:
+            cabecalhos["Authorization"] = f"Bearer {self.token}"
+        dados = None
+        if corpo is not None:
+            dados = json.dumps(corpo).encode("utf-8")
+            cabecalhos["Content-Type"] = "application/json"
+        try:
+            self.conn.request(metodo, caminho, body=dados, headers=cabecalhos)
+            resposta = self.conn.getresponse()
+            conteudo = resposta.read() if ler_tudo else resposta.read(64)
+        except (http.client.HTTPException, OSError):
+            self.reconectar()
+            raise
+        if not ler_tudo:
+            # Stream sem fim (SSE): a conexão não pode ser reaproveitada
+            self.reconectar()
+        return resposta.status, conteudo
+
+    def json(self, metodo: str, caminho: str, corpo: Any = None):
+        # Requisições de preparação: sem compressão para poder ler o JSON
+        cabecalhos, self.cabecalhos = self.cabecalhos, {}
+        try:
+            status, conteudo = self.requisitar(metodo, caminho, corpo)
+        finally:
+            self.cabecalhos = cabecalhos
+        return status, json.loads(conteudo) if conteudo else None
+
+    def reconectar(self) -> None:
+        self.conn.close()
+        self.conn = http.client.HTTPConnection(self.host, self.porta, timeout=30)
+
+    def login(self, email: str) -> None:
+        status, dados = self.json("POST", "/usuarios/login", {"email": email, "senha": SENHA_CARGA})
+        if status != 200:
+            raise RuntimeError(f"Login de {email} falhou ({status}): {dados}. Rodou benchmarks.semear?")
+        self.token, self.refresh_token = dados["token"], dados.get("refresh_token")
+
+
+class Contexto:
+    """Dados compartilhados lidos da API antes da carga (ids de setores, usuários e tarefas)."""
+
+    def __init__(self, cliente: Cliente, clientes: int):
+        _, setores = cliente.json("GET", "/setores")
+        self.setores = [s for s in setores or [] if str(s.get("nome", "")).startswith(PREFIXO_SETOR)]
+        _, usuarios = cliente.json("GET", "/usuarios")
+        self.usuarios = [u for u in usuarios or [] if str(u.get("email", "")).endswith(DOMINIO_EMAIL)]
+        _, tarefas = cliente.json("GET", "/tarefas?limite=500")
+        self.tarefas = [t["id"] for t in tarefas or []]
+        if not self.setores or not self.tarefas or len(self.usuarios) < 2 * clientes:
+            raise RuntimeError(f"Dados de carga insuficientes para {clientes} clientes; rode benchmarks.semear "
+                               f"com --usuarios >= {2 * clientes}")
+        self.clientes = clientes
+
+
+def _filtros_aleatorios(ctx: Contexto) -> str:
+    opcoes = [
+        f"status={quote(random.choice(STATUS))}",
+        f"setor_id={random.choice(ctx.setores)['id']}",
+        f"funcionario_id={random.choice(ctx.usuarios)['id']}",
+        f"prioridade={random.randint(1, 4)}",
+    ]
+    return "&".join(random.sample(opcoes, random.randint(0, 2)))
+
+
+def _nova_tarefa(ctx: Contexto) -> Dict[str, Any]:
+    return {
+        "titulo": f"{PREFIXO_TITULO}criada {uuid.uuid4().hex[:8]}",
+        "descricao": "Tarefa criada pelo teste de carga",
+        "funcionario_id": random.choice(ctx.usuarios)["id"],
+        "setor_id": random.choice(ctx.setores)["id"],
+        "prazo": "2030-01-01",
+        "prioridade": random.randint(1, 4),
+        "status": "pendente",
+    }
+
+
+# Cada operação: (rota como em src/routes.py, peso, função que faz a requisição).
+# A função recebe (cliente, contexto, indice_do_cliente) e retorna o status.
+def _op_criar_tarefa_rastreada(c, ctx, i):
+    status, dados = c.json("POST", "/tarefas", _nova_tarefa(ctx))
+    if status == 201:
+        c.tarefas_criadas.append(dados["tarefa"]["id"])
+    return status
+
+
+def _op_deletar_tarefa(c, ctx, i):
+    if not c.tarefas_criadas:
+        return _op_criar_tarefa_rastreada(c, ctx, i)
+    return c.requisitar("DELETE", f"/tarefas/{c.tarefas_criadas.pop()}")[0]
+
+
+def _op_lote(c, ctx, i):
+    # Marcador: o lote é criado, atualizado e removido por _executar_lote,
+    # que mede cada etapa na sua própria rota
+    raise NotImplementedError
+
+
+def _op_renovar(c, ctx, i):
+    status, dados = c.json("POST", "/usuarios/token/renovar", {"refresh_token": c.refresh_token})
+    if status == 200:
+        c.token, c.refresh_token = dados["token"], dados["refresh_token"]
+    else:
+        c.login(email_carga(i))
+    return status
+
+
+def _op_eventos(c, ctx, i):
+    # Tempo até o primeiro bloco do stream (a linha retry:)
+    return c.requisitar("GET", "/tarefas/eventos", ler_tudo=False)[0]
+
+
+OPERACOES = [
+    ("GET /tarefas", 20, lambda c, ctx, i: c.requisitar("GET", f"/tarefas?limite=100&{_filtros_aleatorios(ctx)}")[0]),
+    ("GET /tarefas/<int:tarefa_id>", 15, lambda c, ctx, i: c.requisitar("GET", f"/tarefas/{random.choice(ctx.tarefas)}")[0]),
+    ("PUT /tarefas/<int:tarefa_id>", 6, lambda c, ctx, i: c.requisitar(
+        "PUT", f"/tarefas/{random.choice(ctx.tarefas)}", {"status": random.choice(STATUS)})[0]),
+    ("POST /tarefas", 5, _op_criar_tarefa_rastreada),
+    ("DELETE /tarefas/<int:tarefa_id>", 3, _op_deletar_tarefa),
+    ("GET /tarefas/<int:tarefa_id>/historico", 3, lambda c, ctx, i: c.requisitar(
+        "GET", f"/tarefas/{random.choice(ctx.tarefas)}/historico?limite=50")[0]),
+    ("GET /tarefas/busca", 6, lambda c, ctx, i: c.requisitar(
+        "GET", f"/tarefas/busca?q={quote(' '.join(random.sample(PALAVRAS, random.randint(1, 2))))}"
+               f"&limite=50&{_filtros_aleatorios(ctx)}")[0]),
+    ("GET /tarefas/stats", 5, lambda c, ctx, i: c.requisitar("GET", f"/tarefas/stats?{_filtros_aleatorios(ctx)}")[0]),
+    ("GET /painel", 8, lambda c, ctx, i: c.requisitar("GET", f"/painel?limite=50&{_filtros_aleatorios(ctx)}")[0]),
+    ("GET /tarefas?since", 4, lambda c, ctx, i: c.requisitar("GET", f"/tarefas?since={random.randint(0, 1000)}")[0]),
+    ("GET /tarefas/exportar", 1, lambda c, ctx, i: c.requisitar(
+        "GET", f"/tarefas/exportar?formato={random.choice(['ndjson', 'csv', 'json'])}"
+               f"&funcionario_id={random.choice(ctx.usuarios)['id']}")[0]),
+    ("POST /tarefas/lote", 1, _op_lote),
+    ("GET /tarefas/eventos", 1, _op_eventos),
+    ("GET /usuarios", 5, lambda c, ctx, i: c.requisitar("GET", "/usuarios")[0]),
+    ("GET /usuarios/email/<string:email>", 4, lambda c, ctx, i: c.requisitar(
+        "GET", f"/usuarios/email/{quote(random.choice(ctx.usuarios)['email'])}")[0]),
+    ("GET /setores", 5, lambda c, ctx, i: c.requisitar("GET", "/setores")[0]),
+    ("POST /setores", 1, lambda c, ctx, i: c.requisitar("POST", "/setores", {"nome": f"{PREFIXO_SETOR}nova {uuid.uuid4().hex[:8]}"})[0]),
+    ("POST /usuarios/login", 2, lambda c, ctx, i: c.requisitar(
+        "POST", "/usuarios/login", {"email": email_carga(i), "senha": SENHA_CARGA})[0]),
+    ("POST /usuarios/token/renovar", 2, _op_renovar),
+    ("POST /usuarios/cadastrar", 1, lambda c, ctx, i: c.requisitar("POST", "/usuarios/cadastrar", {
+        "nome": "Funcionário Carga novo", "email": f"{PREFIXO_EMAIL}-{uuid.uuid4().hex[:12]}{DOMINIO_EMAIL}",
+        "senha": SENHA_CARGA, "perfil": "funcionario", "ativo": True, "setor": random.choice(ctx.setores)["nome"]})[0]),
+    # Troca a senha pela mesma, num usuário que nenhum cliente usa para login
+    ("PUT /usuarios/atualizar_senha", 1, lambda c, ctx, i: c.requisitar("PUT", "/usuarios/atualizar_senha", {
+        "id": ctx.usuarios[ctx.clientes + i]["id"], "email": ctx.usuarios[ctx.clientes + i]["email"],
+        "senha_atual": SENHA_CARGA, "nova_senha": SENHA_CARGA})[0]),
+    ("GET /pool/estatisticas", 1, lambda c, ctx, i: c.requisitar("GET", "/pool/estatisticas")[0]),
+    ("GET /cache/estatisticas", 1, lambda c, ctx, i: c.requisitar("GET", "/cache/estatisticas")[0]),
+    ("GET /metrics", 1, lambda c, ctx, i: c.requisitar("GET", "/metrics")[0]),
+]
+
+TAMANHO_LOTE = 20
+
+
+class Streams:
+    """
+    Conexões SSE ociosas mantidas por uma única thread (selectors), para
+    abrir centenas sem uma thread por conexão. Só lê e descarta os eventos.
+    """
+
+    def __init__(self, url: str, token: Optional[str]):
+        alvo = urlparse(url)
+        self.endereco = (alvo.hostname, alvo.port or 80)
+        autorizacao = f"Authorization: Bearer {token}\r\n" if token else ""
+        self.pedido = (f"GET /tarefas/eventos HTTP/1.1\r\nHost: {alvo.hostname}\r\n{autorizacao}"
+                       "Accept: text/event-stream\r\n\r\n").encode()
+        self.seletor = selectors.DefaultSelector()
+        self.abertas = 0
+        self.recusadas = 0
+        self.encerradas = 0
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._drenar, daemon=True)
+
+    def abrir(self, quantidade: int) -> None:
+        for _ in range(quantidade):
+            try:
+                conexao = socket.create_connection(self.endereco, timeout=5)
+                conexao.sendall(self.pedido)
+                primeira = conexao.recv(64)
+            except OSError:
+                self.recusadas += 1
+                continue
+            # 503: limite de assinantes; sem resposta: servidor sem threads livres
+            if not primeira.startswith(b"HTTP/1.1 200") and not primeira.startswith(b"HTTP/1.0 200"):
+                self.recusadas += 1
+                conexao.close()
+                continue
+            conexao.setblocking(False)
+            self.seletor.register(conexao, selectors.EVENT_READ)
+            self.abertas += 1
+        self._thread.start()
+
+    def _drenar(self) -> None:
+        while not self._parar.is_set():
+            for chave, _ in self.seletor.select(timeout=0.5):
+                try:
+                    dados = chave.fileobj.recv(65536)
+                except OSError:
+                    dados = b""
+                if not dados:
+                    self.seletor.unregister(chave.fileobj)
+                    chave.fileobj.close()
+                    self.encerradas += 1
+
+    def fechar(self) -> None:
+        self._parar.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        for chave in list(self.seletor.get_map().values()):
+            chave.fileobj.close()
+        self.seletor.close()
+
+
+class Medicoes:
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.erros: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def registrar(self, rota: str, segundos: float, ok: bool) -> None:
+        with self._lock:
+            self.latencias[rota].append(segundos)
+            if not ok:
+                self.erros[rota] += 1
+
+
+def _medir(medicoes: Optional[Medicoes], rota: str, funcao, *args) -> Any:
+    inicio = time.perf_counter()
+    try:
+        status = funcao(*args)
+        ok = status is not None and status < 500
+    except Exception:
+        status, ok = None, False
+    if medicoes is not None:
+        medicoes.registrar(rota, time.perf_counter() - inicio, ok)
+    return status
+
+
+def _executar_lote(c: Cliente, ctx: Contexto, medicoes: Optional[Medicoes]) -> None:
+    itens = [_nova_tarefa(ctx) for _ in range(TAMANHO_LOTE)]
+    ids = []
+
+    def criar():
+        status, dados = c.json("POST", "/tarefas/lote", itens)
+        if status in (200, 207) and dados:
+            ids.extend(r["id"] for r in dados.get("resultados", []) if r.get("id") is not None)
+        return status
+
+    _medir(medicoes, "POST /tarefas/lote", criar)
+    if ids:
+        _medir(medicoes, "PUT /tarefas/lote", lambda: c.requisitar(
+            "PUT", "/tarefas/lote", [{"id": tarefa_id, "status": "concluída"} for tarefa_id in ids])[0])
+        _medir(medicoes, "DELETE /tarefas/lote", lambda: c.requisitar("DELETE", "/tarefas/lote", ids)[0])
+
+
+def _trabalhador(indice: int, url: str, comprimir: bool, ctx: Contexto, medicoes: Medicoes,
+                 inicio_medicao: float, fim: float, semente: int) -> None:
+    random.seed(semente + indice)
+    c = Cliente(url, comprimir)
+    c.login(email_carga(indice))
+    pesos = [op[1] for op in OPERACOES]
+    while time.perf_counter() < fim:
+        rota, _, funcao = random.choices(OPERACOES, pesos)[0]
+        # Durante o aquecimento as requisições rodam mas não são medidas
+        alvo = medicoes if time.perf_counter() >= inicio_medicao else None
+        if funcao is _op_lote:
+            _executar_lote(c, ctx, alvo)
+        else:
+            _medir(alvo, rota, funcao, c, ctx, indice)
+    # Remove as tarefas que sobraram para não crescer a base a cada rodada
+    for tarefa_id in c.tarefas_criadas:
+        try:
+            c.requisitar("DELETE", f"/tarefas/{tarefa_id}")
+        except Exception:
+            pass
+
+
+def _percentil(ordenadas: List[float], p: float) -> float:
+    # Nearest-rank: menor valor com pelo menos p% das amostras abaixo ou iguais
+    indice = max(0, min(len(ordenadas) - 1, math.ceil(p / 100 * len(ordenadas)) - 1))
+    return ordenadas[indice]
+
+
+def resumir(medicoes: Medicoes, duracao: float) -> Dict[str, Dict[str, float]]:
+    resumo = {}
+    for rota, latencias in sorted(medicoes.latencias.items()):
+        ordenadas = sorted(latencias)
+        resumo[rota] = {
+            "requisicoes": len(ordenadas),
+            "erros": medicoes.erros.get(rota, 0),
+            "rps": round(len(ordenadas) / duracao, 2),
+            "p50_ms": round(_percentil(ordenadas, 50) * 1000, 2),
+            "p95_ms": round(_percentil(ordenadas, 95) * 1000, 2),
+            "p99_ms": round(_percentil(ordenadas, 99) * 1000, 2),
+            "max_ms": round(ordenadas[-1] * 1000, 2),
+        }
+    return resumo
+
+
+def imprimir(resumo: Dict[str, Dict[str, float]], duracao: float) -> None:
+    total = sum(r["requisicoes"] for r in resumo.values())
+    print(f"\n{'rota':<38} {'req':>7} {'erros':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for rota, r in resumo.items():
+        print(f"{rota:<38} {r['requisicoes']:>7} {r['erros']:>6} {r['rps']:>8} "
+              f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['max_ms']:>9}")
+    print(f"\nTotal: {total} requisições em {duracao:.0f}s ({total / duracao:.1f} req/s)")
+
+
+def comparar(resumo: Dict[str, Dict[str, float]], base: Dict[str, Dict[str, float]], tolerancia: float) -> List[str]:
+    regressoes = []
+    for rota, atual in resumo.items():
+        anterior = base.get(rota)
+        if not anterior:
+            continue
+        if anterior["p95_ms"] and atual["p95_ms"] > anterior["p95_ms"] * (1 + tolerancia):
+            regressoes.append(f"{rota}: p95 {anterior['p95_ms']} -> {atual['p95_ms']} ms")
+        if anterior["rps"] and atual["rps"] < anterior["rps"] * (1 - tolerancia):
+            regressoes.append(f"{rota}: vazão {anterior['rps']} -> {atual['rps']} req/s")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da API MyAttire")
+    parser.add_argument("--url", default="http://localhost:5050")
+    parser.add_argument("--clientes", type=int, default=16)
+    parser.add_argument("--duracao", type=float, default=30, help="segundos medidos")
+    parser.add_argument("--aquecimento", type=float, default=5, help="segundos antes de medir")
+    parser.add_argument("--sem-compressao", action="store_true", help="não envia Accept-Encoding")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--salvar", help="grava o resumo em JSON")
+    parser.add_argument("--comparar", help="resumo JSON de uma rodada anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    parser.add_argument("--streams", type=int, default=0, help="conexões SSE mantidas abertas durante a rodada")
+    args = parser.parse_args()
+
+    preparacao = Cliente(args.url, comprimir=False)
+    preparacao.login(email_carga(0))
+    ctx = Contexto(preparacao, args.clientes)
+    medicoes = Medicoes()
+
+    streams = None
+    if args.streams:
+        streams = Streams(args.url, preparacao.token)
+        streams.abrir(args.streams)
+        print(f"{streams.abertas} streams SSE abertos ({streams.recusadas} recusados)")
+
+    agora = time.perf_counter()
+    inicio_medicao = agora + args.aquecimento
+    fim = inicio_medicao + args.duracao
+    threads = [
+        threading.Thread(target=_trabalhador, daemon=True, args=(
+            i, args.url, not args.sem_compressao, ctx, medicoes, inicio_medicao, fim, args.semente))
+        for i in range(args.clientes)
+    ]
+    print(f"{args.clientes} clientes, {args.aquecimento:.0f}s de aquecimento + {args.duracao:.0f}s medidos em {args.url}")
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    resumo = resumir(medicoes, args.duracao)
+    imprimir(resumo, args.duracao)
+    if streams is not None:
+        print(f"Streams SSE: {streams.abertas} abertos, {streams.encerradas} encerrados pelo servidor")
+        streams.fechar()
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as arquivo:
+            json.dump(resumo, arquivo, indent=2, ensure_ascii=False)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            regressoes = comparar(resumo, json.load(arquivo), args.tolerancia)
+        for regressao in regressoes:
+            print(f"REGRESSÃO {regressao}")
+        if regressoes:
+            sys.exit(1)
+        print(f"Sem regressões acima de {args.tolerancia:.0%} em relação a {args.comparar}")
+
+
+if __name__ == '__main__':
+    main()
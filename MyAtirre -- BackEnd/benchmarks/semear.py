@@ -0,0 +1,137 @@
+"""
+Popula o banco configurado em src/config.py (MySQL ou SQLite, conforme
+armazenamento_config) com dados sintéticos para os testes de carga. Aplica as migrações pendentes antes. Todos os registros
+criados (aqui e pelo benchmarks.carga) levam o prefixo de carga, então
+`--limpar` remove só eles.
+
+Uso: python -m benchmarks.semear [--setores 20] [--usuarios 200] [--tarefas 100000] [--limpar]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import bcrypt
+
+from src.config import senha_config
+from src.migracoes import migrar
+from src.pool import nova_conexao
+
+# Identificação dos dados de carga e credenciais usadas pelo benchmarks.carga
+PREFIXO_EMAIL = "carga"
+DOMINIO_EMAIL = "@carga.myattire.com"
+PREFIXO_SETOR = "Carga "
+PREFIXO_TITULO = "[carga] "
+SENHA_CARGA = "carga123"
+
+STATUS = ["pendente", "em progresso", "concluída", "cancelada"]
+# Vocabulário dos títulos e descrições, para a busca textual ter o que ranquear
+PALAVRAS = ["relatório", "inventário", "estoque", "cliente", "fornecedor", "pedido", "entrega", "vitrine",
+            "coleção", "costura", "tecido", "etiqueta", "provador", "uniforme", "caixa", "auditoria",
+            "treinamento", "campanha", "devolução", "conserto", "orçamento", "reunião", "limpeza", "catálogo"]
+BLOCO = 1000
+
+
+def email_carga(indice: int) -> str:
+    return f"{PREFIXO_EMAIL}{indice}{DOMINIO_EMAIL}"
+
+
+def _inserir(cursor, query: str, linhas) -> None:
+    # executemany do pymysql junta as linhas em INSERTs de várias linhas
+    for inicio in range(0, len(linhas), BLOCO):
+        cursor.executemany(query, linhas[inicio:inicio + BLOCO])
+
+
+def _avancar_versoes(cursor) -> None:
+    # Muda o ETag das listagens de usuários e setores em todos os workers da API
+    cursor.execute("UPDATE versoes_tabelas SET versao = versao + 1")
+
+
+def limpar(conn) -> None:
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM tarefas WHERE titulo LIKE %s", (PREFIXO_TITULO + "%",))
+        cursor.execute("DELETE FROM tarefas_excluidas WHERE tarefa_id NOT IN (SELECT id FROM tarefas)")
+        cursor.execute("DELETE FROM usuarios WHERE email LIKE %s", ("%" + DOMINIO_EMAIL,))
+        cursor.execute(
+            "DELETE FROM setores WHERE nome LIKE %s AND id NOT IN (SELECT setor_id FROM tarefas WHERE setor_id IS NOT NULL)",
+            (PREFIXO_SETOR + "%",)
+        )
+        # As exclusões não passam pelos models: avança as versões à mão
+        cursor.execute("UPDATE tarefas_sequencia SET valor = valor + 1")
+        _avancar_versoes(cursor)
+    conn.commit()
+
+
+def semear(conn, qtd_setores: int, qtd_usuarios: int, qtd_tarefas: int, semente: int = 42) -> None:
+    aleatorio = random.Random(semente)
+    agora = datetime.now().replace(microsecond=0)
+    # Um único hash para todos: o custo do bcrypt fica no login, não na carga dos dados
+    senha_hash = bcrypt.hashpw(SENHA_CARGA.encode("utf-8"),
+                               bcrypt.gensalt(rounds=senha_config['custo_bcrypt'])).decode("utf-8")
+
+    with conn.cursor() as cursor:
+        _inserir(cursor, "INSERT INTO setores (nome) VALUES (%s)",
+                 [(f"{PREFIXO_SETOR}{i}",) for i in range(qtd_setores)])
+        cursor.execute("SELECT id, nome FROM setores WHERE nome LIKE %s", (PREFIXO_SETOR + "%",))
+        setores = list(cursor.fetchall())
+
+        _inserir(cursor, "INSERT INTO usuarios (nome, email, senha_hash, perfil, ativo, setor) VALUES (%s, %s, %s, %s, 1, %s)", [
+            (f"Funcionário Carga {i}", email_carga(i), senha_hash, "admin" if i == 0 else "funcionario",
+             aleatorio.choice(setores)[1])
+            for i in range(qtd_usuarios)
+        ])
+        cursor.execute("SELECT id, nome FROM usuarios WHERE email LIKE %s", ("%" + DOMINIO_EMAIL,))
+        usuarios = list(cursor.fetchall())
+        _avancar_versoes(cursor)
+
+        # Reserva as versões de uma vez, como as operações em lote dos models
+        cursor.execute("UPDATE tarefas_sequencia SET valor = LAST_INSERT_ID(valor + %s)", (qtd_tarefas,))
+        versao = cursor.lastrowid - qtd_tarefas + 1
+
+        tarefas = []
+        for i in range(qtd_tarefas):
+            funcionario_id, funcionario = aleatorio.choice(usuarios)
+            setor_id, setor = aleatorio.choice(setores)
+            criada = agora - timedelta(minutes=aleatorio.randint(0, 60 * 24 * 365))
+            tarefas.append((
+                f"{PREFIXO_TITULO}Tarefa {i} " + " ".join(aleatorio.sample(PALAVRAS, 2)),
+                "Descrição gerada para teste de carga: " + " ".join(aleatorio.choices(PALAVRAS, k=aleatorio.randint(3, 12))),
+                funcionario, funcionario_id, setor, setor_id, criada,
+                (criada + timedelta(days=aleatorio.randint(-10, 60))).date(),
+                aleatorio.randint(1, 4), aleatorio.choice(STATUS), versao + i,
+            ))
+        _inserir(cursor, """
+            INSERT INTO tarefas (titulo, descricao, funcionario, funcionario_id, setor, setor_id,
+                                 data_criacao, prazo, prioridade, status, versao)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, tarefas)
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Popula o banco com dados de carga")
+    parser.add_argument("--setores", type=int, default=20)
+    parser.add_argument("--usuarios", type=int, default=200)
+    parser.add_argument("--tarefas", type=int, default=100000)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--limpar", action="store_true", help="só remove os dados de carga")
+    args = parser.parse_args()
+
+    migrar()
+    conn = nova_conexao()
+    try:
+        inicio = time.perf_counter()
+        limpar(conn)
+        if not args.limpar:
+            semear(conn, args.setores, args.usuarios, args.tarefas, args.semente)
+            print(f"{args.setores} setores, {args.usuarios} usuários e {args.tarefas} tarefas "
+                  f"em {time.perf_counter() - inicio:.1f}s (senha: {SENHA_CARGA})")
+        else:
+            print("Dados de carga removidos")
+    finally:
+        conn.close()
+    print("Reinicie a API (ou aguarde o TTL do cache) para descartar as listagens em cache")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Compara o encoder JSON padrão do Flask com o ProvedorJSONRapido e mede os
+bytes enviados com e sem compressão, para páginas grandes de /tarefas.
+
+Uso: python -m benchmarks.serializacao [linhas] [repeticoes]
+"""
+import gzip
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks.semear import STATUS
+from src.compressao import brotli
+from src.config import compressao_config
+from src.serializacao import ProvedorJSONRapido, orjson
+
+
+
+def gerar_tarefas(linhas: int):
+    # Linhas no formato de SELECT_TAREFA
+    aleatorio = random.Random(42)
+    inicio = datetime(2025, 1, 1, 8, 0, 0)
+    return [{
+        "id": i,
+        "titulo": f"Tarefa {i}",
+        "descricao": "Conferir o estoque do setor e registrar as divergências encontradas " * aleatorio.randint(1, 3),
+        "funcionario_id": aleatorio.randint(1, 50),
+        "funcionario": f"Funcionário {aleatorio.randint(1, 50)}",
+        "setor_id": aleatorio.randint(1, 8),
+        "setor": f"Setor {aleatorio.randint(1, 8)}",
+        "data_criacao": inicio + timedelta(minutes=i),
+        "prazo": (inicio + timedelta(days=aleatorio.randint(1, 60))).date(),
+        "prioridade": aleatorio.randint(1, 3),
+        "status": aleatorio.choice(STATUS),
+    } for i in range(linhas, 0, -1)]
+
+
+def medir(app: Flask, tarefas, repeticoes: int):
+    with app.app_context():
+        app.json.response(tarefas)  # aquecimento
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            corpo = app.json.response(tarefas).get_data()
+        return (time.perf_counter() - inicio) / repeticoes, corpo
+
+
+def main():
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    tarefas = gerar_tarefas(linhas)
+
+    padrao = Flask("padrao")
+    padrao.json = DefaultJSONProvider(padrao)
+    rapido = Flask("rapido")
+    rapido.json = ProvedorJSONRapido(rapido)
+    rapido.json.formato_datas = 'http'
+    iso = Flask("iso")
+    iso.json = ProvedorJSONRapido(iso)
+    iso.json.formato_datas = 'iso'
+
+    print(f"{linhas} tarefas, média de {repeticoes} repetições")
+    if orjson is None:
+        print("orjson não instalado: o provider rápido usa o encoder padrão")
+    resultados = {}
+    for nome, app in [("padrão (json)", padrao), ("orjson, datas http", rapido), ("orjson, datas iso", iso)]:
+        segundos, corpo = medir(app, tarefas, repeticoes)
+        resultados[nome] = segundos
+        print(f"  {nome:<20} {segundos * 1000:8.2f} ms  {len(corpo):>10} bytes")
+    base = resultados["padrão (json)"]
+    for nome, segundos in list(resultados.items())[1:]:
+        print(f"  ganho {nome}: {base / segundos:.1f}x")
+
+    print("Bytes na rede (último corpo medido):")
+    inicio = time.perf_counter()
+    comprimido = gzip.compress(corpo, compresslevel=compressao_config['nivel_gzip'])
+    print(f"  gzip {compressao_config['nivel_gzip']:<2}  {len(comprimido):>10} bytes  "
+          f"{(time.perf_counter() - inicio) * 1000:6.2f} ms")
+    if brotli is not None:
+        inicio = time.perf_counter()
+        comprimido = brotli.compress(corpo, quality=compressao_config['qualidade_brotli'])
+        print(f"  br {compressao_config['qualidade_brotli']:<4}  {len(comprimido):>10} bytes  "
+              f"{(time.perf_counter() - inicio) * 1000:6.2f} ms")
+    else:
+        print("  br: pacote brotli não instalado")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,18 @@
 from flask import Flask
 from flask_cors import CORS
 from src.routes import rotas
+from src.serializacao import ProvedorJSONRapido
+from src.compressao import ativar_compressao
+from src.metricas import ativar_metricas
 
 app = Flask(__name__)
-CORS(app)  # Permite requisições de qualquer origem (http, https, etc.)
+app.json = ProvedorJSONRapido(app)  # orjson, com o mesmo formato de datas do jsonify padrão
+ativar_metricas(app)  # latência por rota em /metrics (registrado antes para incluir a compressão)
+CORS(app, expose_headers=['X-Proximo-Cursor', 'ETag'])  # Permite requisições de qualquer origem (http, https, etc.)
 
 app.register_blueprint(rotas)
+ativar_compressao(app)  # gzip/brotli negociado pelo Accept-Encoding
 
 if __name__ == '__main__':
+    # Servidor de desenvolvimento; em produção use servir.py (gunicorn com workers pré-forkados)
     app.run(debug=True, host='0.0.0.0', port=5050)
\ No newline at end of file
@@ -0,0 +1,36 @@
+-- Esquema inicial (o mesmo do dump em "MyAtirre -- Banco de Dados/gestao_tarefas.sql").
+-- IF NOT EXISTS permite marcar como aplicada uma base restaurada do dump.
+
+CREATE TABLE IF NOT EXISTS `setores` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `nome` varchar(100) COLLATE utf8mb4_general_ci NOT NULL,
+  `data_criacao` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+CREATE TABLE IF NOT EXISTS `tarefas` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `titulo` varchar(255) COLLATE utf8mb4_general_ci NOT NULL,
+  `descricao` text COLLATE utf8mb4_general_ci NOT NULL,
+  `funcionario` varchar(100) COLLATE utf8mb4_general_ci NOT NULL,
+  `setor` varchar(100) COLLATE utf8mb4_general_ci NOT NULL,
+  `data_criacao` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `prazo` date NOT NULL,
+  `prioridade` int NOT NULL,
+  `status` enum('pendente','em progresso','concluída','cancelada') COLLATE utf8mb4_general_ci NOT NULL,
+  PRIMARY KEY (`id`),
+  CONSTRAINT `tarefas_chk_1` CHECK ((`prioridade` between 1 and 4))
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+CREATE TABLE IF NOT EXISTS `usuarios` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `nome` varchar(100) COLLATE utf8mb4_general_ci NOT NULL,
+  `email` varchar(100) COLLATE utf8mb4_general_ci NOT NULL,
+  `senha_hash` varchar(255) COLLATE utf8mb4_general_ci NOT NULL,
+  `perfil` varchar(50) COLLATE utf8mb4_general_ci NOT NULL,
+  `ativo` tinyint(1) DEFAULT '1',
+  `criado_em` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `setor` varchar(100) COLLATE utf8mb4_general_ci DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `email` (`email`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,27 @@
+-- Sincronização incremental de tarefas (GET /tarefas?since=<versao>)
+--
+-- Cada escrita em tarefas recebe a próxima versão de uma sequência global.
+-- A linha de tarefas_sequencia fica travada até o commit, então as versões
+-- são confirmadas em ordem e o cliente nunca perde uma alteração.
+
+ALTER TABLE `tarefas`
+  ADD COLUMN `versao` bigint unsigned NOT NULL DEFAULT '0',
+  ADD COLUMN `atualizado_em` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  ADD KEY `idx_tarefas_versao` (`versao`);
+
+CREATE TABLE `tarefas_sequencia` (
+  `valor` bigint unsigned NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Tarefas já existentes recebem versões a partir do próprio id
+UPDATE `tarefas` SET `versao` = `id`;
+INSERT INTO `tarefas_sequencia` (`valor`) SELECT COALESCE(MAX(`id`), 0) FROM `tarefas`;
+
+-- Registro das exclusões (tombstones) para os clientes removerem a tarefa localmente
+CREATE TABLE `tarefas_excluidas` (
+  `tarefa_id` int NOT NULL,
+  `versao` bigint unsigned NOT NULL,
+  `excluida_em` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`tarefa_id`),
+  KEY `idx_tarefas_excluidas_versao` (`versao`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,18 @@
+-- Tokens de renovação (refresh tokens) emitidos no login
+--
+-- Só o SHA-256 do token fica gravado. Cada uso troca o token por um novo
+-- (substituido_por); apresentar um token já trocado revoga todos os do usuário.
+
+CREATE TABLE `tokens_renovacao` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `usuario_id` int NOT NULL,
+  `token_hash` char(64) COLLATE utf8mb4_general_ci NOT NULL,
+  `criado_em` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `expira_em` datetime NOT NULL,
+  `revogado_em` datetime DEFAULT NULL,
+  `substituido_por` int DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uk_tokens_renovacao_hash` (`token_hash`),
+  KEY `idx_tokens_renovacao_usuario` (`usuario_id`, `revogado_em`),
+  CONSTRAINT `fk_tokens_renovacao_usuario` FOREIGN KEY (`usuario_id`) REFERENCES `usuarios` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,10 @@
+-- Índices para as consultas mais frequentes de src/models.py.
+-- O login busca usuarios por email (UNIQUE KEY `email`, criada em 0001).
+-- Os dashboards filtram tarefas por status e ordenam por id; com o id no fim do
+-- índice o ORDER BY id DESC LIMIT não precisa de filesort. Os filtros por
+-- funcionário e setor usam os índices sobre funcionario_id e setor_id, criados
+-- em 0005 junto com as colunas.
+
+ALTER TABLE `tarefas`
+  ADD KEY `idx_tarefas_status` (`status`, `id`),
+  ADD KEY `idx_tarefas_prazo` (`prazo`);
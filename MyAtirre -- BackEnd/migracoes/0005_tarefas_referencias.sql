@@ -0,0 +1,40 @@
+-- Tarefas passam a apontar para usuarios.id e setores.id em vez de guardar os nomes.
+--
+-- Setores citados em tarefas mas ausentes da tabela setores são criados.
+-- Funcionários são casados pelo nome (sem espaços nas pontas); nomes que não
+-- correspondem a nenhum usuário ficam com funcionario_id NULL. Confira antes com:
+--   SELECT DISTINCT funcionario FROM tarefas t
+--   WHERE NOT EXISTS (SELECT 1 FROM usuarios u WHERE TRIM(u.nome) = TRIM(t.funcionario));
+--
+-- As colunas de texto antigas ficam (anuláveis e sem índice) até uma próxima
+-- migração removê-las; a aplicação não escreve mais nelas.
+--
+-- Índices: (funcionario_id, status, id) e (setor_id, status, id), no mesmo
+-- formato de idx_tarefas_status (0004).
+
+ALTER TABLE `tarefas`
+  ADD COLUMN `funcionario_id` int DEFAULT NULL AFTER `funcionario`,
+  ADD COLUMN `setor_id` int DEFAULT NULL AFTER `setor`;
+
+INSERT INTO `setores` (`nome`)
+SELECT DISTINCT t.`setor`
+FROM `tarefas` t
+LEFT JOIN `setores` s ON s.`nome` = t.`setor`
+WHERE s.`id` IS NULL;
+
+UPDATE `tarefas` t
+JOIN (SELECT `nome`, MIN(`id`) AS `id` FROM `setores` GROUP BY `nome`) s ON s.`nome` = t.`setor`
+SET t.`setor_id` = s.`id`;
+
+UPDATE `tarefas` t
+JOIN (SELECT TRIM(`nome`) AS `nome`, MIN(`id`) AS `id` FROM `usuarios` GROUP BY TRIM(`nome`)) u
+  ON u.`nome` = TRIM(t.`funcionario`)
+SET t.`funcionario_id` = u.`id`;
+
+ALTER TABLE `tarefas`
+  MODIFY `funcionario` varchar(100) COLLATE utf8mb4_general_ci DEFAULT NULL,
+  MODIFY `setor` varchar(100) COLLATE utf8mb4_general_ci DEFAULT NULL,
+  ADD KEY `idx_tarefas_funcionario_id_status` (`funcionario_id`, `status`, `id`),
+  ADD KEY `idx_tarefas_setor_id_status` (`setor_id`, `status`, `id`),
+  ADD CONSTRAINT `fk_tarefas_funcionario` FOREIGN KEY (`funcionario_id`) REFERENCES `usuarios` (`id`) ON DELETE SET NULL,
+  ADD CONSTRAINT `fk_tarefas_setor` FOREIGN KEY (`setor_id`) REFERENCES `setores` (`id`);
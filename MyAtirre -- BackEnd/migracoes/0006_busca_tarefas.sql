@@ -0,0 +1,8 @@
+-- Busca textual em título e descrição (GET /tarefas/busca)
+--
+-- O índice FULLTEXT é mantido pelo InnoDB a cada INSERT/UPDATE/DELETE, inclusive
+-- nas operações em lote. Termos com menos de innodb_ft_min_token_size letras
+-- (padrão 3) e as stopwords do InnoDB não entram no índice.
+
+ALTER TABLE `tarefas`
+  ADD FULLTEXT KEY `ft_tarefas_titulo_descricao` (`titulo`, `descricao`);
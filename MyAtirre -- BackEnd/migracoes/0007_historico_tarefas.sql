@@ -0,0 +1,17 @@
+-- Histórico de alterações de status e responsável das tarefas (GET /tarefas/<id>/historico)
+--
+-- As linhas são gravadas em lote, em segundo plano (src/historico.py); alterado_em
+-- é o momento da alteração, não o da gravação. Sem chave estrangeira para tarefas:
+-- o histórico continua disponível depois da exclusão da tarefa.
+
+CREATE TABLE `tarefas_historico` (
+  `id` bigint unsigned NOT NULL AUTO_INCREMENT,
+  `tarefa_id` int NOT NULL,
+  `acao` enum('atualizada','excluida') COLLATE utf8mb4_general_ci NOT NULL,
+  `status` varchar(20) COLLATE utf8mb4_general_ci DEFAULT NULL,
+  `funcionario_id` int DEFAULT NULL,
+  `usuario_id` int DEFAULT NULL,
+  `alterado_em` datetime NOT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_tarefas_historico_tarefa` (`tarefa_id`, `id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
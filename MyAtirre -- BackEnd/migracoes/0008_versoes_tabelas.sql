@@ -0,0 +1,12 @@
+-- Versões das tabelas usadas nos ETags das listagens (GET /usuarios, /setores, /painel)
+--
+-- Avançadas na mesma transação de cada escrita, valem para todos os workers e
+-- processos da API. As tarefas usam a própria tarefas_sequencia (migração 0002).
+
+CREATE TABLE `versoes_tabelas` (
+  `tabela` varchar(32) COLLATE utf8mb4_general_ci NOT NULL,
+  `versao` bigint unsigned NOT NULL DEFAULT '0',
+  PRIMARY KEY (`tabela`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+INSERT INTO `versoes_tabelas` (`tabela`, `versao`) VALUES ('usuarios', 0), ('setores', 0);
@@ -0,0 +1,8 @@
+-- Revogação dos tokens de acesso (JWT) de um usuário
+--
+-- Tokens com `iat` anterior a usuarios.tokens_revogados_em (instante epoch, em
+-- segundos) são recusados por src/autenticacao.py. Preenchido ao trocar a
+-- senha, junto com a revogação dos tokens de renovação.
+
+ALTER TABLE `usuarios`
+  ADD COLUMN `tokens_revogados_em` double DEFAULT NULL;
@@ -0,0 +1,76 @@
+-- Esquema completo para o backend SQLite (armazenamento_config['backend'] = 'sqlite')
+--
+-- Equivale às migrações 0001-0005 do MySQL. Os tipos timestamp/datetime/date
+-- fazem o sqlite3 devolver datetime/date, como o pymysql. Mudanças futuras
+-- entram como novos scripts nesta pasta, em paralelo aos da pasta do MySQL.
+
+CREATE TABLE IF NOT EXISTS setores (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  nome varchar(100) NOT NULL,
+  data_criacao timestamp NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS usuarios (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  nome varchar(100) NOT NULL,
+  email varchar(100) NOT NULL UNIQUE,
+  senha_hash varchar(255) NOT NULL,
+  perfil varchar(50) NOT NULL,
+  ativo integer DEFAULT 1,
+  criado_em timestamp NOT NULL DEFAULT (datetime('now', 'localtime')),
+  setor varchar(100) DEFAULT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tarefas (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  titulo varchar(255) NOT NULL,
+  descricao text NOT NULL,
+  funcionario varchar(100) DEFAULT NULL,
+  funcionario_id integer DEFAULT NULL REFERENCES usuarios (id) ON DELETE SET NULL,
+  setor varchar(100) DEFAULT NULL,
+  setor_id integer DEFAULT NULL REFERENCES setores (id),
+  data_criacao timestamp NOT NULL DEFAULT (datetime('now', 'localtime')),
+  prazo date NOT NULL,
+  prioridade integer NOT NULL CHECK (prioridade BETWEEN 1 AND 4),
+  status varchar(20) NOT NULL CHECK (status IN ('pendente', 'em progresso', 'concluída', 'cancelada')),
+  versao integer NOT NULL DEFAULT 0,
+  atualizado_em timestamp NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+-- ON UPDATE CURRENT_TIMESTAMP do MySQL
+CREATE TRIGGER IF NOT EXISTS tarefas_atualizado_em
+AFTER UPDATE ON tarefas
+FOR EACH ROW WHEN NEW.atualizado_em = OLD.atualizado_em
+BEGIN UPDATE tarefas SET atualizado_em = datetime('now', 'localtime') WHERE id = NEW.id; END;
+
+CREATE INDEX IF NOT EXISTS idx_tarefas_versao ON tarefas (versao);
+CREATE INDEX IF NOT EXISTS idx_tarefas_funcionario_id_status ON tarefas (funcionario_id, status, id);
+CREATE INDEX IF NOT EXISTS idx_tarefas_setor_id_status ON tarefas (setor_id, status, id);
+CREATE INDEX IF NOT EXISTS idx_tarefas_status ON tarefas (status, id);
+CREATE INDEX IF NOT EXISTS idx_tarefas_prazo ON tarefas (prazo);
+
+CREATE TABLE IF NOT EXISTS tarefas_sequencia (
+  valor integer NOT NULL
+);
+
+INSERT INTO tarefas_sequencia (valor) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM tarefas_sequencia);
+
+CREATE TABLE IF NOT EXISTS tarefas_excluidas (
+  tarefa_id integer NOT NULL PRIMARY KEY,
+  versao integer NOT NULL,
+  excluida_em timestamp NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_tarefas_excluidas_versao ON tarefas_excluidas (versao);
+
+CREATE TABLE IF NOT EXISTS tokens_renovacao (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  usuario_id integer NOT NULL REFERENCES usuarios (id) ON DELETE CASCADE,
+  token_hash char(64) NOT NULL UNIQUE,
+  criado_em timestamp NOT NULL DEFAULT (datetime('now', 'localtime')),
+  expira_em datetime NOT NULL,
+  revogado_em datetime DEFAULT NULL,
+  substituido_por integer DEFAULT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_tokens_renovacao_usuario ON tokens_renovacao (usuario_id, revogado_em);
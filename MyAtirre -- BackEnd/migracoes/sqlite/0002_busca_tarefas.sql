@@ -0,0 +1,17 @@
+-- Busca textual em título e descrição (GET /tarefas/busca), equivalente à 0006 do MySQL
+--
+-- Tabela FTS5 de conteúdo externo: guarda só o índice e lê o texto de tarefas.
+-- Os gatilhos mantêm o índice a cada escrita; remove_diacritics ignora acentos,
+-- como o collation utf8mb4_general_ci do MySQL. Cada gatilho fica em uma linha
+-- porque o runner separa as instruções por ';' no fim da linha.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS tarefas_busca USING fts5(titulo, descricao, content='tarefas', content_rowid='id', tokenize='unicode61 remove_diacritics 2');
+
+CREATE TRIGGER IF NOT EXISTS tarefas_busca_inserir AFTER INSERT ON tarefas BEGIN INSERT INTO tarefas_busca (rowid, titulo, descricao) VALUES (NEW.id, NEW.titulo, NEW.descricao); END;
+
+CREATE TRIGGER IF NOT EXISTS tarefas_busca_excluir AFTER DELETE ON tarefas BEGIN INSERT INTO tarefas_busca (tarefas_busca, rowid, titulo, descricao) VALUES ('delete', OLD.id, OLD.titulo, OLD.descricao); END;
+
+CREATE TRIGGER IF NOT EXISTS tarefas_busca_atualizar AFTER UPDATE OF titulo, descricao ON tarefas BEGIN INSERT INTO tarefas_busca (tarefas_busca, rowid, titulo, descricao) VALUES ('delete', OLD.id, OLD.titulo, OLD.descricao); INSERT INTO tarefas_busca (rowid, titulo, descricao) VALUES (NEW.id, NEW.titulo, NEW.descricao); END;
+
+-- Indexa as tarefas que já existem
+INSERT INTO tarefas_busca (tarefas_busca) VALUES ('rebuild');
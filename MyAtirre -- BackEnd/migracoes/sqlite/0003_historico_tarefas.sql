@@ -0,0 +1,13 @@
+-- Histórico de alterações de status e responsável das tarefas, equivalente à 0007 do MySQL
+
+CREATE TABLE IF NOT EXISTS tarefas_historico (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  tarefa_id integer NOT NULL,
+  acao varchar(10) NOT NULL CHECK (acao IN ('atualizada', 'excluida')),
+  status varchar(20) DEFAULT NULL,
+  funcionario_id integer DEFAULT NULL,
+  usuario_id integer DEFAULT NULL,
+  alterado_em datetime NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_tarefas_historico_tarefa ON tarefas_historico (tarefa_id, id);
@@ -0,0 +1,8 @@
+-- Versões das tabelas usadas nos ETags das listagens, equivalente à 0008 do MySQL
+
+CREATE TABLE IF NOT EXISTS versoes_tabelas (
+  tabela varchar(32) NOT NULL PRIMARY KEY,
+  versao integer NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO versoes_tabelas (tabela, versao) VALUES ('usuarios', 0), ('setores', 0);
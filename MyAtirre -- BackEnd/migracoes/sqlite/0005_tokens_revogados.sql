@@ -0,0 +1,3 @@
+-- Revogação dos tokens de acesso (JWT) de um usuário, equivalente à 0009 do MySQL
+
+ALTER TABLE usuarios ADD COLUMN tokens_revogados_em real DEFAULT NULL;
@@ -0,0 +1,27 @@
+import sys
+from src.migracoes import migrar, pendentes, verificar_indices
+
+USO = """Uso: python migrar.py [comando]
+  aplicar   aplica as migrações pendentes (padrão)
+  status    lista as migrações ainda não aplicadas
+  indices   roda EXPLAIN nas consultas dos models e acusa varreduras sem índice"""
+
+if __name__ == '__main__':
+    comando = sys.argv[1] if len(sys.argv) > 1 else 'aplicar'
+
+    if comando == 'aplicar':
+        aplicadas = migrar()
+        print(f"{len(aplicadas)} migração(ões) aplicada(s)" if aplicadas else "Banco já está atualizado")
+    elif comando == 'status':
+        for versao, _ in pendentes():
+            print(f"pendente: {versao}")
+    elif comando == 'indices':
+        problemas = verificar_indices()
+        for problema in problemas:
+            print(f"SEM ÍNDICE: {problema['consulta']} ({problema['tabela']})")
+        if problemas:
+            sys.exit(1)
+        print("Todas as consultas verificadas usam índice")
+    else:
+        print(USO)
+        sys.exit(2)
@@ -0,0 +1,172 @@
+"""
+Servidor de produção: gunicorn com workers pré-forkados em todos os núcleos
+(main.py continua sendo o servidor de desenvolvimento).
+
+O app é importado uma vez no processo master, antes do fork, e os workers
+compartilham essas páginas por copy-on-write. Pools de conexão, o executor
+do bcrypt, o cache em memória e o gravador do histórico são recriados em
+cada worker depois do fork (os.register_at_fork em src/pool.py,
+src/senhas.py, src/cache.py e src/historico.py). A memória de cada worker é
+registrada no início e a cada `intervalo_memoria` segundos, e aparece em
+/metrics (processo_rss_bytes, processo_pss_bytes, processo_privada_bytes).
+
+Estado que não é de um worker só:
+  - ETags: as versões das tabelas vêm do banco, valem para todos os workers.
+  - Feed SSE: com vários workers exige eventos_config['backend'] = 'redis';
+    com 'memoria' o servidor se recusa a subir mais de um worker, pois quem
+    está conectado num worker não veria as escritas feitas em outro.
+  - Feed SSE no modo wsgi: cada conexão aberta prende uma das `threads` do
+    worker enquanto o dashboard está aberto. Para sobrar thread para as
+    outras rotas, o feed aceita no máximo threads - 1 conexões por worker
+    (acima disso responde 503) e o servidor avisa na subida. Com muitos
+    dashboards use --asgi: lá o feed roda no event loop e não ocupa threads.
+  - /metrics: os números são do worker que atendeu a requisição
+    (processo_pid), não a soma dos workers; scrapes seguidos podem vir de
+    workers diferentes. Use-os para comparar workers, não como total.
+
+Uso: python servir.py [--bind 0.0.0.0:5050] [--workers N] [--threads N] [--asgi]
+
+Reinício sem derrubar requisições (sinais para o pid do master):
+  kill -HUP <pid>     novos workers sobem e os antigos terminam o que estão atendendo
+                      (com o app pré-carregado, código novo não é relido)
+  kill -USR2 <pid>    sobe um novo master com o código atual; depois
+  kill -QUIT <pid>    no master antigo, que encerra após os workers terminarem
+Streams SSE abertos não terminam sozinhos: são cortados após graceful_timeout
+e os navegadores reconectam.
+
+Requer gunicorn (e uvicorn e a2wsgi no modo asgi).
+"""
+import argparse
+import multiprocessing
+import threading
+import time
+
+from gunicorn.app.base import BaseApplication
+
+from src.config import servidor_config, eventos_config
+from src.metricas import memoria_processo
+
+
+def _mb(valor: int) -> str:
+    return f"{valor / (1024 * 1024):.1f} MB"
+
+
+def _registrar_memoria(log, quem: str, momento: str) -> None:
+    memoria = memoria_processo()
+    log.info(f"{quem} {momento}: " + ", ".join(
+        f"{chave.replace('_bytes', '')} {_mb(valor)}" for chave, valor in memoria.items()))
+
+
+def quando_pronto(server):
+    # App já importado: esta é a base compartilhada por todos os workers
+    _registrar_memoria(server.log, f"master {server.pid}", "com o app carregado")
+
+
+def apos_fork(server, worker):
+    # Abre o pool do worker agora, para a primeira requisição não pagar as conexões
+    from src.pool import obter_pool
+    try:
+        obter_pool()
+    except Exception as e:
+        worker.log.warning(f"worker {worker.pid}: pool não aberto no início ({e}); abre na primeira requisição")
+
+
+def apos_iniciar_worker(worker):
+    quem = f"worker {worker.pid}"
+    _registrar_memoria(worker.log, quem, "no início")
+    intervalo = servidor_config['intervalo_memoria']
+    if not intervalo:
+        return
+
+    def acompanhar():
+        while worker.alive:
+            time.sleep(intervalo)
+            _registrar_memoria(worker.log, quem, "em regime")
+
+    threading.Thread(target=acompanhar, name="memoria", daemon=True).start()
+
+
+def ao_sair_worker(server, worker):
+    # Grava o histórico de tarefas ainda na fila antes de o worker terminar
+    from src.historico import encerrar_historico
+    encerrar_historico()
+    _registrar_memoria(server.log, f"worker {worker.pid}", "ao sair")
+
+
+class Servidor(BaseApplication):
+    """Gunicorn configurado por código, com o app já importado (preload)."""
+
+    def __init__(self, app, opcoes):
+        self.app = app
+        self.opcoes = opcoes
+        super().__init__()
+
+    def load_config(self):
+        for chave, valor in self.opcoes.items():
+            self.cfg.set(chave, valor)
+
+    def load(self):
+        return self.app
+
+
+def opcoes_gunicorn(config):
+    asgi = config['modo'] == 'asgi'
+    return {
+        'bind': config['bind'],
+        'workers': config['workers'],
+        'worker_class': 'uvicorn.workers.UvicornWorker' if asgi else 'gthread',
+        # No modo asgi `threads` é o pool de threads do app Flask dentro do event loop (asgi.py)
+        'threads': 1 if asgi else config['threads'],
+        'preload_app': True,
+        'timeout': config['timeout'],
+        'graceful_timeout': config['graceful_timeout'],
+        'keepalive': config['keepalive'],
+        'max_requests': config['max_requests'],
+        'max_requests_jitter': config['max_requests_jitter'],
+        'when_ready': quando_pronto,
+        'post_fork': apos_fork,
+        'post_worker_init': apos_iniciar_worker,
+        'worker_exit': ao_sair_worker,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de produção da API MyAttire")
+    parser.add_argument("--bind")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--threads", type=int)
+    parser.add_argument("--asgi", action="store_true", help="serve asgi.py com workers do uvicorn")
+    args = parser.parse_args()
+
+    config = dict(servidor_config)
+    for chave in ("bind", "workers", "threads"):
+        if getattr(args, chave) is not None:
+            config[chave] = getattr(args, chave)
+    if args.asgi:
+        config['modo'] = 'asgi'
+    config['workers'] = config['workers'] or multiprocessing.cpu_count()
+    if config['workers'] > 1 and eventos_config['backend'] == 'memoria':
+        parser.error(
+            f"{config['workers']} workers com eventos_config['backend'] = 'memoria': o feed SSE de um worker "
+            "não recebe as escritas dos outros. Use o backend 'redis' ou --workers 1"
+        )
+    servidor_config.update(config)
+    if config['modo'] == 'wsgi':
+        # Antes de importar o app: o canal de eventos lê o limite quando é criado
+        limite_sse = max(config['threads'] - 1, 0)
+        if eventos_config['max_assinantes'] > limite_sse:
+            eventos_config['max_assinantes'] = limite_sse
+            print(
+                f"Aviso: no modo wsgi cada conexão do feed SSE ocupa uma das {config['threads']} threads do worker; "
+                f"o feed aceita até {limite_sse} conexões por worker. Para mais dashboards use --asgi."
+            )
+
+    if config['modo'] == 'asgi':
+        from asgi import app
+    else:
+        from main import app
+    Servidor(app, opcoes_gunicorn(config)).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+import jwt
+
+from src.config import senha_forte, autenticacao_config
+from src.models import listar_usuario_por_id
+
+
+class TokenInvalido(Exception):
+    """Token ausente, malformado, expirado ou de um usuário inativo."""
+
+
+class CacheTokens:
+    """
+    LRU limitado de tokens já verificados. Cada entrada vale até o `exp` do
+    próprio token ou por `revalidar` segundos, o que vier antes, então um
+    acerto dispensa a decodificação HMAC e a consulta do usuário. Guarda
+    também os tokens por usuário para revogação.
+
+    A revogação só limpa o cache deste processo: nos outros workers o token
+    volta a ser conferido no banco (usuarios.tokens_revogados_em) quando a
+    entrada passa de `revalidar` segundos.
+    """
+
+    def __init__(self, max_tokens: int = 10000, revalidar: float = 30.0):
+        self.max_tokens = max_tokens
+        self.revalidar = revalidar
+        self._itens: "OrderedDict[str, tuple]" = OrderedDict()
+        self._por_usuario: Dict[int, set] = {}
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, token: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._itens.get(token)
+            if item is None or item[0] <= time.time():
+                if item is not None:
+                    self._remover(token)
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(token)
+            self.acertos += 1
+            return item[1]
+
+    def guardar(self, token: str, exp: float, usuario: Dict[str, Any]) -> None:
+        with self._lock:
+            self._itens[token] = (min(exp, time.time() + self.revalidar), usuario)
+            self._itens.move_to_end(token)
+            self._por_usuario.setdefault(usuario["id"], set()).add(token)
+            while len(self._itens) > self.max_tokens:
+                self._remover(next(iter(self._itens)))
+
+    def _remover(self, token: str) -> None:
+        _, usuario = self._itens.pop(token)
+        tokens = self._por_usuario.get(usuario["id"])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._por_usuario[usuario["id"]]
+
+    def revogar_usuario(self, usuario_id: int) -> None:
+        with self._lock:
+            for token in list(self._por_usuario.get(usuario_id, ())):
+                self._remover(token)
+
+    def revogar_token(self, token: str) -> None:
+        with self._lock:
+            if token in self._itens:
+                self._remover(token)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+            self._por_usuario.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"tokens": len(self._itens), "acertos": self.acertos, "falhas": self.falhas}
+
+
+cache_tokens = CacheTokens(autenticacao_config['cache_max_tokens'], autenticacao_config['revalidar_segundos'])
+
+
+def verificar_token(token: str) -> Dict[str, Any]:
+    """
+    Valida o JWT de acesso e retorna o usuário (id, email, perfil, setor, ativo).
+    """
+    usuario = cache_tokens.obter(token)
+    if usuario is not None:
+        return usuario
+    payload = _decodificar(token)
+    return _guardar_usuario(token, payload, listar_usuario_por_id(int(payload["sub"])))
+
+
+def _decodificar(token: str) -> Dict[str, Any]:
+    try:
+        payload = jwt.decode(token, senha_forte, algorithms=['HS256'], options={"require": ["exp", "sub"]})
+        int(payload["sub"])
+    except (jwt.InvalidTokenError, ValueError) as e:
+        raise TokenInvalido(f"Token inválido: {str(e)}")
+    return payload
+
+
+def _guardar_usuario(token: str, payload: Dict[str, Any], usuario: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not usuario or not usuario["ativo"]:
+        raise TokenInvalido("Usuário inexistente ou inativo")
+    # Tokens emitidos antes da última troca de senha (os sem `iat` são anteriores a ela)
+    revogados_em = usuario.pop("tokens_revogados_em", None)
+    if revogados_em is not None and payload.get("iat", 0) < float(revogados_em):
+        raise TokenInvalido("Token revogado")
+    cache_tokens.guardar(token, payload["exp"], usuario)
+    return usuario
+
+
+def revogar_usuario(usuario_id: int) -> None:
+    """
+    Tira do cache deste processo os tokens do usuário, depois que
+    models.atualizar_senha gravou o instante da revogação.
+    """
+    cache_tokens.revogar_usuario(usuario_id)
@@ -0,0 +1,164 @@
+"""
+Backend SQLite embutido (arquivo local, sem servidor), selecionado por
+armazenamento_config['backend'] = 'sqlite'.
+
+Os models continuam com o SQL escrito para o MySQL: a conexão daqui imita a
+interface do pymysql (cursor(DictCursor), lastrowid, rowcount, commit) e
+traduz o pequeno subconjunto do dialeto que eles usam:
+  - marcadores %s viram ?; `FOR UPDATE` é removido (o SQLite tem um único
+    escritor por vez e a transação de escrita já começa com BEGIN IMMEDIATE)
+  - NOW(), CURDATE() e LAST_INSERT_ID(expr) são funções registradas na conexão
+  - em um INSERT de várias linhas, lastrowid é o id da primeira, como no MySQL
+"""
+import re
+import sqlite3
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Optional, Tuple
+
+from pymysql.cursors import DictCursorMixin
+
+from src.config import armazenamento_config, metricas_config
+from src.metricas import classe_medida
+
+# Datas gravadas como texto ISO e devolvidas como datetime/date, igual ao pymysql
+sqlite3.register_adapter(datetime, lambda valor: valor.isoformat(" "))
+sqlite3.register_adapter(date, lambda valor: valor.isoformat())
+sqlite3.register_converter("timestamp", lambda valor: datetime.fromisoformat(valor.decode()))
+sqlite3.register_converter("datetime", lambda valor: datetime.fromisoformat(valor.decode()))
+sqlite3.register_converter("date", lambda valor: date.fromisoformat(valor.decode()[:10]))
+
+_MARCADOR = re.compile(r"%s")
+_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE\b", re.I)
+_SOMENTE_LEITURA = re.compile(r"^\s*(SELECT|WITH|EXPLAIN|PRAGMA)\b", re.I)
+_INSERT = re.compile(r"^\s*INSERT\b", re.I)
+
+
+@lru_cache(maxsize=512)
+def _traduzir(query: str) -> Tuple[str, bool]:
+    """
+    Retorna o SQL para o sqlite3 e se a instrução escreve (ou trava linhas).
+    As consultas dos models são strings fixas (ou montadas com poucas
+    variações), então a tradução fica em cache e o sqlite3 reaproveita o
+    statement preparado.
+    """
+    escrita = not _SOMENTE_LEITURA.match(query) or bool(_FOR_UPDATE.search(query))
+    return _MARCADOR.sub("?", _FOR_UPDATE.sub("", query)), escrita
+
+
+class CursorSQLite:
+    """Cursor com a interface usada pelos models (execute, fetch*, lastrowid, rowcount)."""
+
+    def __init__(self, conexao: "ConexaoSQLite", como_dict: bool = False):
+        self._conexao = conexao
+        self._cursor = conexao._conn.cursor()
+        self._como_dict = como_dict
+        self.lastrowid: Optional[int] = None
+        self.rowcount = -1
+        self.description = None
+        self._colunas = None
+
+    def execute(self, query: str, args: Any = None):
+        sql, escrita = _traduzir(query)
+        self._conexao._iniciar_transacao(escrita)
+        self._conexao._ultimo_id = None
+        self._cursor.execute(sql, tuple(args) if args is not None else ())
+        self.description = self._cursor.description
+        self._colunas = [coluna[0] for coluna in self.description] if self.description else None
+        self.rowcount = self._cursor.rowcount
+        if self._conexao._ultimo_id is not None:
+            # UPDATE ... LAST_INSERT_ID(expr): o valor volta em lastrowid, como no MySQL
+            self.lastrowid = self._conexao._ultimo_id
+        elif _INSERT.match(sql):
+            self.lastrowid = self._cursor.lastrowid - max(self.rowcount, 1) + 1
+        return self.rowcount
+
+    def executemany(self, query: str, args) -> int:
+        sql, escrita = _traduzir(query)
+        self._conexao._iniciar_transacao(escrita)
+        self._cursor.executemany(sql, [tuple(linha) for linha in args])
+        self.rowcount = self._cursor.rowcount
+        return self.rowcount
+
+    def _linha(self, linha):
+        if linha is None or not self._como_dict:
+            return linha
+        return dict(zip(self._colunas, linha))
+
+    def fetchone(self):
+        return self._linha(self._cursor.fetchone())
+
+    def fetchmany(self, tamanho: int = 1):
+        return [self._linha(linha) for linha in self._cursor.fetchmany(tamanho)]
+
+    def fetchall(self):
+        return [self._linha(linha) for linha in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self) -> None:
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ConexaoSQLite:
+    """Conexão sqlite3 com a interface do pymysql usada pelo pool e pelos models."""
+
+    def __init__(self, caminho: str, timeout: float = 5.0, cache_statements: int = 256):
+        self._conn = sqlite3.connect(
+            caminho, timeout=timeout, isolation_level=None, check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES, cached_statements=cache_statements
+        )
+        self._ultimo_id = None
+        self._conn.create_function("NOW", 0, lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        self._conn.create_function("CURDATE", 0, lambda: date.today().isoformat())
+        self._conn.create_function("LAST_INSERT_ID", 1, self._guardar_id)
+        # WAL: leitores não bloqueiam o escritor; NORMAL só faz fsync no checkpoint
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self.open = True
+
+    def _guardar_id(self, valor):
+        self._ultimo_id = valor
+        return valor
+
+    def _iniciar_transacao(self, escrita: bool) -> None:
+        # Sem transação aberta, leituras começam uma transação comum (mesmo
+        # snapshot até o commit) e escritas já pegam o lock de escrita
+        if not self._conn.in_transaction:
+            self._conn.execute("BEGIN IMMEDIATE" if escrita else "BEGIN")
+
+    def cursor(self, cursor: type = None) -> CursorSQLite:
+        # DictCursor e SSDictCursor do pymysql: linhas como dict (o sqlite3 já lê sob demanda)
+        classe = classe_medida(CursorSQLite) if metricas_config['ativo'] else CursorSQLite
+        return classe(self, como_dict=cursor is not None and issubclass(cursor, DictCursorMixin))
+
+    def commit(self) -> None:
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+
+    def rollback(self) -> None:
+        if self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+
+    def ping(self, reconnect: bool = False) -> None:
+        self._conn.execute("SELECT 1")
+
+    def close(self) -> None:
+        self.open = False
+        self._conn.close()
+
+
+def conectar_sqlite(**_) -> ConexaoSQLite:
+    return ConexaoSQLite(
+        armazenamento_config['sqlite_caminho'],
+        timeout=armazenamento_config['sqlite_timeout'],
+        cache_statements=armazenamento_config['sqlite_cache_statements'],
+    )
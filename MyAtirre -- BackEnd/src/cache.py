@@ -0,0 +1,222 @@
+import contextvars
+import os
+import pickle
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, Optional
+
+from src.config import cache_config
+
+_AUSENTE = object()
+
+
+class BackendCache(ABC):
+    """
+    Interface dos backends de cache. Um backend compartilhado (ex.: Redis)
+    permite que vários workers usem e invalidem o mesmo cache.
+    """
+
+    @abstractmethod
+    def obter(self, chave: str) -> Any:
+        """Retorna o valor guardado ou `_AUSENTE`."""
+
+    @abstractmethod
+    def guardar(self, chave: str, valor: Any, ttl: float) -> None:
+        pass
+
+    @abstractmethod
+    def remover_prefixo(self, prefixo: str) -> None:
+        pass
+
+    @abstractmethod
+    def limpar(self) -> None:
+        pass
+
+    def tamanho(self) -> int:
+        return 0
+
+
+class CacheMemoria(BackendCache):
+    """Cache em memória do processo com expiração (TTL) e limite LRU."""
+
+    def __init__(self, max_itens: int = 256):
+        self.max_itens = max_itens
+        self._itens: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave: str) -> Any:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return _AUSENTE
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                return _AUSENTE
+            self._itens.move_to_end(chave)
+            return valor
+
+    def guardar(self, chave: str, valor: Any, ttl: float) -> None:
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def remover_prefixo(self, prefixo: str) -> None:
+        with self._lock:
+            for chave in [c for c in self._itens if c.startswith(prefixo)]:
+                del self._itens[chave]
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+
+    def tamanho(self) -> int:
+        return len(self._itens)
+
+
+class CacheRedis(BackendCache):
+    """Backend compartilhado entre workers. Requer o pacote `redis`."""
+
+    def __init__(self, url: str = "redis://localhost:6379/0", namespace: str = "myattire:"):
+        import redis  # dependência opcional, só carregada quando este backend é usado
+        self._cliente = redis.Redis.from_url(url)
+        self.namespace = namespace
+
+    def obter(self, chave: str) -> Any:
+        bruto = self._cliente.get(self.namespace + chave)
+        return _AUSENTE if bruto is None else pickle.loads(bruto)
+
+    def guardar(self, chave: str, valor: Any, ttl: float) -> None:
+        self._cliente.set(self.namespace + chave, pickle.dumps(valor), px=int(ttl * 1000))
+
+    def remover_prefixo(self, prefixo: str) -> None:
+        for chave in self._cliente.scan_iter(match=f"{self.namespace}{prefixo}*"):
+            self._cliente.delete(chave)
+
+    def limpar(self) -> None:
+        self.remover_prefixo("")
+
+
+def _criar_backend() -> BackendCache:
+    if cache_config.get('backend') == 'redis':
+        return CacheRedis(cache_config.get('redis_url', "redis://localhost:6379/0"))
+    return CacheMemoria(cache_config.get('max_itens', 256))
+
+
+_backend: BackendCache = _criar_backend()
+_contadores = {"acertos": 0, "falhas": 0, "invalidacoes": 0}
+_contadores_lock = threading.Lock()
+
+# Versões das tabelas lidas do banco pela requisição atual (rotas com ETag)
+_versoes_atuais = contextvars.ContextVar("versoes_tabelas", default=None)
+
+
+def _recriar_apos_fork() -> None:
+    # Com o app pré-carregado (servir.py), cada worker começa com o próprio
+    # cache em memória e travas novas, sem nada herdado do master
+    global _backend, _contadores_lock
+    if isinstance(_backend, CacheMemoria):
+        _backend = CacheMemoria(_backend.max_itens)
+    _contadores_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_recriar_apos_fork)
+
+
+def definir_backend(backend: BackendCache) -> None:
+    """Troca o backend em uso (ex.: um cache compartilhado entre workers)."""
+    global _backend
+    _backend = backend
+
+
+def _contar(nome: str) -> None:
+    with _contadores_lock:
+        _contadores[nome] += 1
+
+
+def em_cache(grupo: str, ttl: Optional[float] = None):
+    """
+    Decorador de leitura com cache (read-through). O resultado da função é
+    guardado sob `grupo` e descartado por `invalidar(grupo)`.
+    `funcao.ler_ou_calcular(calcular, *args)` usa a mesma entrada do cache,
+    mas calcula o valor com `calcular` em caso de falha (ex.: reaproveitando
+    uma conexão já aberta).
+
+    Cada valor guarda a versão da tabela `grupo` em que foi calculado. Dentro
+    de `com_versoes` (rotas com ETag), um valor anterior à versão atual no
+    banco, p.ex. escrita feita por outro worker, conta como falha.
+    """
+    def decorador(func):
+        def chave(args, kwargs) -> str:
+            return f"{grupo}:{func.__name__}:{args!r}:{sorted(kwargs.items())!r}"
+
+        def ler(chave_cache: str) -> Any:
+            item = _backend.obter(chave_cache)
+            valor = _AUSENTE
+            if item is not _AUSENTE:
+                versao, valor = item
+                atual = (_versoes_atuais.get() or {}).get(grupo)
+                if atual is not None and (versao is None or versao < atual):
+                    valor = _AUSENTE
+            _contar("acertos" if valor is not _AUSENTE else "falhas")
+            return valor
+
+        def guardar(chave_cache: str, valor: Any) -> None:
+            versao = (_versoes_atuais.get() or {}).get(grupo)
+            _backend.guardar(chave_cache, (versao, valor), ttl if ttl is not None else cache_config.get('ttl', 60))
+
+        def ler_ou_calcular(calcular, *args, **kwargs):
+            if not cache_config.get('ativo', True):
+                return calcular()
+            chave_cache = chave(args, kwargs)
+            valor = ler(chave_cache)
+            if valor is _AUSENTE:
+                valor = calcular()
+                guardar(chave_cache, valor)
+            return valor
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return ler_ou_calcular(lambda: func(*args, **kwargs), *args, **kwargs)
+
+        wrapper.ler_ou_calcular = ler_ou_calcular
+        return wrapper
+    return decorador
+
+
+def invalidar(*grupos: str) -> None:
+    # Chamado pelas funções de escrita depois do commit. Os outros workers
+    # (backend em memória) percebem a escrita pela versão da tabela no banco
+    for grupo in grupos:
+        _backend.remover_prefixo(f"{grupo}:")
+        _contar("invalidacoes")
+
+
+@contextmanager
+def com_versoes(versoes: Dict[str, int]):
+    """
+    Informa ao cache as versões das tabelas lidas do banco (ver
+    models.ler_versoes_tabelas) durante o bloco: valores em cache
+    calculados antes delas são recalculados.
+    """
+    marca = _versoes_atuais.set(versoes)
+    try:
+        yield
+    finally:
+        _versoes_atuais.reset(marca)
+
+
+def estatisticas_cache() -> Dict[str, Any]:
+    with _contadores_lock:
+        stats = dict(_contadores)
+    consultas = stats["acertos"] + stats["falhas"]
+    stats["taxa_acerto"] = round(stats["acertos"] / consultas, 4) if consultas else 0.0
+    stats["itens"] = _backend.tamanho()
+    stats["backend"] = type(_backend).__name__
+    return stats
@@ -0,0 +1,64 @@
+import gzip
+from typing import Optional
+
+from flask import request
+
+from src.config import compressao_config
+
+# brotli é opcional: sem ele só gzip é oferecido
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _codificacoes():
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def _comprimir(corpo: bytes, codificacao: str) -> bytes:
+    if codificacao == "br":
+        return brotli.compress(corpo, quality=compressao_config['qualidade_brotli'])
+    return gzip.compress(corpo, compresslevel=compressao_config['nivel_gzip'])
+
+
+def _codificacao(resposta, aceitas) -> Optional[str]:
+    """Codificação a aplicar no corpo já pronto, ou None para enviar como está."""
+    if resposta.status_code < 200 or resposta.status_code in (204, 304) or "Content-Encoding" in resposta.headers:
+        return None
+    resposta.vary.add("Accept-Encoding")
+    if resposta.content_length is None or resposta.content_length < compressao_config['tamanho_minimo']:
+        return None
+    return aceitas.best_match(_codificacoes())
+
+
+def _marcar(resposta, codificacao: str) -> None:
+    resposta.headers["Content-Encoding"] = codificacao
+    # O corpo muda por codificação, então o ETag passa a ser fraco
+    etag, fraco = resposta.get_etag()
+    if etag and not fraco:
+        resposta.set_etag(etag, weak=True)
+
+
+def comprimir_resposta(resposta):
+    """
+    after_request: comprime com br ou gzip, conforme o Accept-Encoding do
+    cliente, as respostas acima de `tamanho_minimo`. Streams (SSE,
+    exportação) passam direto, para não segurar os blocos no servidor.
+    """
+    if not compressao_config['ativo']:
+        return resposta
+    if resposta.direct_passthrough or resposta.is_streamed:
+        return resposta
+    codificacao = _codificacao(resposta, request.accept_encodings)
+    if codificacao is None:
+        return resposta
+
+    resposta.set_data(_comprimir(resposta.get_data(), codificacao))
+    _marcar(resposta, codificacao)
+    return resposta
+
+
+def ativar_compressao(app) -> None:
+    app.after_request(comprimir_resposta)
+
@@ -5,4 +5,149 @@ db_config = {
     'database': 'gestao_tarefas'
 }
 
-senha_forte = "Bruna@1410"
\ No newline at end of file
+senha_forte = "Bruna@1410"
+
+# Validade dos tokens emitidos no login
+token_config = {
+    'acesso_minutos': 60,    # JWT de acesso
+    'renovacao_dias': 30     # token de renovação (refresh), trocado a cada uso
+}
+
+# Verificação do token Bearer nas rotas (ver src/autenticacao.py)
+autenticacao_config = {
+    'obrigatoria': False,       # True: rotas não públicas exigem token válido
+    'cache_max_tokens': 10000,  # tokens verificados mantidos em memória até expirarem
+    'revalidar_segundos': 30    # um token em cache é conferido de novo no banco após esse tempo
+}
+
+# Pool de conexões compartilhado pelos models (ver src/pool.py)
+pool_config = {
+    'min_conexoes': 2,
+    'max_conexoes': 10,
+    'timeout_espera': 5.0,       # segundos aguardando uma conexão livre
+    'reciclar_apos': 1800.0,     # segundos de vida antes de reabrir a conexão
+    'testar_apos_ocioso': 30.0   # ping na retirada se ficou ociosa por mais tempo
+}
+
+# Paginação por cursor da listagem de tarefas
+paginacao_config = {
+    'limite_padrao': 100,
+    'limite_max': 500
+}
+
+# Carga dos dashboards (/painel, ver models.carregar_painel)
+painel_config = {
+    'workers': 4   # threads que leem usuários e setores enquanto a requisição lê as tarefas
+}
+
+# Busca textual em título e descrição das tarefas (/tarefas/busca)
+busca_config = {
+    'tamanho_minimo_termo': 3,   # termos menores são ignorados (innodb_ft_min_token_size do MySQL)
+    'max_termos': 8
+}
+
+# Cache das listagens de setores e usuários (ver src/cache.py)
+cache_config = {
+    'ativo': True,
+    'backend': 'memoria',   # 'memoria' ou 'redis' (compartilhado entre workers)
+    'redis_url': 'redis://localhost:6379/0',
+    'ttl': 60,              # segundos
+    'max_itens': 256
+}
+
+# Feed de eventos (SSE) das tarefas
+eventos_config = {
+    # 'memoria': só as conexões do próprio processo recebem os eventos (um worker só);
+    # 'redis': pub/sub compartilhado, necessário com vários workers (servir.py)
+    'backend': 'memoria',
+    'redis_url': 'redis://localhost:6379/0',
+    'redis_canal': 'myattire:eventos_tarefas',
+    'buffer_por_assinante': 100,  # eventos guardados por conexão antes de pedir resync
+    'heartbeat': 15,              # segundos entre comentários de keep-alive
+    'retry_ms': 3000,             # espera sugerida ao navegador antes de reconectar
+    'max_assinantes': 1000        # no modo wsgi de servir.py, no máximo threads - 1 por worker
+}
+
+# Operações em lote de tarefas (/tarefas/lote)
+lote_config = {
+    'max_itens': 1000
+}
+
+# Histórico de status e responsável das tarefas, gravado em segundo plano (ver src/historico.py)
+historico_config = {
+    'ativo': True,
+    'tamanho_fila': 10000,     # alterações aguardando gravação
+    'tamanho_lote': 200,       # linhas por INSERT; a fila é gravada ao atingir esse número...
+    'intervalo': 1.0,          # ...ou depois de tantos segundos da primeira alteração pendente
+    'ao_encher': 'bloquear',   # fila cheia: 'bloquear' (até espera_max) ou 'descartar'
+    'espera_max': 0.05,        # segundos bloqueando antes de descartar
+    'espera_encerramento': 10  # segundos para gravar a fila ao encerrar o processo
+}
+
+# Hashing de senhas (ver src/senhas.py)
+senha_config = {
+    'custo_bcrypt': 12,   # work factor; hashes com outro custo são refeitos no login
+    'workers': 4,         # threads dedicadas ao bcrypt
+    'max_fila': 32,       # pedidos aguardando além dos workers; acima disso responde 503
+    'timeout': 10         # segundos
+}
+
+# Exportação de tarefas (/tarefas/exportar)
+exportacao_config = {
+    'linhas_por_bloco': 500   # linhas lidas do banco e enviadas ao cliente por vez
+}
+
+# Serialização JSON das respostas (ver src/serializacao.py)
+json_config = {
+    'rapido': True,           # usa orjson quando instalado; sem ele cai no encoder padrão do Flask
+    'formato_datas': 'http'   # 'http' (igual ao jsonify padrão) ou 'iso' (ISO 8601, mais rápido)
+}
+
+# Compressão das respostas (ver src/compressao.py)
+compressao_config = {
+    'ativo': True,
+    'tamanho_minimo': 1024,   # bytes; respostas menores saem sem compressão
+    'nivel_gzip': 6,
+    'qualidade_brotli': 4     # 0-11; acima de ~5 o custo de CPU cresce rápido
+}
+
+# Métricas no formato do Prometheus em /metrics (ver src/metricas.py)
+metricas_config = {
+    'ativo': True,
+    'buckets': [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],  # segundos
+    'consulta_lenta_ms': None,      # ex.: 200 para logar instruções mais lentas que isso (SQL + tipos dos parâmetros)
+    'consulta_lenta_max_sql': 500   # caracteres do SQL mostrados no log
+}
+
+# Armazenamento dos dados: 'mysql' (db_config e pool_config) ou 'sqlite'
+# (arquivo local, sem servidor; ver src/banco_sqlite.py)
+armazenamento_config = {
+    'backend': 'mysql',
+    'sqlite_caminho': 'gestao_tarefas.db',
+    'sqlite_timeout': 5.0,            # segundos esperando o lock de escrita
+    'sqlite_cache_statements': 256    # statements preparados mantidos por conexão
+}
+
+# Réplicas de leitura (só MySQL/MariaDB). Cada item sobrescreve chaves de db_config,
+# ex.: [{'host': '127.0.0.1', 'port': 3307}]. Lista vazia: tudo vai ao primário
+replicas_config = {
+    'replicas': [],
+    'janela_leitura_propria': 5.0,   # segundos lendo do primário depois de uma escrita do mesmo cliente
+    'tempo_ejecao': 30.0,            # segundos fora do rodízio após uma falha
+    'max_atraso': None,              # segundos de atraso de replicação tolerados (None: não verifica)
+    'intervalo_verificacao': 5.0     # segundos entre verificações do atraso
+}
+
+# Servidor de produção (servir.py): gunicorn com workers pré-forkados
+servidor_config = {
+    'bind': '0.0.0.0:5050',
+    'modo': 'wsgi',             # 'wsgi' (main.py, workers com threads) ou 'asgi' (asgi.py, workers do uvicorn)
+    'workers': None,            # None: um por núcleo
+    'threads': 4,               # threads por worker atendendo as rotas (no modo asgi, fora o feed SSE)
+    'timeout': 30,              # segundos sem resposta antes de o worker ser reiniciado
+    'graceful_timeout': 30,     # segundos para terminar as requisições em andamento num reinício
+    'keepalive': 5,
+    'max_requests': 0,          # recicla o worker após N requisições (0: nunca)
+    'max_requests_jitter': 0,
+    'intervalo_memoria': 300    # segundos entre os registros de memória de cada worker (0: só no início)
+}
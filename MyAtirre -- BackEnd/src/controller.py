@@ -1,23 +1,75 @@
+import csv
+import hashlib
+import io
+import os
+import secrets
 from typing import Dict, Any
-import bcrypt
 import jwt
+import time
 from datetime import datetime, timedelta
-from flask import jsonify, request
-from src.models import cadastrar_usuarios, atualizar_senha, listar_usuarios, listar_usuario_por_email, listar_setores, \
-    cadastrar_setor, cadastrar_tarefa, listar_tarefas, listar_tarefa_por_id, atualizar_tarefa, deletar_tarefa
-from src.config import db_config, senha_forte  # jwt_secret_key é a chave secreta para o JWT
-from datetime import datetime
+from flask import jsonify, current_app, Response, stream_with_context, g
+from src.models import CAMPOS_TAREFA, cadastrar_usuarios, atualizar_senha, atualizar_hash_senha, listar_usuarios, listar_usuario_por_email, listar_setores, \
+    cadastrar_setor, cadastrar_token_renovacao, rotacionar_token_renovacao, \
+    cadastrar_tarefa, listar_tarefas, listar_tarefa_por_id, atualizar_tarefa, deletar_tarefa, \
+    estatisticas_tarefas, listar_alteracoes_tarefas, buscar_tarefas, termos_busca, listar_historico_tarefa, tarefa_gravada, resolver_referencias_tarefa, carregar_painel, exportar_tarefas, COLUNAS_TAREFA, cadastrar_tarefas_lote, atualizar_tarefas_lote, deletar_tarefas_lote
+from src.config import senha_forte, token_config, paginacao_config, busca_config, eventos_config, lote_config, exportacao_config  # jwt_secret_key é a chave secreta para o JWT
+from src.pool import estatisticas_pool
+from src.metricas import exportar_metricas, memoria_processo
+from src.cache import estatisticas_cache
+from src.historico import registrar_alteracao, registrar_alteracoes, estatisticas_historico
+from src.eventos import canal_tarefas, LimiteAssinantes
+from src.autenticacao import revogar_usuario, cache_tokens
+from src.senhas import gerar_hash, verificar_senha, precisa_rehash, rehash_em_segundo_plano, SenhasSobrecarregado
 
 # Função para gerar o token JWT
 def gerar_token(usuario_id: int, email: str):
     payload = {
-        "sub": usuario_id,
+        "sub": str(usuario_id),
         "email": email,
-        "exp": datetime.utcnow() + timedelta(hours=1)  # Token expira em 1 hora
+        # Instante exato da emissão: comparado com usuarios.tokens_revogados_em
+        "iat": time.time(),
+        "exp": datetime.utcnow() + timedelta(minutes=token_config['acesso_minutos'])
     }
     token = jwt.encode(payload, senha_forte, algorithm='HS256')
     return token
 
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+# Token de renovação: valor aleatório opaco; só o SHA-256 vai para o banco
+def gerar_token_renovacao(usuario_id: int) -> str:
+    token = secrets.token_urlsafe(32)
+    expira_em = datetime.now() + timedelta(days=token_config['renovacao_dias'])
+    cadastrar_token_renovacao(usuario_id, _hash_token(token), expira_em)
+    return token
+
+def renovar_token(data):
+    """
+    Emite um novo token de acesso a partir do token de renovação, sem passar
+    pelo bcrypt. O token de renovação usado é trocado por um novo.
+    """
+    refresh_token = (data or {}).get("refresh_token")
+    if not refresh_token:
+        return jsonify({"error": "refresh_token é obrigatório"}), 400
+
+    novo_refresh = secrets.token_urlsafe(32)
+    expira_em = datetime.now() + timedelta(days=token_config['renovacao_dias'])
+    try:
+        usuario = rotacionar_token_renovacao(_hash_token(refresh_token), _hash_token(novo_refresh), expira_em)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if not usuario:
+        return jsonify({"error": "Token de renovação inválido ou expirado"}), 401
+
+    return jsonify({
+        "token": gerar_token(usuario["id"], usuario["email"]),
+        "refresh_token": novo_refresh
+    }), 200
+
+def resposta_sobrecarga(e: Exception):
+    # Fila de hashing cheia: recusa rápido para não travar as demais rotas
+    return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+
 def cadastrar_usuario(data):
     nome = data.get("nome")
     email = data.get("email")
@@ -33,12 +85,15 @@ def cadastrar_usuario(data):
     if listar_usuario_por_email(email):
         return jsonify({"error": "Usuário com esse e-mail já existe"}), 400
 
-    # Hash da senha usando bcrypt
-    senha_hash = bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt())
+    # Hash da senha usando bcrypt (no executor dedicado)
+    try:
+        senha_hash = gerar_hash(senha)
+    except SenhasSobrecarregado as e:
+        return resposta_sobrecarga(e)
 
     try:
         # Chama a função para cadastrar o usuário com a senha criptografada
-        data['senha_hash'] = senha_hash.decode('utf-8')  # bcrypt retorna em bytes, precisamos decodificar
+        data['senha_hash'] = senha_hash
         cadastrar_usuarios(data)
 
         # Gerar token JWT após o cadastro (opcional, pode ser usado no login)
@@ -53,28 +108,37 @@ def cadastrar_usuario(data):
 
 
 def atualizar_senha_usuario(data):
-    id_usuario = data.get("id")
+    email = data.get("email")
     senha_atual = data.get("senha_atual")
     nova_senha = data.get("nova_senha")
 
-    if not id_usuario or not senha_atual or not nova_senha:
+    if not email or not senha_atual or not nova_senha:
         return jsonify({"error": "Dados incompletos"}), 400
 
     # Verifica se o usuário existe
-    usuario = listar_usuario_por_email(data.get("email"))
+    usuario = listar_usuario_por_email(email)
     if not usuario:
         return jsonify({"error": "Usuário não encontrado"}), 404
+    # A senha conferida é a do usuário do e-mail: só ele pode ser alterado.
+    # O `id` do corpo é opcional e, se vier, tem de ser o mesmo
+    id_usuario = usuario["id"]
+    if data.get("id") is not None and str(data["id"]) != str(id_usuario):
+        return jsonify({"error": "id não corresponde ao e-mail informado"}), 400
 
-    if not bcrypt.checkpw(senha_atual.encode('utf-8'), usuario["senha_hash"].encode('utf-8')):
-        return jsonify({"error": "Senha atual incorreta"}), 403
+    try:
+        if not verificar_senha(senha_atual, usuario["senha_hash"]):
+            return jsonify({"error": "Senha atual incorreta"}), 403
 
-    # Hash da nova senha
-    nova_senha_hash = bcrypt.hashpw(nova_senha.encode('utf-8'), bcrypt.gensalt())
+        # Hash da nova senha
+        nova_senha_hash = gerar_hash(nova_senha)
+    except SenhasSobrecarregado as e:
+        return resposta_sobrecarga(e)
 
     try:
         # Chama a função para atualizar a senha no banco
-        data['senha_hash'] = nova_senha_hash.decode('utf-8')  # Atualiza com a nova senha hash
-        atualizar_senha(data)
+        # No mesmo commit: sessões abertas com a senha antiga não podem mais ser renovadas nem usadas
+        atualizar_senha({"id": id_usuario, "senha_hash": nova_senha_hash}, tokens_revogados_em=time.time())
+        revogar_usuario(id_usuario)
         return jsonify({"message": "Senha alterada com sucesso"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -110,14 +174,29 @@ def login_usuario(data):
     if not usuario:
         return jsonify({"error": "Usuário não encontrado"}), 404
 
-    if not bcrypt.checkpw(senha.encode('utf-8'), usuario["senha_hash"].encode('utf-8')):
-        return jsonify({"error": "Senha incorreta"}), 403
-
-    # Gerar token JWT após login
+    try:
+        if not verificar_senha(senha, usuario["senha_hash"]):
+            return jsonify({"error": "Senha incorreta"}), 403
+    except SenhasSobrecarregado as e:
+        return resposta_sobrecarga(e)
+
+    # Hash gerado com um custo antigo: troca pelo custo atual sem atrasar o login
+    # Condicionado ao hash lido aqui, para não desfazer uma troca de senha feita nesse meio tempo
+    if precisa_rehash(usuario["senha_hash"]):
+        rehash_em_segundo_plano(
+            senha, lambda novo_hash: atualizar_hash_senha(usuario["id"], novo_hash, usuario["senha_hash"])
+        )
+
+    # Gerar token JWT após login, junto com o token de renovação
     token = gerar_token(usuario['id'], email)
+    try:
+        refresh_token = gerar_token_renovacao(usuario['id'])
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
     return jsonify({
         "message": "Login bem-sucedido",
         "token": token,
+        "refresh_token": refresh_token,
         "usuario": {
             "email": usuario['email'],
             "nome": usuario['nome'],
@@ -162,30 +241,483 @@ def listar_setores_controller():
 
 def validar_payload_tarefa(data: Dict[str, Any], create: bool = True):
     obrigatorios = ["titulo", "setor"]
-    faltando = [c for c in obrigatorios if create and not data.get(c)]
+    # O setor pode vir pelo nome ou pelo id (setor_id)
+    faltando = [c for c in obrigatorios if create and not data.get(c) and data.get(f"{c}_id") is None]
     if faltando:
         return f"Campos obrigatórios ausentes: {', '.join(faltando)}"
     return None
 
+def publicar_evento_tarefa(tipo: str, dados: Dict[str, Any]):
+    # Serializa uma vez com o provider JSON do app (trata datetime/date)
+    canal_tarefas.publicar(tipo, current_app.json.dumps(dados))
+
+
+# Campos da tarefa cujas mudanças entram no histórico
+CAMPOS_HISTORICO = ("status", "funcionario_id")
+
+
+def _alteracoes_historico(anterior: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    # Só mudanças reais de status e de responsável entram no histórico:
+    # reenviar a tarefa inteira com os mesmos valores não gera entrada
+    return {campo: data[campo] for campo in CAMPOS_HISTORICO
+            if data.get(campo) is not None and data[campo] != anterior.get(campo)}
+
+
+def _usuario_id():
+    return g.usuario["id"] if g.usuario else None
+
+
+def registrar_historico_tarefa(tarefa_id: int, anterior: Dict[str, Any], data: Dict[str, Any]):
+    # Gravado em segundo plano (src/historico.py)
+    alterados = _alteracoes_historico(anterior, data)
+    if alterados:
+        registrar_alteracao(tarefa_id, "atualizada", usuario_id=_usuario_id(), **alterados)
+
+
+def eventos_tarefas_controller():
+    """Feed Server-Sent Events com criação, atualização e exclusão de tarefas."""
+    try:
+        assinante = canal_tarefas.assinar()
+    except LimiteAssinantes as e:
+        return jsonify({"error": str(e)}), 503
+    fluxo = canal_tarefas.transmitir(assinante, eventos_config['heartbeat'])
+    return Response(
+        stream_with_context(fluxo),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 def cadastrar_tarefa_controller(data: Dict[str, Any]):
     erro = validar_payload_tarefa(data, create=True)
     if erro:
         return jsonify({"error": erro}), 400
     try:
+        erro = resolver_referencias_tarefa(data)
+        if erro:
+            return jsonify({"error": erro}), 400
         novo_id = cadastrar_tarefa(data)
-        tarefa = listar_tarefa_por_id(novo_id)
+        tarefa = tarefa_gravada(novo_id, data)
+        publicar_evento_tarefa("tarefa_criada", tarefa)
         return jsonify({"message": "Tarefa cadastrada com sucesso", "tarefa": tarefa}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-def listar_tarefas_controller():
+def _validar_lote(itens):
+    if not isinstance(itens, list) or not itens:
+        return "Envie uma lista não vazia de itens"
+    if len(itens) > lote_config['max_itens']:
+        return f"O lote aceita no máximo {lote_config['max_itens']} itens"
+    return None
+
+
+def _resposta_lote(resultados, linhas: int, inicio: float, publicar: Dict[str, Any]):
+    duracao = time.perf_counter() - inicio
+    if linhas:
+        publicar_evento_tarefa("tarefas_lote", publicar)
+    status = 200 if all(r["status"] < 400 for r in resultados) else 207
+    return jsonify({
+        "resultados": resultados,
+        "linhas": linhas,
+        "duracao_ms": round(duracao * 1000, 3),
+        "linhas_por_segundo": round(linhas / duracao, 1) if duracao > 0 else None
+    }), status
+
+
+def cadastrar_tarefas_lote_controller(itens):
+    """
+    Cria várias tarefas em uma transação. Itens inválidos são recusados
+    individualmente; os válidos são gravados juntos.
+    """
+    erro = _validar_lote(itens)
+    if erro:
+        return jsonify({"error": erro}), 400
+    inicio = time.perf_counter()
+    resultados = []
+    validos = []
+    try:
+        for indice, item in enumerate(itens):
+            erro = validar_payload_tarefa(item, create=True) if isinstance(item, dict) else "Item deve ser um objeto"
+            # Nomes de funcionário/setor viram ids (saem do cache das listagens)
+            erro = erro or resolver_referencias_tarefa(item)
+            if erro:
+                resultados.append({"indice": indice, "status": 400, "error": erro})
+            else:
+                validos.append((indice, item))
+        ids = cadastrar_tarefas_lote([item for _, item in validos])
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    for (indice, _), novo_id in zip(validos, ids):
+        resultados.append({"indice": indice, "status": 201, "id": novo_id})
+    resultados.sort(key=lambda r: r["indice"])
+    return _resposta_lote(resultados, len(ids), inicio, {"criadas": ids})
+
+
+def atualizar_tarefas_lote_controller(itens):
+    """Atualiza várias tarefas em uma transação; cada item traz `id` e os campos a alterar."""
+    erro = _validar_lote(itens)
+    if erro:
+        return jsonify({"error": erro}), 400
+    inicio = time.perf_counter()
+    resultados = {}
+    validos = []
+    try:
+        for indice, item in enumerate(itens):
+            if not isinstance(item, dict) or not isinstance(item.get("id"), int):
+                resultados[indice] = {"indice": indice, "status": 400, "error": "Cada item precisa de um id inteiro"}
+                continue
+            erro = resolver_referencias_tarefa(item)
+            if erro:
+                resultados[indice] = {"indice": indice, "status": 400, "error": erro}
+            elif not any(item.get(campo) is not None for campo in CAMPOS_TAREFA):
+                resultados[indice] = {"indice": indice, "status": 400, "error": "Nenhum campo para atualizar"}
+            else:
+                validos.append((indice, item))
+        atualizados = atualizar_tarefas_lote([item for _, item in validos])
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    combinados = {}
+    for indice, item in validos:
+        if item["id"] in atualizados:
+            resultados[indice] = {"indice": indice, "status": 200, "id": item["id"]}
+            # Como no model, itens repetidos para o mesmo id valem juntos (o último vence)
+            combinados.setdefault(item["id"], {}).update(item)
+        else:
+            resultados[indice] = {"indice": indice, "status": 404, "id": item["id"], "error": "Tarefa não encontrada"}
+    historico = []
+    for tarefa_id, anterior in atualizados.items():
+        alterados = _alteracoes_historico(anterior, combinados[tarefa_id])
+        if alterados:
+            historico.append({"tarefa_id": tarefa_id, "acao": "atualizada", **alterados})
+    # Uma chamada só para o lote todo: a espera com a fila cheia não se multiplica pelos itens
+    registrar_alteracoes(historico, usuario_id=_usuario_id())
+    return _resposta_lote([resultados[i] for i in sorted(resultados)], len(atualizados), inicio,
+                          {"atualizadas": sorted(atualizados)})
+
+
+def deletar_tarefas_lote_controller(ids):
+    """Exclui várias tarefas (lista de ids) em uma transação."""
+    erro = _validar_lote(ids)
+    if erro:
+        return jsonify({"error": erro}), 400
+    inicio = time.perf_counter()
+    if not all(isinstance(tarefa_id, int) for tarefa_id in ids):
+        return jsonify({"error": "Envie uma lista de ids inteiros"}), 400
+    try:
+        excluidos = deletar_tarefas_lote(ids)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    registrar_alteracoes([{"tarefa_id": tarefa_id, "acao": "excluida"} for tarefa_id in sorted(excluidos)],
+                         usuario_id=_usuario_id())
+    resultados = [
+        {"indice": indice, "status": 200, "id": tarefa_id} if tarefa_id in excluidos
+        else {"indice": indice, "status": 404, "id": tarefa_id, "error": "Tarefa não encontrada"}
+        for indice, tarefa_id in enumerate(ids)
+    ]
+    return _resposta_lote(resultados, len(excluidos), inicio, {"excluidas": sorted(excluidos)})
+
+
+def ler_filtros_tarefa(args: Dict[str, Any]):
+    """
+    Converte os parâmetros de consulta de GET /tarefas em filtros para o model.
+    Retorna (filtros, erro).
+    """
+    filtros = {}
+    for campo in ["funcionario", "setor", "status"]:
+        if args.get(campo):
+            filtros[campo] = args[campo]
+    for campo in ["funcionario_id", "setor_id", "prioridade"]:
+        if args.get(campo):
+            try:
+                filtros[campo] = int(args[campo])
+            except ValueError:
+                return None, f"{campo} deve ser um número inteiro"
+    for campo in ["prazo_de", "prazo_ate"]:
+        if args.get(campo):
+            try:
+                filtros[campo] = datetime.strptime(args[campo], "%Y-%m-%d").date()
+            except ValueError:
+                return None, f"{campo} deve estar no formato AAAA-MM-DD"
+    return filtros, None
+
+
+def ler_paginacao(args: Dict[str, Any]):
+    """limite (dentro de paginacao_config) e cursor de GET /tarefas. Retorna (limite, cursor, erro)."""
+    try:
+        limite = int(args.get("limite", paginacao_config['limite_padrao']))
+        cursor = int(args["cursor"]) if args.get("cursor") else None
+    except ValueError:
+        return None, None, "limite e cursor devem ser números inteiros"
+    return max(1, min(limite, paginacao_config['limite_max'])), cursor, None
+
+
+def listar_tarefas_controller(args: Dict[str, Any] = None):
+    """
+    Lista tarefas com filtros opcionais e paginação por cursor.
+    O corpo continua sendo a lista de tarefas; o cursor da próxima página
+    vai no cabeçalho X-Proximo-Cursor (ausente na última página).
+    """
+    args = args or {}
+    if "since" in args:
+        return sincronizar_tarefas_controller(args)
+    filtros, erro = ler_filtros_tarefa(args)
+    if erro:
+        return jsonify({"error": erro}), 400
+    limite, cursor, erro = ler_paginacao(args)
+    if erro:
+        return jsonify({"error": erro}), 400
+
+    try:
+        # Busca um registro a mais só para saber se existe próxima página
+        tarefas = listar_tarefas(filtros, apos_id=cursor, limite=limite + 1)
+        resposta = jsonify(tarefas[:limite])
+        if len(tarefas) > limite:
+            resposta.headers["X-Proximo-Cursor"] = str(tarefas[limite - 1]["id"])
+        return resposta, 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def ler_busca(args: Dict[str, Any]):
+    """
+    Termos, filtros, limite e cursor de GET /tarefas/busca.
+    O cursor é "relevancia,id" da última tarefa da página. Retorna (termos, filtros, limite, cursor, erro).
+    """
+    termos = termos_busca(args.get("q", ""))
+    if not termos:
+        return None, None, None, None, f"q deve ter ao menos um termo com {busca_config['tamanho_minimo_termo']} letras ou mais"
+    filtros, erro = ler_filtros_tarefa(args)
+    if erro:
+        return None, None, None, None, erro
+    try:
+        limite = int(args.get("limite", paginacao_config['limite_padrao']))
+        cursor = None
+        if args.get("cursor"):
+            relevancia, tarefa_id = args["cursor"].split(",")
+            cursor = (float(relevancia), int(tarefa_id))
+    except ValueError:
+        return None, None, None, None, "limite deve ser um número inteiro e cursor o valor de X-Proximo-Cursor"
+    return termos, filtros, max(1, min(limite, paginacao_config['limite_max'])), cursor, None
+
+
+def cursor_busca(tarefa: Dict[str, Any]) -> str:
+    # repr preserva o float exato, para a comparação do cursor no banco
+    return f"{float(tarefa['relevancia'])!r},{tarefa['id']}"
+
+
+def buscar_tarefas_controller(args: Dict[str, Any] = None):
+    """
+    Busca textual em título e descrição (?q=), combinável com os filtros de
+    GET /tarefas. Resultados em ordem de relevância, com o mesmo esquema de
+    cursor no cabeçalho X-Proximo-Cursor.
+    """
+    termos, filtros, limite, cursor, erro = ler_busca(args or {})
+    if erro:
+        return jsonify({"error": erro}), 400
+
     try:
-        return jsonify(listar_tarefas()), 200
+        tarefas = buscar_tarefas(termos, filtros, apos=cursor, limite=limite + 1)
+        resposta = jsonify(tarefas[:limite])
+        if len(tarefas) > limite:
+            resposta.headers["X-Proximo-Cursor"] = cursor_busca(tarefas[limite - 1])
+        return resposta, 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+FORMATOS_EXPORTACAO = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json",
+}
+
+
+class ExportacaoNDJSON:
+    """
+    Formata a exportação bloco a bloco: `bloco(linhas)` para cada bloco lido
+    do banco e `fim()` no final.
+    """
+
+    def __init__(self, dumps):
+        self.dumps = dumps
+
+    def bloco(self, linhas) -> str:
+        return "".join(self.dumps(linha) + "\n" for linha in linhas)
+
+    def fim(self) -> str:
+        return ""
+
+
+class ExportacaoCSV(ExportacaoNDJSON):
+    def __init__(self, dumps):
+        super().__init__(dumps)
+        self.buffer = io.StringIO()
+        self.escritor = csv.DictWriter(self.buffer, fieldnames=COLUNAS_TAREFA, lineterminator="\n")
+        self.escritor.writeheader()
+
+    def _esvaziar(self) -> str:
+        texto = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return texto
+
+    def bloco(self, linhas) -> str:
+        self.escritor.writerows(linhas)
+        return self._esvaziar()
+
+    def fim(self) -> str:
+        # Sem linhas o cabeçalho ainda está no buffer
+        return self._esvaziar()
+
+
+class ExportacaoJSON(ExportacaoNDJSON):
+    def __init__(self, dumps):
+        super().__init__(dumps)
+        self.separador = "["
+
+    def bloco(self, linhas) -> str:
+        texto = self.separador + ",".join(self.dumps(linha) for linha in linhas)
+        self.separador = ","
+        return texto
+
+    def fim(self) -> str:
+        return "[]" if self.separador == "[" else "]"
+
+
+EXPORTADORES = {"ndjson": ExportacaoNDJSON, "csv": ExportacaoCSV, "json": ExportacaoJSON}
+
+
+def _gerar_exportacao(exportador, blocos):
+    for bloco in blocos:
+        yield exportador.bloco(bloco)
+    final = exportador.fim()
+    if final:
+        yield final
+
+
+def exportar_tarefas_controller(args: Dict[str, Any] = None):
+    """
+    Exporta todas as tarefas filtradas (mesmos filtros de GET /tarefas) em
+    NDJSON, CSV ou JSON, enviando bloco a bloco enquanto o banco entrega as
+    linhas. A memória usada não depende do tamanho da exportação.
+    """
+    args = args or {}
+    formato = args.get("formato", "ndjson")
+    if formato not in FORMATOS_EXPORTACAO:
+        return jsonify({"error": f"formato deve ser um de: {', '.join(FORMATOS_EXPORTACAO)}"}), 400
+    filtros, erro = ler_filtros_tarefa(args)
+    if erro:
+        return jsonify({"error": erro}), 400
+
+    blocos = exportar_tarefas(filtros, exportacao_config['linhas_por_bloco'])
+    try:
+        # Lê o primeiro bloco antes de enviar o status, para que uma falha
+        # na consulta ainda vire um 500 em vez de um corpo truncado
+        primeiro = next(blocos, None)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    def todos():
+        if primeiro is not None:
+            yield primeiro
+            yield from blocos
+
+    exportador = EXPORTADORES[formato](current_app.json.dumps)
+    return Response(
+        stream_with_context(_gerar_exportacao(exportador, todos())),
+        content_type=FORMATOS_EXPORTACAO[formato],
+        headers={"Content-Disposition": f"attachment; filename=tarefas.{formato}", "X-Accel-Buffering": "no"}
+    )
+
+
+def sincronizar_tarefas_controller(args: Dict[str, Any]):
+    """
+    Modo delta de GET /tarefas?since=<versao>: só o que mudou desde a versão
+    informada. O cliente guarda o campo `versao` da resposta e repete enquanto
+    `mais` for verdadeiro. since=0 traz a base completa.
+    """
+    try:
+        desde = int(args.get("since") or 0)
+        limite = int(args.get("limite", paginacao_config['limite_padrao']))
+    except ValueError:
+        return jsonify({"error": "since e limite devem ser números inteiros"}), 400
+    if desde < 0:
+        return jsonify({"error": "since não pode ser negativo"}), 400
+    limite = max(1, min(limite, paginacao_config['limite_max']))
+
+    try:
+        return jsonify(listar_alteracoes_tarefas(desde, limite)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def painel_controller(args: Dict[str, Any] = None):
+    """
+    Carga inicial dos dashboards em uma resposta: usuários, setores e a
+    primeira página de tarefas (mesmos filtros e cursor de GET /tarefas, com
+    o próximo cursor no cabeçalho X-Proximo-Cursor).
+    `incluir=usuarios,setores,tarefas` escolhe os blocos.
+    """
+    args = args or {}
+    filtros, erro = ler_filtros_tarefa(args)
+    if erro:
+        return jsonify({"error": erro}), 400
+    limite, cursor, erro = ler_paginacao(args)
+    if erro:
+        return jsonify({"error": erro}), 400
+    incluir = tuple(parte.strip() for parte in args.get("incluir", "usuarios,setores,tarefas").split(","))
+
+    try:
+        painel = carregar_painel(filtros, apos_id=cursor, limite=limite + 1, incluir=incluir)
+        tarefas = painel.get("tarefas")
+        if tarefas is not None:
+            painel["tarefas"] = tarefas[:limite]
+        resposta = jsonify(painel)
+        if tarefas is not None and len(tarefas) > limite:
+            resposta.headers["X-Proximo-Cursor"] = str(tarefas[limite - 1]["id"])
+        return resposta, 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def estatisticas_tarefas_controller(args: Dict[str, Any] = None):
+    """
+    Resumo das tarefas para os cards dos dashboards: totais por status, setor,
+    funcionario e prioridade, e quantas estão atrasadas.
+    """
+    filtros, erro = ler_filtros_tarefa(args or {})
+    if erro:
+        return jsonify({"error": erro}), 400
+    try:
+        return jsonify(resumir_estatisticas(estatisticas_tarefas(filtros))), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def resumir_estatisticas(grupos) -> Dict[str, Any]:
+    # Soma as linhas do GROUP BY de estatisticas_tarefas em totais por dimensão
+    resumo = {
+        "total": 0,
+        "atrasadas": 0,
+        "por_status": {},
+        "por_setor": {},
+        "por_funcionario": {},
+        "por_prioridade": {},
+    }
+    for grupo in grupos:
+        total = int(grupo["total"])
+        atrasadas = int(grupo["atrasadas"] or 0)
+        resumo["total"] += total
+        resumo["atrasadas"] += atrasadas
+        for dimensao in ["status", "setor", "funcionario", "prioridade"]:
+            chave = str(grupo[dimensao])
+            contagem = resumo[f"por_{dimensao}"].setdefault(chave, {"total": 0, "atrasadas": 0})
+            contagem["total"] += total
+            contagem["atrasadas"] += atrasadas
+    return resumo
+
+
 def listar_tarefa_por_id_controller(tarefa_id: int):
     try:
         tarefa = listar_tarefa_por_id(tarefa_id)
@@ -198,10 +730,16 @@ def listar_tarefa_por_id_controller(tarefa_id: int):
 
 def atualizar_tarefa_controller(tarefa_id: int, data: Dict[str, Any]):
     try:
-        if not listar_tarefa_por_id(tarefa_id):
+        data = data or {}
+        erro = resolver_referencias_tarefa(data)
+        if erro:
+            return jsonify({"error": erro}), 400
+        atualizada = atualizar_tarefa(tarefa_id, data)
+        if not atualizada:
             return jsonify({"error": "Tarefa não encontrada"}), 404
-        atualizar_tarefa(tarefa_id, data)
-        tarefa = listar_tarefa_por_id(tarefa_id)
+        tarefa, anterior = atualizada
+        publicar_evento_tarefa("tarefa_atualizada", tarefa)
+        registrar_historico_tarefa(tarefa_id, anterior, data)
         return jsonify({"message": "Tarefa atualizada com sucesso", "tarefa": tarefa}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -209,9 +747,55 @@ def atualizar_tarefa_controller(tarefa_id: int, data: Dict[str, Any]):
 
 def deletar_tarefa_controller(tarefa_id: int):
     try:
-        if not listar_tarefa_por_id(tarefa_id):
+        if not deletar_tarefa(tarefa_id):
             return jsonify({"error": "Tarefa não encontrada"}), 404
-        deletar_tarefa(tarefa_id)
+        publicar_evento_tarefa("tarefa_excluida", {"id": tarefa_id})
+        registrar_alteracao(tarefa_id, "excluida", usuario_id=_usuario_id())
         return jsonify({"message": "Tarefa excluída com sucesso"}), 200
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+
+def listar_historico_tarefa_controller(tarefa_id: int, args: Dict[str, Any] = None):
+    """
+    Histórico de status e responsável da tarefa, do mais recente ao mais
+    antigo, com o cursor no cabeçalho X-Proximo-Cursor como em GET /tarefas.
+    A gravação é em segundo plano: as alterações do último segundo
+    (historico_config['intervalo']) podem ainda não aparecer.
+    """
+    limite, cursor, erro = ler_paginacao(args or {})
+    if erro:
+        return jsonify({"error": erro}), 400
+
+    try:
+        historico = listar_historico_tarefa(tarefa_id, apos_id=cursor, limite=limite + 1)
+        resposta = jsonify(historico[:limite])
+        if len(historico) > limite:
+            resposta.headers["X-Proximo-Cursor"] = str(historico[limite - 1]["id"])
+        return resposta, 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def estatisticas_pool_controller():
+    # Uso do pool de conexões (em uso, ociosas, tempo de espera) para dimensionamento
+    return jsonify(estatisticas_pool()), 200
+
+
+def metricas_controller():
+    # Formato de exposição do Prometheus, com o estado do pool e dos caches como gauges.
+    # Valores do worker que atendeu (processo_pid diz qual), não a soma dos workers
+    texto = exportar_metricas({
+        "db_pool": estatisticas_pool(),
+        "cache": estatisticas_cache(),
+        "cache_tokens": cache_tokens.estatisticas(),
+        "processo": {"pid": os.getpid(), **memoria_processo()},
+        "historico": estatisticas_historico(),
+    })
+    return Response(texto, mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+def estatisticas_cache_controller():
+    # Acertos/falhas do cache de setores e usuários e do cache de tokens
+    return jsonify({**estatisticas_cache(), "tokens": cache_tokens.estatisticas()}), 200
+
@@ -0,0 +1,233 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, AsyncIterator, Iterator, Optional
+
+from src.config import eventos_config
+
+
+class LimiteAssinantes(Exception):
+    """Número máximo de conexões abertas no feed de eventos foi atingido."""
+
+
+class Assinante:
+    """
+    Fila de eventos de uma conexão SSE. O buffer é limitado: se o cliente
+    ficar para trás, os eventos mais antigos são descartados e ele recebe
+    um evento `resync` para buscar as alterações por GET /tarefas?since=.
+    """
+
+    def __init__(self, tamanho_buffer: int):
+        self._fila = deque(maxlen=tamanho_buffer)
+        self._cond = threading.Condition()
+        self.perdeu_eventos = False
+        self.ativo = True
+
+    def entregar(self, evento: str) -> None:
+        with self._cond:
+            if len(self._fila) == self._fila.maxlen:
+                self.perdeu_eventos = True
+            self._fila.append(evento)
+            self._cond.notify()
+
+    def proximo(self, timeout: float) -> Optional[str]:
+        """Próximo evento, ou None se nada chegou dentro do timeout."""
+        with self._cond:
+            if not self._fila and self.ativo:
+                self._cond.wait(timeout)
+            return self._retirar()
+
+    def _retirar(self) -> Optional[str]:
+        # Chamado com self._cond travado
+        if self.perdeu_eventos:
+            self.perdeu_eventos = False
+            self._fila.clear()
+            return "event: resync\ndata: {}\n\n"
+        return self._fila.popleft() if self._fila else None
+
+    def encerrar(self) -> None:
+        with self._cond:
+            self.ativo = False
+            self._cond.notify()
+
+    def pedir_resync(self) -> None:
+        # Eventos podem ter se perdido fora da fila (ex.: conexão com o Redis caiu)
+        with self._cond:
+            self.perdeu_eventos = True
+            self._cond.notify()
+
+
+class AssinanteAsync(Assinante):
+    """
+    Assinante do modo ASGI: a espera pelo próximo evento é um await no event
+    loop, então cada conexão SSE aberta não ocupa uma thread.
+    """
+
+    def __init__(self, tamanho_buffer: int):
+        super().__init__(tamanho_buffer)
+        self._loop = asyncio.get_running_loop()
+        self._sinal = asyncio.Event()
+
+    def _acordar(self) -> None:
+        # publicar() pode vir de outra thread (ex.: executor); o Event só é mexido no loop
+        try:
+            self._loop.call_soon_threadsafe(self._sinal.set)
+        except RuntimeError:
+            pass  # loop já encerrado
+
+    def entregar(self, evento: str) -> None:
+        super().entregar(evento)
+        self._acordar()
+
+    def encerrar(self) -> None:
+        super().encerrar()
+        self._acordar()
+
+    def pedir_resync(self) -> None:
+        super().pedir_resync()
+        self._acordar()
+
+    async def proximo_async(self, timeout: float) -> Optional[str]:
+        """Próximo evento, ou None se nada chegou dentro do timeout."""
+        # Limpa antes de olhar a fila: um evento entregue depois disso marca o sinal de novo
+        self._sinal.clear()
+        with self._cond:
+            vazia = not self._fila and self.ativo
+        if vazia:
+            try:
+                await asyncio.wait_for(self._sinal.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        with self._cond:
+            return self._retirar()
+
+
+class CanalEventos:
+    """Distribui eventos de tarefas para as conexões SSE deste processo."""
+
+    def __init__(self, tamanho_buffer: int = 100, max_assinantes: int = 1000):
+        self.tamanho_buffer = tamanho_buffer
+        self.max_assinantes = max_assinantes
+        self._assinantes = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.publicados = 0
+
+    def assinar(self, classe: type = Assinante) -> Assinante:
+        with self._lock:
+            if len(self._assinantes) >= self.max_assinantes:
+                raise LimiteAssinantes("Limite de conexões no feed de eventos atingido")
+            assinante = classe(self.tamanho_buffer)
+            self._assinantes.add(assinante)
+            return assinante
+
+    def cancelar(self, assinante: Assinante) -> None:
+        assinante.encerrar()
+        with self._lock:
+            self._assinantes.discard(assinante)
+
+    def publicar(self, tipo: str, dados_json: str) -> None:
+        # O evento é formatado uma única vez e compartilhado entre os assinantes
+        with self._lock:
+            evento = f"id: {next(self._ids)}\nevent: {tipo}\ndata: {dados_json}\n\n"
+            self.publicados += 1
+        self._distribuir(evento)
+
+    def _distribuir(self, evento: str) -> None:
+        with self._lock:
+            assinantes = list(self._assinantes)
+        for assinante in assinantes:
+            assinante.entregar(evento)
+
+    def transmitir(self, assinante: Assinante, heartbeat: float) -> Iterator[str]:
+        """Gerador da resposta text/event-stream, com comentário de heartbeat."""
+        try:
+            yield f"retry: {eventos_config['retry_ms']}\n\n"
+            while assinante.ativo:
+                evento = assinante.proximo(heartbeat)
+                yield evento if evento is not None else ": ping\n\n"
+        finally:
+            self.cancelar(assinante)
+
+    async def transmitir_async(self, assinante: AssinanteAsync, heartbeat: float) -> AsyncIterator[str]:
+        """Versão async de transmitir, para o modo ASGI."""
+        try:
+            yield f"retry: {eventos_config['retry_ms']}\n\n"
+            while assinante.ativo:
+                evento = await assinante.proximo_async(heartbeat)
+                yield evento if evento is not None else ": ping\n\n"
+        finally:
+            self.cancelar(assinante)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"assinantes": len(self._assinantes), "publicados": self.publicados}
+
+
+class CanalEventosRedis(CanalEventos):
+    """
+    Canal compartilhado entre workers e processos pelo pub/sub do Redis:
+    publicar() envia ao Redis e uma thread por processo entrega o que chega
+    aos assinantes locais. O id dos eventos vem de um contador no Redis.
+    Requer o pacote `redis`.
+    """
+
+    def __init__(self, tamanho_buffer: int = 100, max_assinantes: int = 1000,
+                 url: str = "redis://localhost:6379/0", canal: str = "myattire:eventos_tarefas"):
+        super().__init__(tamanho_buffer, max_assinantes)
+        import redis  # dependência opcional, só carregada quando este backend é usado
+        self._cliente = redis.Redis.from_url(url)
+        self.canal = canal
+        self._ouvinte: Optional[threading.Thread] = None
+        os.register_at_fork(after_in_child=self._descartar_apos_fork)
+
+    def _descartar_apos_fork(self) -> None:
+        # A thread ouvinte não existe no worker forkado: ele inicia a sua
+        self._ouvinte = None
+        self._lock = threading.Lock()
+
+    def assinar(self, classe: type = Assinante) -> Assinante:
+        assinante = super().assinar(classe)
+        with self._lock:
+            if self._ouvinte is None:
+                self._ouvinte = threading.Thread(target=self._ouvir, name="eventos-redis", daemon=True)
+                self._ouvinte.start()
+        return assinante
+
+    def publicar(self, tipo: str, dados_json: str) -> None:
+        evento = f"id: {self._cliente.incr(self.canal + ':ids')}\nevent: {tipo}\ndata: {dados_json}\n\n"
+        self._cliente.publish(self.canal, evento)
+        with self._lock:
+            self.publicados += 1
+
+    def _ouvir(self) -> None:
+        primeira = True
+        while True:
+            try:
+                pubsub = self._cliente.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.canal)
+                if not primeira:
+                    # O que foi publicado enquanto estava desconectado se perdeu
+                    with self._lock:
+                        assinantes = list(self._assinantes)
+                    for assinante in assinantes:
+                        assinante.pedir_resync()
+                primeira = False
+                for mensagem in pubsub.listen():
+                    self._distribuir(mensagem["data"].decode("utf-8"))
+            except Exception as e:
+                print(f"Erro no canal de eventos do Redis: {str(e)}")
+                time.sleep(1)
+
+
+def _criar_canal() -> CanalEventos:
+    if eventos_config.get('backend') == 'redis':
+        return CanalEventosRedis(eventos_config['buffer_por_assinante'], eventos_config['max_assinantes'],
+                                 eventos_config['redis_url'], eventos_config['redis_canal'])
+    return CanalEventos(eventos_config['buffer_por_assinante'], eventos_config['max_assinantes'])
+
+
+canal_tarefas = _criar_canal()
@@ -0,0 +1,204 @@
+"""
+Histórico de status e responsável das tarefas, gravado em segundo plano
+(write-behind). Os controllers só colocam a alteração numa fila em memória;
+uma thread junta as alterações e grava em INSERTs de várias linhas quando
+a fila atinge historico_config['tamanho_lote'] ou `intervalo` segundos
+depois da primeira alteração pendente. Assim a atualização e a exclusão
+de tarefas não esperam mais uma ida ao banco.
+
+O que ainda está na fila é gravado ao encerrar o processo (atexit e o hook
+worker_exit de servir.py), por até historico_config['espera_encerramento']
+segundos; um processo morto com SIGKILL perde até um lote.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from src.config import historico_config
+from src.metricas import historico_gravados, historico_descartados
+
+# Marca de fim na fila: a thread grava o que tiver e termina
+_FIM = object()
+
+
+class GravadorHistorico:
+    """Fila limitada de alterações e a thread que as grava em lotes com `gravar(lista)`."""
+
+    def __init__(self, gravar: Callable[[List[Dict[str, Any]]], None], tamanho_fila: int = 10000,
+                 tamanho_lote: int = 200, intervalo: float = 1.0):
+        self._gravar = gravar
+        self._fila = queue.Queue(maxsize=tamanho_fila)
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.encerrado = False
+        self._thread = threading.Thread(target=self._executar, name="historico", daemon=True)
+        self._thread.start()
+
+    def registrar(self, alteracao: Dict[str, Any], bloquear: bool = True, espera: float = 0.05) -> bool:
+        """
+        Enfileira a alteração. Com a fila cheia, espera até `espera` segundos
+        por uma vaga (ou nenhum, com bloquear=False) e então descarta,
+        contando em historico_descartados_total. Retorna se foi enfileirada.
+        """
+        return self.registrar_varias([alteracao], bloquear, espera) == 1
+
+    def registrar_varias(self, alteracoes: List[Dict[str, Any]], bloquear: bool = True,
+                         espera: float = 0.05) -> int:
+        """
+        `registrar` de várias alterações, com a `espera` valendo para todas
+        juntas: um lote grande não multiplica o tempo bloqueado. Com a fila
+        cheia no fim do prazo, o restante é descartado. Retorna quantas foram
+        enfileiradas.
+        """
+        if self.encerrado:
+            historico_descartados.incrementar(len(alteracoes), "encerrado")
+            return 0
+        prazo = time.monotonic() + espera
+        for enfileiradas, alteracao in enumerate(alteracoes):
+            try:
+                if bloquear:
+                    self._fila.put(alteracao, timeout=max(0.0, prazo - time.monotonic()))
+                else:
+                    self._fila.put_nowait(alteracao)
+            except queue.Full:
+                historico_descartados.incrementar(len(alteracoes) - enfileiradas, "fila_cheia")
+                return enfileiradas
+        return len(alteracoes)
+
+    def _executar(self) -> None:
+        lote = []
+        prazo = 0.0
+        while True:
+            # Sem nada pendente espera a próxima alteração; com pendências, só até o prazo do lote
+            espera = max(0.0, prazo - time.monotonic()) if lote else None
+            try:
+                item = self._fila.get(timeout=espera)
+            except queue.Empty:
+                item = None
+            fim = item is _FIM
+            if item is not None and not fim:
+                if not lote:
+                    prazo = time.monotonic() + self.intervalo
+                lote.append(item)
+            if lote and (fim or len(lote) >= self.tamanho_lote or time.monotonic() >= prazo):
+                self._descarregar(lote)
+                lote = []
+            if fim:
+                return
+
+    def _descarregar(self, lote: List[Dict[str, Any]]) -> None:
+        try:
+            self._gravar(lote)
+            historico_gravados.incrementar(len(lote))
+        except Exception:
+            # O model já registrou o erro; o lote não é repetido para não travar a fila
+            historico_descartados.incrementar(len(lote), "erro_banco")
+
+    def fechar(self, timeout: Optional[float] = None) -> None:
+        """
+        Grava o que está na fila e encerra a thread, esperando no total até
+        `timeout` segundos. Com o banco travado e a fila cheia, desiste no
+        prazo e conta o que ficou na fila como descartado, para o processo
+        conseguir terminar.
+        """
+        if self.encerrado:
+            return
+        self.encerrado = True
+        prazo = None if timeout is None else time.monotonic() + timeout
+        try:
+            self._fila.put(_FIM, timeout=timeout)
+            self._thread.join(None if prazo is None else max(0.0, prazo - time.monotonic()))
+        except queue.Full:
+            pass
+        if self._thread.is_alive():
+            historico_descartados.incrementar(self._fila.qsize(), "encerramento")
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {"pendentes": self._fila.qsize(), "capacidade": self._fila.maxsize}
+
+
+_gravador: Optional[GravadorHistorico] = None
+_gravador_lock = threading.Lock()
+
+
+def _descartar_apos_fork() -> None:
+    # A thread gravadora não existe no processo filho: cada worker cria a sua
+    global _gravador, _gravador_lock
+    _gravador = None
+    _gravador_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_descartar_apos_fork)
+
+
+def obter_gravador() -> GravadorHistorico:
+    # Criado na primeira alteração, como o pool de conexões
+    global _gravador
+    if _gravador is None:
+        with _gravador_lock:
+            if _gravador is None:
+                from src.models import cadastrar_historico
+                _gravador = GravadorHistorico(
+                    cadastrar_historico,
+                    tamanho_fila=historico_config['tamanho_fila'],
+                    tamanho_lote=historico_config['tamanho_lote'],
+                    intervalo=historico_config['intervalo'],
+                )
+    return _gravador
+
+
+def registrar_alteracao(tarefa_id: int, acao: str, status: Optional[str] = None,
+                        funcionario_id: Optional[int] = None, usuario_id: Optional[int] = None,
+                        bloquear: Optional[bool] = None) -> bool:
+    """
+    Enfileira uma entrada do histórico ('atualizada' ou 'excluida'), com o
+    novo status e/ou responsável e o usuário que fez a alteração.
+    `bloquear` None segue historico_config['ao_encher'].
+    """
+    alteracao = {"tarefa_id": tarefa_id, "acao": acao, "status": status, "funcionario_id": funcionario_id}
+    return registrar_alteracoes([alteracao], usuario_id, bloquear) == 1
+
+
+def registrar_alteracoes(alteracoes: List[Dict[str, Any]], usuario_id: Optional[int] = None,
+                         bloquear: Optional[bool] = None) -> int:
+    """
+    Enfileira as entradas de uma operação em lote (/tarefas/lote), cada uma
+    com tarefa_id, acao e, opcionalmente, status e funcionario_id.
+    historico_config['espera_max'] vale para o lote inteiro.
+    Retorna quantas foram enfileiradas.
+    """
+    if not historico_config['ativo'] or not alteracoes:
+        return 0
+    if bloquear is None:
+        bloquear = historico_config['ao_encher'] == 'bloquear'
+    alterado_em = datetime.now().replace(microsecond=0)
+    entradas = [
+        {
+            "tarefa_id": alteracao["tarefa_id"],
+            "acao": alteracao["acao"],
+            "status": alteracao.get("status"),
+            "funcionario_id": alteracao.get("funcionario_id"),
+            "usuario_id": usuario_id,
+            "alterado_em": alterado_em,
+        }
+        for alteracao in alteracoes
+    ]
+    return obter_gravador().registrar_varias(entradas, bloquear, historico_config['espera_max'])
+
+
+def encerrar_historico() -> None:
+    if _gravador is not None:
+        _gravador.fechar(historico_config['espera_encerramento'])
+
+
+atexit.register(encerrar_historico)
+
+
+def estatisticas_historico() -> Dict[str, Any]:
+    if _gravador is None:
+        return {"pendentes": 0, "capacidade": historico_config['tamanho_fila']}
+    return _gravador.estatisticas()
@@ -0,0 +1,268 @@
+import contextvars
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Dict, Any, List, Tuple
+
+import pymysql
+from flask import request, g
+
+from src.config import metricas_config
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._series: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+        _registro.append(self)
+
+    def _rotulos_texto(self, valores: tuple, extra: str = "") -> str:
+        pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(self.rotulos, valores)]
+        if extra:
+            pares.append(extra)
+        return "{" + ",".join(pares) + "}" if pares else ""
+
+    def exportar(self) -> List[str]:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for valores, serie in series:
+            linhas.extend(self._exportar_serie(valores, serie))
+        return linhas
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def incrementar(self, valor: float = 1, *rotulos) -> None:
+        with self._lock:
+            self._series[rotulos] = self._series.get(rotulos, 0) + valor
+
+    def _exportar_serie(self, valores, total):
+        return [f"{self.nome}{self._rotulos_texto(valores)} {total}"]
+
+
+class Histograma(_Metrica):
+    """Histograma no formato do Prometheus (buckets cumulativos, _sum e _count)."""
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...] = (), buckets: List[float] = None):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = sorted(buckets or metricas_config['buckets'])
+
+    def observar(self, valor: float, *rotulos) -> None:
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(rotulos)
+            if serie is None:
+                # contagens por bucket (+Inf no fim), soma e total
+                serie = self._series[rotulos] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def _exportar_serie(self, valores, serie):
+        contagens, soma, total = serie
+        linhas = []
+        acumulado = 0
+        for limite, contagem in zip(self.buckets + [float("inf")], contagens):
+            acumulado += contagem
+            le = "+Inf" if limite == float("inf") else repr(limite)
+            rotulos = self._rotulos_texto(valores, 'le="' + le + '"')
+            linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+        linhas.append(f"{self.nome}_sum{self._rotulos_texto(valores)} {soma}")
+        linhas.append(f"{self.nome}_count{self._rotulos_texto(valores)} {total}")
+        return linhas
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+_registro: List[_Metrica] = []
+
+requisicoes = Histograma("http_requisicao_segundos", "Latência das rotas até o envio dos cabeçalhos",
+                         ("rota", "metodo", "status"))
+funcoes_modelo = Histograma("modelo_funcao_segundos", "Duração das funções de src/models.py", ("funcao",))
+consultas = Histograma("db_consulta_segundos", "Duração de cada instrução SQL", ("funcao",))
+linhas_consulta = Contador("db_linhas_total", "Linhas retornadas ou afetadas pelas instruções SQL", ("funcao",))
+consultas_lentas = Contador("db_consultas_lentas_total", "Instruções acima do limite do log de consultas lentas",
+                            ("funcao",))
+espera_conexao = Histograma("db_conexao_espera_segundos", "Tempo para obter uma conexão do pool (inclui abrir)")
+bcrypt = Histograma("senha_bcrypt_segundos", "Duração do bcrypt por operação", ("operacao",))
+historico_gravados = Contador("historico_gravados_total", "Alterações do histórico de tarefas gravadas no banco")
+historico_descartados = Contador("historico_descartados_total", "Alterações do histórico de tarefas perdidas",
+                                 ("motivo",))
+
+# Função de src/models.py em execução, usada como rótulo das instruções SQL
+_funcao_atual = contextvars.ContextVar("funcao_modelo", default="outra")
+
+
+def medir_funcao(func):
+    """
+    Decorador dos models: mede a duração da função e rotula com o nome dela
+    as instruções SQL executadas dentro. Funciona também com geradores.
+    """
+    nome = func.__name__
+
+    if inspect.isgeneratorfunction(func):
+        @wraps(func)
+        def gerador(*args, **kwargs):
+            # O rótulo vale só enquanto o gerador executa, não entre um bloco e outro
+            inicio = time.perf_counter()
+            interno = func(*args, **kwargs)
+            try:
+                while True:
+                    token = _funcao_atual.set(nome)
+                    try:
+                        item = next(interno)
+                    except StopIteration:
+                        return
+                    finally:
+                        _funcao_atual.reset(token)
+                    yield item
+            finally:
+                interno.close()
+                funcoes_modelo.observar(time.perf_counter() - inicio, nome)
+        return gerador
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _funcao_atual.set(nome)
+        inicio = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            funcoes_modelo.observar(time.perf_counter() - inicio, nome)
+            _funcao_atual.reset(token)
+    return wrapper
+
+
+def _formato_parametros(args) -> str:
+    # Só os tipos (e o tamanho das listas): os valores podem ter senhas e dados pessoais
+    if args is None:
+        return "()"
+    if isinstance(args, dict):
+        return "{" + ", ".join(f"{chave}: {type(valor).__name__}" for chave, valor in args.items()) + "}"
+    if isinstance(args, (list, tuple)):
+        return "(" + ", ".join(
+            f"{type(valor).__name__}[{len(valor)}]" if isinstance(valor, (list, tuple)) else type(valor).__name__
+            for valor in args
+        ) + ")"
+    return type(args).__name__
+
+
+def _registrar_consulta(query: str, args, duracao: float, linhas: int) -> None:
+    funcao = _funcao_atual.get()
+    consultas.observar(duracao, funcao)
+    # Cursores sem buffer não sabem o número de linhas na execução
+    if 0 <= linhas < 2 ** 63:
+        linhas_consulta.incrementar(linhas, funcao)
+    limite_ms = metricas_config['consulta_lenta_ms']
+    if limite_ms is not None and duracao * 1000 >= limite_ms:
+        consultas_lentas.incrementar(1, funcao)
+        sql = " ".join(query.split())[:metricas_config['consulta_lenta_max_sql']]
+        print(f"[consulta lenta] {duracao * 1000:.1f} ms em {funcao}: {sql} parâmetros={_formato_parametros(args)}")
+
+
+class _ExecucaoMedida:
+    """Mixin dos cursores: mede cada execute (executemany também passa por ele)."""
+
+    def execute(self, query, args=None):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            _registrar_consulta(query, args, time.perf_counter() - inicio, self.rowcount)
+
+
+_classes_medidas: Dict[type, type] = {}
+
+
+def classe_medida(classe: type) -> type:
+    medida = _classes_medidas.get(classe)
+    if medida is None:
+        medida = _classes_medidas[classe] = type(classe.__name__ + "Medido", (_ExecucaoMedida, classe), {})
+    return medida
+
+
+class ConexaoMedida(pymysql.connections.Connection):
+    """Conexão pymysql cujos cursores (de qualquer classe) registram as métricas das instruções."""
+
+    def cursor(self, cursor=None):
+        return super().cursor(classe_medida(cursor or self.cursorclass))
+
+
+def _observar_requisicao(requisicao, inicio: float, resposta) -> None:
+    # O padrão da rota (/tarefas/<int:tarefa_id>), não a URL, para não criar uma série por id
+    rota = requisicao.url_rule.rule if requisicao.url_rule is not None else "desconhecida"
+    requisicoes.observar(time.perf_counter() - inicio, rota, requisicao.method, resposta.status_code)
+
+
+def _inicio_requisicao():
+    g.inicio_requisicao = time.perf_counter()
+
+
+def _fim_requisicao(resposta):
+    inicio = g.pop("inicio_requisicao", None)
+    if inicio is not None:
+        _observar_requisicao(request, inicio, resposta)
+    return resposta
+
+
+def ativar_metricas(app) -> None:
+    if metricas_config['ativo']:
+        app.before_request(_inicio_requisicao)
+        app.after_request(_fim_requisicao)
+
+
+def memoria_processo() -> Dict[str, int]:
+    """
+    Memória do processo em bytes: RSS, PSS (páginas compartilhadas divididas
+    entre os processos que as usam) e privada. Com os workers forkados de
+    servir.py, a memória privada é o custo real de cada worker.
+    Fora do Linux só o pico de RSS está disponível.
+    """
+    try:
+        with open("/proc/self/smaps_rollup", encoding="ascii") as arquivo:
+            campos = {}
+            for linha in arquivo:
+                partes = linha.split()
+                if len(partes) == 3 and partes[2] == "kB":
+                    campos[partes[0].rstrip(":")] = int(partes[1]) * 1024
+        return {
+            "rss_bytes": campos.get("Rss", 0),
+            "pss_bytes": campos.get("Pss", 0),
+            "privada_bytes": campos.get("Private_Clean", 0) + campos.get("Private_Dirty", 0),
+        }
+    except OSError:
+        import resource  # só Unix
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss vem em KB no Linux e em bytes no macOS
+        return {"rss_max_bytes": pico if os.uname().sysname == "Darwin" else pico * 1024}
+
+
+def exportar_metricas(extras: Dict[str, Dict[str, Any]] = None) -> str:
+    """
+    Texto no formato de exposição do Prometheus. `extras` acrescenta gauges
+    prontos, ex.: {"db_pool": estatisticas_pool()} vira db_pool_em_uso etc.
+    Os contadores são do processo: com vários workers (servir.py) cada scrape
+    de /metrics vê o worker que atendeu, identificado por processo_pid.
+    """
+    linhas = []
+    for metrica in _registro:
+        linhas.extend(metrica.exportar())
+    for prefixo, valores in (extras or {}).items():
+        for chave, valor in valores.items():
+            if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                linhas.append(f"# TYPE {prefixo}_{chave} gauge")
+                linhas.append(f"{prefixo}_{chave} {valor}")
+    return "\n".join(linhas) + "\n"
@@ -0,0 +1,194 @@
+import os
+import re
+from datetime import date
+from typing import List, Dict, Any, Tuple
+
+from pymysql.cursors import DictCursor
+
+from src.config import armazenamento_config
+from src.pool import nova_conexao
+
+# Scripts SQL numerados (0001_descricao.sql, ...), aplicados em ordem e só para frente.
+# O SQLite tem a sua própria sequência de scripts na subpasta sqlite/
+PASTA_MIGRACOES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migracoes")
+
+
+def _sqlite() -> bool:
+    return armazenamento_config['backend'] == 'sqlite'
+
+
+def _conectar():
+    return nova_conexao()
+
+
+def listar_scripts() -> List[Tuple[str, str]]:
+    """Retorna (versao, caminho) de cada script do backend configurado, em ordem de versão."""
+    pasta = os.path.join(PASTA_MIGRACOES, "sqlite") if _sqlite() else PASTA_MIGRACOES
+    scripts = []
+    for nome in sorted(os.listdir(pasta)):
+        if re.match(r"^\d{4}_.+\.sql$", nome):
+            scripts.append((nome[:-4], os.path.join(pasta, nome)))
+    return scripts
+
+
+def _instrucoes(caminho: str) -> List[str]:
+    # Remove os comentários de linha e separa as instruções por ';' no fim da linha
+    with open(caminho, encoding="utf-8") as arquivo:
+        linhas = [linha for linha in arquivo if not linha.lstrip().startswith("--")]
+    return [instrucao.strip() for instrucao in re.split(r";\s*$", "".join(linhas), flags=re.M) if instrucao.strip()]
+
+
+def _garantir_tabela_controle(cursor) -> None:
+    if _sqlite():
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS migracoes (
+                versao varchar(255) NOT NULL PRIMARY KEY,
+                aplicada_em timestamp NOT NULL DEFAULT (datetime('now', 'localtime'))
+            )
+        """)
+        return
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS migracoes (
+            versao varchar(255) NOT NULL,
+            aplicada_em timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (versao)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+    """)
+
+
+def versoes_aplicadas() -> set:
+    conn = _conectar()
+    try:
+        with conn.cursor() as cursor:
+            _garantir_tabela_controle(cursor)
+            cursor.execute("SELECT versao FROM migracoes")
+            return {linha[0] for linha in cursor.fetchall()}
+    finally:
+        conn.close()
+
+
+def pendentes() -> List[Tuple[str, str]]:
+    aplicadas = versoes_aplicadas()
+    return [(versao, caminho) for versao, caminho in listar_scripts() if versao not in aplicadas]
+
+
+def migrar() -> List[str]:
+    """
+    Aplica os scripts pendentes em ordem e registra cada um na tabela
+    `migracoes`. No MySQL DDL não é transacional: se um script falhar no
+    meio, corrija a base e o script antes de rodar de novo.
+    """
+    aplicadas = []
+    conn = _conectar()
+    try:
+        with conn.cursor() as cursor:
+            _garantir_tabela_controle(cursor)
+            cursor.execute("SELECT versao FROM migracoes")
+            ja_aplicadas = {linha[0] for linha in cursor.fetchall()}
+            for versao, caminho in listar_scripts():
+                if versao in ja_aplicadas:
+                    continue
+                print(f"Aplicando {versao}...")
+                for instrucao in _instrucoes(caminho):
+                    cursor.execute(instrucao)
+                cursor.execute("INSERT INTO migracoes (versao) VALUES (%s)", (versao,))
+                conn.commit()
+                aplicadas.append(versao)
+    except Exception as e:
+        conn.rollback()
+        print(f"Erro ao aplicar migrações: {str(e)}")
+        raise
+    finally:
+        conn.close()
+    return aplicadas
+
+
+# Tabelas que nunca devem ser lidas inteiras pelas consultas verificadas.
+# usuarios e setores ficam de fora: são tabelas de referência pequenas, e o
+# filtro de tarefas pelo nome as percorre de propósito (ver _condicoes_filtro_tarefa)
+TABELAS_SEM_VARREDURA = {"tarefas", "tarefas_excluidas", "tarefas_historico", "tokens_renovacao"}
+
+
+def consultas_indexadas() -> Dict[str, Tuple[str, tuple]]:
+    """
+    As consultas que os models enviam, montadas pelos mesmos builders e
+    constantes de src/models.py, com parâmetros de exemplo. As listagens
+    completas (listar_usuarios, listar_setores, exportar_tarefas sem filtro)
+    ficam de fora: ler a tabela toda é o objetivo delas. A primeira página de
+    listar_tarefas sem filtro também: ela percorre a chave primária em ordem
+    e para no LIMIT.
+    """
+    from src import models  # models importa o pool, que este módulo também usa
+
+    return {
+        "listar_usuario_por_email": (models.SELECT_USUARIO_POR_EMAIL, ("ana@myattire.com",)),
+        "listar_usuario_por_id": (models.SELECT_USUARIO_POR_ID, (1,)),
+        "rotacionar_token_renovacao": (models.SELECT_TOKEN_RENOVACAO, ("0" * 64,)),
+        "listar_tarefa_por_id": (models.SELECT_TAREFA + " WHERE t.id = %s", (1,)),
+        "atualizar_tarefa": (models.SELECT_TAREFA_PARA_ATUALIZAR, (1,)),
+        "listar_tarefas (cursor)": models._query_listar_tarefas(None, 1000, 100),
+        "listar_tarefas (funcionario_id, status)": models._query_listar_tarefas(
+            {"funcionario_id": 2, "status": "pendente"}, None, 100),
+        "listar_tarefas (funcionario_id, status, cursor)": models._query_listar_tarefas(
+            {"funcionario_id": 2, "status": "pendente"}, 1000, 100),
+        "listar_tarefas (funcionario)": models._query_listar_tarefas({"funcionario": "Ana"}, None, 100),
+        "listar_tarefas (setor_id)": models._query_listar_tarefas({"setor_id": 1}, None, 100),
+        "listar_tarefas (setor)": models._query_listar_tarefas({"setor": "TI"}, None, 100),
+        "listar_tarefas (status)": models._query_listar_tarefas({"status": "pendente"}, None, 100),
+        "listar_tarefas (prazo)": models._query_listar_tarefas(
+            {"prazo_de": date(2025, 1, 1), "prazo_ate": date(2025, 1, 31)}, None, 100),
+        "exportar_tarefas (setor_id)": models._query_listar_tarefas({"setor_id": 1}, None, None),
+        "buscar_tarefas": models._query_buscar_tarefas(["relatorio"], None, None, 100, sqlite=_sqlite()),
+        "buscar_tarefas (setor_id, cursor)": models._query_buscar_tarefas(
+            ["relatorio"], {"setor_id": 1}, (1.0, 1000), 100, sqlite=_sqlite()),
+        "estatisticas_tarefas (setor_id)": models._query_estatisticas_tarefas({"setor_id": 1}),
+        "listar_alteracoes_tarefas": (models.SELECT_ALTERACOES, (0, 100)),
+        "listar_alteracoes_tarefas (exclusões)": (models.SELECT_EXCLUSOES, (0, 100)),
+        "listar_historico_tarefa": models._query_historico_tarefa(1, None, 100),
+        "listar_historico_tarefa (cursor)": models._query_historico_tarefa(1, 1000, 100),
+    }
+
+
+def _apelidos(query: str) -> Dict[str, str]:
+    # Tabela de cada nome usado no plano: "FROM tarefas t" e "JOIN usuarios u" dão t e u
+    apelidos = {}
+    for tabela, apelido in re.findall(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", query, flags=re.I):
+        apelidos[tabela] = tabela
+        if apelido and apelido.upper() not in ("WHERE", "JOIN", "LEFT", "INNER", "ON", "ORDER", "GROUP", "LIMIT"):
+            apelidos[apelido] = tabela
+    return apelidos
+
+
+def verificar_indices() -> List[Dict[str, Any]]:
+    """
+    Roda EXPLAIN em cada consulta de consultas_indexadas() e retorna as que
+    leem inteira alguma tabela de TABELAS_SEM_VARREDURA (type ALL no MySQL,
+    SCAN sem índice no SQLite), mesmo que haja índice candidato. Rode contra
+    uma base com volume parecido com o de produção (benchmarks/semear.py):
+    em tabelas quase vazias o MySQL pode preferir ler tudo.
+    """
+    problemas = []
+    conn = _conectar()
+    try:
+        with conn.cursor(DictCursor) as cursor:
+            for nome, (query, parametros) in consultas_indexadas().items():
+                apelidos = _apelidos(query)
+                if _sqlite():
+                    # No SQLite o plano vem em texto: "SCAN t" sem índice é varredura completa
+                    cursor.execute("EXPLAIN QUERY PLAN " + query, parametros)
+                    for linha in cursor.fetchall():
+                        detalhe = linha["detail"].split()
+                        if detalhe[0] != "SCAN" or "USING" in detalhe:
+                            continue
+                        tabela = apelidos.get(detalhe[1], detalhe[1])
+                        if tabela in TABELAS_SEM_VARREDURA:
+                            problemas.append({"consulta": nome, "tabela": tabela, "plano": linha})
+                    continue
+                cursor.execute("EXPLAIN " + query, parametros)
+                for linha in cursor.fetchall():
+                    tabela = apelidos.get(linha.get("table"), linha.get("table"))
+                    if linha.get("type") == "ALL" and tabela in TABELAS_SEM_VARREDURA:
+                        problemas.append({"consulta": nome, "tabela": tabela, "plano": linha})
+    finally:
+        conn.close()
+    return problemas
@@ -1,319 +1,1111 @@
-import pymysql
-from pymysql.cursors import DictCursor
-from typing import Dict, Any, List, Optional
-from src.config import db_config
+from pymysql.cursors import DictCursor, SSDictCursor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from src.pool import obter_conexao, obter_conexao_leitura, obter_roteador, fixar_conexao_leitura, soltar_conexao_leitura
+from src.cache import em_cache, invalidar
+from src.metricas import medir_funcao
+from src.config import armazenamento_config, busca_config, painel_config
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import os
+import re
 import traceback
-from datetime import datetime
+from datetime import datetime, date
 
+# Colunas editáveis de uma tarefa
+CAMPOS_TAREFA = ["titulo", "descricao", "funcionario_id", "setor_id", "data_criacao", "prazo", "prioridade", "status"]
 
+QUERY_LISTAR_USUARIOS = "SELECT id, nome, email, perfil, ativo, criado_em, setor FROM usuarios"
+QUERY_LISTAR_SETORES = "SELECT id, nome, data_criacao FROM setores"
+
+# Tarefa com os nomes de funcionário e setor vindos das tabelas de referência
+SELECT_TAREFA = """
+    SELECT t.id, t.titulo, t.descricao, t.funcionario_id, u.nome AS funcionario,
+           t.setor_id, s.nome AS setor, t.data_criacao, t.prazo, t.prioridade, t.status
+    FROM tarefas t
+    LEFT JOIN usuarios u ON u.id = t.funcionario_id
+    LEFT JOIN setores s ON s.id = t.setor_id
+"""
+
+# Colunas retornadas por SELECT_TAREFA, na ordem (cabeçalho da exportação CSV)
+COLUNAS_TAREFA = ["id", "titulo", "descricao", "funcionario_id", "funcionario", "setor_id", "setor",
+                  "data_criacao", "prazo", "prioridade", "status"]
+
+# Alterações e exclusões de tarefas depois de uma versão (GET /tarefas?since=)
+SELECT_ALTERACOES = """
+    SELECT t.id, t.titulo, t.descricao, t.funcionario_id, u.nome AS funcionario,
+           t.setor_id, s.nome AS setor, t.data_criacao, t.prazo, t.prioridade, t.status,
+           t.versao, t.atualizado_em
+    FROM tarefas t
+    LEFT JOIN usuarios u ON u.id = t.funcionario_id
+    LEFT JOIN setores s ON s.id = t.setor_id
+    WHERE t.versao > %s
+    ORDER BY t.versao
+    LIMIT %s
+"""
+SELECT_EXCLUSOES = """
+    SELECT tarefa_id, versao
+    FROM tarefas_excluidas
+    WHERE versao > %s
+    ORDER BY versao
+    LIMIT %s
+"""
+
+# Busca textual (GET /tarefas/busca): tarefa com a relevância do termo buscado.
+# No MySQL o índice FULLTEXT (migração 0006); no SQLite a tabela FTS5 tarefas_busca,
+# com o título pesando o dobro da descrição (bm25 é menor para os melhores resultados)
+SELECT_BUSCA_MYSQL = """
+    SELECT t.id, t.titulo, t.descricao, t.funcionario_id, u.nome AS funcionario,
+           t.setor_id, s.nome AS setor, t.data_criacao, t.prazo, t.prioridade, t.status,
+           MATCH(t.titulo, t.descricao) AGAINST (%s IN BOOLEAN MODE) AS relevancia
+    FROM tarefas t
+    LEFT JOIN usuarios u ON u.id = t.funcionario_id
+    LEFT JOIN setores s ON s.id = t.setor_id
+    WHERE MATCH(t.titulo, t.descricao) AGAINST (%s IN BOOLEAN MODE)
+"""
+SELECT_BUSCA_SQLITE = """
+    SELECT t.id, t.titulo, t.descricao, t.funcionario_id, u.nome AS funcionario,
+           t.setor_id, s.nome AS setor, t.data_criacao, t.prazo, t.prioridade, t.status,
+           -bm25(tarefas_busca, 2.0, 1.0) AS relevancia
+    FROM tarefas_busca
+    JOIN tarefas t ON t.id = tarefas_busca.rowid
+    LEFT JOIN usuarios u ON u.id = t.funcionario_id
+    LEFT JOIN setores s ON s.id = t.setor_id
+    WHERE tarefas_busca MATCH %s
+"""
+
+# Histórico de uma tarefa (GET /tarefas/<id>/historico), com os nomes do funcionário e de quem alterou
+SELECT_HISTORICO = """
+    SELECT h.id, h.tarefa_id, h.acao, h.status, h.funcionario_id, f.nome AS funcionario,
+           h.usuario_id, r.nome AS usuario, h.alterado_em
+    FROM tarefas_historico h
+    LEFT JOIN usuarios f ON f.id = h.funcionario_id
+    LEFT JOIN usuarios r ON r.id = h.usuario_id
+    WHERE h.tarefa_id = %s
+"""
+COLUNAS_HISTORICO = ["tarefa_id", "acao", "status", "funcionario_id", "usuario_id", "alterado_em"]
+
+# Versões das tabelas nos ETags das listagens: a de tarefas é a sequência de
+# alterações; usuarios e setores têm uma linha cada em versoes_tabelas (migração 0008)
+QUERY_VERSOES_TABELAS = """
+    SELECT 'tarefas' AS tabela, valor AS versao FROM tarefas_sequencia
+    UNION ALL
+    SELECT tabela, versao FROM versoes_tabelas
+"""
+
+# Usuário do login (com o hash da senha) e o da autenticação por token (sem ele)
+SELECT_USUARIO_POR_EMAIL = "SELECT id, nome, email, senha_hash, perfil, ativo, criado_em, setor FROM usuarios WHERE email = %s"
+SELECT_USUARIO_POR_ID = "SELECT id, nome, email, perfil, ativo, setor, tokens_revogados_em FROM usuarios WHERE id = %s"
+
+# Token de renovação apresentado, travado até a troca por um novo
+SELECT_TOKEN_RENOVACAO = """
+    SELECT t.id, t.usuario_id, t.expira_em, t.revogado_em, u.email, u.ativo
+    FROM tokens_renovacao t
+    JOIN usuarios u ON u.id = t.usuario_id
+    WHERE t.token_hash = %s
+    FOR UPDATE
+"""
+
+# Linhas por instrução nas operações em lote
+TAMANHO_BLOCO_LOTE = 500
+
+
+def _avancar_versao_tabela(cursor, tabela: str) -> None:
+    # Na mesma transação da escrita: o ETag muda em todos os workers junto com os dados
+    cursor.execute("UPDATE versoes_tabelas SET versao = versao + 1 WHERE tabela = %s", (tabela,))
+
+
+@medir_funcao
+def ler_versoes_tabelas() -> Dict[str, int]:
+    """Versão atual de cada tabela com ETag ({"tarefas": 120, "usuarios": 7, ...})."""
+    try:
+        with obter_conexao_leitura() as conn, conn.cursor(DictCursor) as cursor:
+            cursor.execute(QUERY_VERSOES_TABELAS)
+            return {linha["tabela"]: int(linha["versao"]) for linha in cursor.fetchall()}
+    except Exception as e:
+        print(f"Erro ao ler versões das tabelas: {str(e)}")
+        raise
+
+
+@medir_funcao
 def cadastrar_usuarios(data: Dict[str, Any]) -> None:
     try:
-        # Estabelecendo a conexão com o banco de dados
-        conn = pymysql.connect(**db_config)  # Usando db_config para a conexão
-        cursor = conn.cursor()
+        # Pegando uma conexão do pool compartilhado
+        with obter_conexao() as conn, conn.cursor() as cursor:
+            # Query para inserir dados do usuário
+            query = """
+                INSERT INTO usuarios (nome, email, senha_hash, perfil, setor, ativo)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """
 
-        # Query para inserir dados do usuário
-        query = """
-            INSERT INTO usuarios (nome, email, senha_hash, perfil, setor, ativo)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """
+            # Valores a serem inseridos
+            valores_user = (
+                data['nome'],
+                data['email'],
+                data['senha_hash'],
+                data['perfil'],
+                data['setor'],
+                data['ativo']
+            )
+
+            # Executando a query de inserção
+            cursor.execute(query, valores_user)
+            _avancar_versao_tabela(cursor, "usuarios")
+
+            # Commitando a transação
+            conn.commit()
 
-        # Valores a serem inseridos
-        valores_user = (
-            data['nome'],
-            data['email'],
-            data['senha_hash'],
-            data['perfil'],
-            data['setor'],
-            data['ativo']
-        )
-
-        # Executando a query de inserção
-        cursor.execute(query, valores_user)
-
-        # Commitando a transação
-        conn.commit()
+        # A listagem de usuários em cache ficou desatualizada
+        invalidar("usuarios")
     except Exception as e:
         print(f"Erro ao cadastrar usuário: {str(e)}")  # Adiciona um print para verificar o erro no servidor
         raise
-    finally:
-        # Fechando o cursor e a conexão, independentemente de erro
-        cursor.close()
-        conn.close()
 
 
+# Revogação das sessões abertas, na mesma transação da troca de senha
+REVOGAR_TOKENS_RENOVACAO = (
+    "UPDATE tokens_renovacao SET revogado_em = NOW() WHERE usuario_id = %s AND revogado_em IS NULL"
+)
+REVOGAR_TOKENS_ACESSO = "UPDATE usuarios SET tokens_revogados_em = %s WHERE id = %s"
 
-def atualizar_senha(data: Dict[str, Any]) -> None:
-    try:
-        # Estabelecendo a conexão com o banco de dados
-        conn = pymysql.connect(**db_config)  # Usando db_config para a conexão
 
-        # Criando um cursor para execução das queries
-        cursor = conn.cursor()
+@medir_funcao
+def atualizar_senha(data: Dict[str, Any], tokens_revogados_em: Optional[float] = None) -> None:
+    """
+    Grava o novo hash da senha. Com `tokens_revogados_em` (epoch), revoga no
+    mesmo commit os tokens de renovação do usuário e os de acesso emitidos
+    antes desse instante.
+    """
+    try:
+        # Pegando uma conexão do pool compartilhado
+        with obter_conexao() as conn, conn.cursor() as cursor:
+            # Query para atualizar a senha do usuário
+            query = """
+                UPDATE usuarios
+                SET senha_hash = %s
+                WHERE id = %s
+            """
 
-        # Query para atualizar a senha do usuário
-        query = """
-            UPDATE usuarios
-            SET senha_hash = %s
-            WHERE id = %s
-        """
+            # Valores a serem atualizados
+            valores_user = (
+                data['senha_hash'],  # nova senha (já deve ser hasheada)
+                data['id']  # id do usuário a ser atualizado
+            )
 
-        # Valores a serem atualizados
-        valores_user = (
-            data['senha_hash'],  # nova senha (já deve ser hasheada)
-            data['id']  # id do usuário a ser atualizado
-        )
+            # Executando a query de atualização
+            cursor.execute(query, valores_user)
+            if tokens_revogados_em is not None:
+                cursor.execute(REVOGAR_TOKENS_RENOVACAO, (data['id'],))
+                cursor.execute(REVOGAR_TOKENS_ACESSO, (tokens_revogados_em, data['id']))
 
-        # Executando a query de atualização
-        cursor.execute(query, valores_user)
+            # Commitando a transação
+            conn.commit()
 
-        # Commitando a transação
-        conn.commit()
+        invalidar("usuarios")
     except Exception as e:
         # Tratando erros e imprimindo a traceback
         print(f"Erro ao atualizar senha: {str(e)}\n{traceback.format_exc()}")
         raise
-    finally:
-        # Fechando o cursor e a conexão, independentemente de erro
-        cursor.close()
-        conn.close()
 
 
-def listar_usuarios() -> List[Dict]:
+@medir_funcao
+def atualizar_hash_senha(usuario_id: int, novo_hash: str, hash_antigo: str) -> bool:
+    """
+    Troca o hash da mesma senha por um com o custo atual (rehash do login).
+    Só grava se o hash ainda for `hash_antigo`: uma troca de senha feita
+    enquanto o rehash rodava não é desfeita. Retorna se gravou.
+    """
     try:
-        # Estabelecendo a conexão com o banco de dados
-        conn = pymysql.connect(**db_config)  # Usando db_config para a conexão
+        with obter_conexao() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "UPDATE usuarios SET senha_hash = %s WHERE id = %s AND senha_hash = %s",
+                (novo_hash, usuario_id, hash_antigo)
+            )
+            gravou = cursor.rowcount > 0
+            conn.commit()
+        if gravou:
+            invalidar("usuarios")
+        return gravou
+    except Exception as e:
+        print(f"Erro ao atualizar hash de senha: {str(e)}\n{traceback.format_exc()}")
+        raise
 
-        # Criando um cursor para execução das queries
-        cursor = conn.cursor(DictCursor)
 
-        # Query para listar todos os usuários
-        query = "SELECT id, nome, email, perfil, ativo, criado_em, setor FROM usuarios"
+@medir_funcao
+@em_cache("usuarios")
+def listar_usuarios() -> List[Dict]:
+    try:
+        # Pegando uma conexão do pool compartilhado
+        with obter_conexao_leitura() as conn, conn.cursor(DictCursor) as cursor:
+            # Query para listar todos os usuários
+            query = QUERY_LISTAR_USUARIOS
 
-        # Executando a query
-        cursor.execute(query)
+            # Executando a query
+            cursor.execute(query)
 
-        # Buscando todos os resultados
-        usuarios = cursor.fetchall()
+            # Buscando todos os resultados
+            usuarios = cursor.fetchall()
 
-        return usuarios
+            return usuarios
     except Exception as e:
         print(f"Erro ao listar usuários: {str(e)}")
         raise
-    finally:
-        # Fechando o cursor e a conexão, independentemente de erro
-        cursor.close()
-        conn.close()
 
 
+@medir_funcao
 def listar_usuario_por_email(email: str) -> Optional[Dict]:
     try:
-        # Estabelecendo a conexão com o banco de dados
-        conn = pymysql.connect(**db_config)  # Usando db_config para a conexão
+        # Pegando uma conexão do pool compartilhado
+        with obter_conexao_leitura() as conn, conn.cursor(DictCursor) as cursor:
+            # Executando a query com o e-mail como parâmetro
+            cursor.execute(SELECT_USUARIO_POR_EMAIL, (email,))
 
-        # Criando um cursor para execução das queries
-        cursor = conn.cursor(DictCursor)
+            # Buscando o resultado
+            usuario = cursor.fetchone()
 
-        # Query para buscar um usuário por e-mail
-        query = "SELECT id, nome, email, senha_hash, perfil, ativo, criado_em, setor FROM usuarios WHERE email = %s"
+            return usuario
+    except Exception as e:
+        print(f"Erro ao listar usuário por e-mail: {str(e)}")
+        raise
 
-        # Executando a query com o e-mail como parâmetro
-        cursor.execute(query, (email,))
+@medir_funcao
+def listar_usuario_por_id(usuario_id: int) -> Optional[Dict]:
+    try:
+        # Pegando uma conexão do pool compartilhado
+        with obter_conexao_leitura() as conn, conn.cursor(DictCursor) as cursor:
+            # Dados usados pela autenticação (sem o hash da senha)
+            cursor.execute(SELECT_USUARIO_POR_ID, (usuario_id,))
+            return cursor.fetchone()
+    except Exception as e:
+        print(f"Erro ao listar usuário por id: {str(e)}")
+        raise
 
-        # Buscando o resultado
-        usuario = cursor.fetchone()
 
-        return usuario
+@medir_funcao
+def cadastrar_token_renovacao(usuario_id: int, token_hash: str, expira_em: datetime) -> None:
+    try:
+        with obter_conexao() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO tokens_renovacao (usuario_id, token_hash, expira_em) VALUES (%s, %s, %s)",
+                (usuario_id, token_hash, expira_em)
+            )
+            conn.commit()
     except Exception as e:
-        print(f"Erro ao listar usuário por e-mail: {str(e)}")
+        print(f"Erro ao cadastrar token de renovação: {str(e)}\n{traceback.format_exc()}")
         raise
-    finally:
-        # Fechando o cursor e a conexão, independentemente de erro
-        cursor.close()
-        conn.close()
+
+
+@medir_funcao
+def rotacionar_token_renovacao(token_hash: str, novo_hash: str, expira_em: datetime) -> Optional[Dict]:
+    """
+    Troca um token de renovação válido por um novo, em uma transação, e
+    retorna o usuário dono dele. Retorna None se o token não existe, expirou
+    ou já foi usado; no último caso todos os tokens do usuário são revogados,
+    pois o token pode ter vazado.
+    """
+    try:
+        with obter_conexao() as conn, conn.cursor(DictCursor) as cursor:
+            cursor.execute(SELECT_TOKEN_RENOVACAO, (token_hash,))
+            token = cursor.fetchone()
+            if not token:
+                return None
+            if token["revogado_em"] is not None:
+                cursor.execute(
+                    "UPDATE tokens_renovacao SET revogado_em = NOW() WHERE usuario_id = %s AND revogado_em IS NULL",
+                    (token["usuario_id"],)
+                )
+                conn.commit()
+                return None
+            if token["expira_em"] < datetime.now() or not token["ativo"]:
+                return None
+
+            cursor.execute(
+                "INSERT INTO tokens_renovacao (usuario_id, token_hash, expira_em) VALUES (%s, %s, %s)",
+                (token["usuario_id"], novo_hash, expira_em)
+            )
+            cursor.execute(
+                "UPDATE tokens_renovacao SET revogado_em = NOW(), substituido_por = %s WHERE id = %s",
+                (cursor.lastrowid, token["id"])
+            )
+            conn.commit()
+            return {"id": token["usuario_id"], "email": token["email"]}
+    except Exception as e:
+        print(f"Erro ao renovar token: {str(e)}\n{traceback.format_exc()}")
+        raise
+
 
 # Função para cadastrar um novo setor
+@medir_funcao
 def cadastrar_setor(data: Dict[str, Any]) -> None:
     try:
-        # Estabelecendo a conexão com o banco de dados
-        conn = pymysql.connect(**db_config)  # Usando db_config para a conexão
-        cursor = conn.cursor()
+        # Pegando uma conexão do pool compartilhado
+        with obter_conexao() as conn, conn.cursor() as cursor:
+            # Query para inserir dados do setor
+            query = """
+                INSERT INTO setores (nome, data_criacao)
+                VALUES (%s, NOW())  -- A data de criação será automaticamente preenchida com o timestamp atual
+            """
 
-        # Query para inserir dados do setor
-        query = """
-            INSERT INTO setores (nome, data_criacao)
-            VALUES (%s, NOW())  -- A data de criação será automaticamente preenchida com o timestamp atual
-        """
+            # Valores a serem inseridos
+            valores_setor = (data['nome'],)
 
-        # Valores a serem inseridos
-        valores_setor = (data['nome'],)
+            # Executando a query de inserção
+            cursor.execute(query, valores_setor)
+            _avancar_versao_tabela(cursor, "setores")
 
-        # Executando a query de inserção
-        cursor.execute(query, valores_setor)
+            # Commitando a transação
+            conn.commit()
 
-        # Commitando a transação
-        conn.commit()
+        # A listagem de setores em cache ficou desatualizada
+        invalidar("setores")
     except Exception as e:
         print(f"Erro ao cadastrar setor: {str(e)}\n{traceback.format_exc()}")
         raise
-    finally:
-        # Fechando o cursor e a conexão, independentemente de erro
-        cursor.close()
-        conn.close()
 
 
 # Função para listar todos os setores cadastrados
+@medir_funcao
+@em_cache("setores")
 def listar_setores() -> list:
     try:
-        # Estabelecendo a conexão com o banco de dados
-        conn = pymysql.connect(**db_config)  # Usando db_config para a conexão
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
+        # Pegando uma conexão do pool compartilhado
+        with obter_conexao_leitura() as conn, conn.cursor(DictCursor) as cursor:
+            # Query para listar todos os setores
+            query = QUERY_LISTAR_SETORES
 
-        # Query para listar todos os setores
-        query = "SELECT nome, data_criacao FROM setores"
+            # Executando a query
+            cursor.execute(query)
 
-        # Executando a query
-        cursor.execute(query)
+            # Buscando todos os resultados
+            setores = cursor.fetchall()
 
-        # Buscando todos os resultados
-        setores = cursor.fetchall()
-
-        return setores
+            return setores
     except Exception as e:
         print(f"Erro ao listar setores: {str(e)}")
         raise
-    finally:
-        # Fechando o cursor e a conexão, independentemente de erro
-        cursor.close()
-        conn.close()
 
 
+def _proxima_versao(cursor, quantidade: int = 1) -> int:
+    """
+    Reserva as próximas `quantidade` versões da sequência de alterações de
+    tarefas e retorna a primeira delas.
+    A linha fica travada até o commit, então as versões são confirmadas em ordem.
+    Toda escrita trava primeiro as linhas de tarefas que altera e só depois a
+    sequência: com a mesma ordem em todos os caminhos, uma alteração avulsa e
+    um lote sobre os mesmos ids não travam um ao outro (deadlock).
+    O valor volta no próprio OK do UPDATE (LAST_INSERT_ID), sem outro SELECT.
+    """
+    cursor.execute("UPDATE tarefas_sequencia SET valor = LAST_INSERT_ID(valor + %s)", (quantidade,))
+    return cursor.lastrowid - quantidade + 1
+
+
+def _buscar_referencia(listar, tabela: str, referencia_id: Any, nome: Optional[str]) -> Optional[Dict]:
+    if referencia_id is not None:
+        chave, valor = "id", int(referencia_id)
+        for item in listar():
+            if item["id"] == valor:
+                return item
+    else:
+        chave, valor = "nome", nome.strip()
+        for item in listar():
+            if (item["nome"] or "").strip() == valor:
+                return item
+    # A listagem em cache pode estar atrasada (cadastro feito por outro worker): confere no banco
+    with obter_conexao() as conn, conn.cursor(DictCursor) as cursor:
+        cursor.execute(f"SELECT id, nome FROM {tabela} WHERE {chave} = %s ORDER BY id LIMIT 1", (valor,))
+        return cursor.fetchone()
+
+
+def _completar_nomes(tarefa: Dict[str, Any]) -> None:
+    # Nomes das referências que não mudaram, das listagens em cache
+    for campo, listar, tabela in (("funcionario", listar_usuarios, "usuarios"), ("setor", listar_setores, "setores")):
+        if tarefa[campo] is None and tarefa[f"{campo}_id"] is not None:
+            item = _buscar_referencia(listar, tabela, tarefa[f"{campo}_id"], None)
+            tarefa[campo] = item["nome"] if item else None
+
+
+@medir_funcao
+def resolver_referencias_tarefa(data: Dict[str, Any]) -> Optional[str]:
+    """
+    Completa funcionario_id/setor_id a partir dos nomes (ou os nomes a partir
+    dos ids) usando as listagens de usuários e setores em cache.
+    Retorna a mensagem de erro se alguma referência não existe ou tem tipo inválido.
+    """
+    referencias = [
+        ("funcionario", "Funcionário", listar_usuarios, "usuarios"),
+        ("setor", "Setor", listar_setores, "setores"),
+    ]
+    for campo, rotulo, listar, tabela in referencias:
+        campo_id = f"{campo}_id"
+        referencia_id, nome = data.get(campo_id), data.get(campo)
+        if referencia_id is None and not nome:
+            continue
+        # Tipos vindos do JSON: o id como inteiro (ou texto só com dígitos), o nome como texto
+        if referencia_id is not None:
+            if isinstance(referencia_id, str) and referencia_id.strip().isdigit():
+                referencia_id = int(referencia_id)
+            elif not isinstance(referencia_id, int) or isinstance(referencia_id, bool):
+                return f"{campo_id} deve ser um número inteiro"
+        elif not isinstance(nome, str):
+            return f"{campo} deve ser um texto"
+        item = _buscar_referencia(listar, tabela, referencia_id, nome)
+        if not item:
+            return f"{rotulo} não encontrado: {data.get(campo_id) or data.get(campo)}"
+        data[campo_id] = item["id"]
+        data[campo] = item["nome"]
+    return None
+
+
+@medir_funcao
 def cadastrar_tarefa(data: Dict[str, Any]) -> int:
     """
     Insere uma tarefa e retorna o ID gerado.
-    Campos esperados: titulo, descricao, funcionario, setor, data_criacao, prazo, prioridade, status
+    Campos esperados: titulo, descricao, funcionario_id, setor_id, data_criacao, prazo, prioridade, status
+    (os ids já resolvidos por resolver_referencias_tarefa)
     """
-    conn = None
-    cursor = None
     try:
-        conn = pymysql.connect(**db_config)
-        cursor = conn.cursor()
-
-        # Se não vier no payload, define como agora
+        # Se não vier no payload, define como agora. O valor volta para o próprio
+        # payload para que a resposta seja montada sem reler a tarefa (ver tarefa_gravada)
         data_criacao = data.get('data_criacao') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        data['data_criacao'] = data_criacao
 
         query = """
-            INSERT INTO tarefas (titulo, descricao, funcionario, setor, data_criacao, prazo, prioridade, status)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            INSERT INTO tarefas (titulo, descricao, funcionario_id, setor_id, data_criacao, prazo, prioridade, status, versao)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
         """
-        valores = (
+        valores = [
             data.get('titulo'),
             data.get('descricao'),
-            data.get('funcionario'),
-            data.get('setor'),
+            data.get('funcionario_id'),
+            data.get('setor_id'),
             data_criacao,
             data.get('prazo'),
             data.get('prioridade'),
             data.get('status'),
-        )
-        cursor.execute(query, valores)
-        conn.commit()
-        return cursor.lastrowid
+        ]
+        with obter_conexao() as conn, conn.cursor() as cursor:
+            valores.append(_proxima_versao(cursor))
+            cursor.execute(query, tuple(valores))
+            conn.commit()
+            novo_id = cursor.lastrowid
+        invalidar("tarefas")
+        return novo_id
     except Exception as e:
         print(f"Erro ao cadastrar tarefa: {str(e)}\n{traceback.format_exc()}")
         raise
-    finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
 
 
-def listar_tarefas() -> List[Dict[str, Any]]:
-    conn = None
-    cursor = None
+@medir_funcao
+def tarefa_gravada(tarefa_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Monta a tarefa recém-inserida a partir dos valores gravados, com os mesmos
+    tipos que o SELECT devolveria (datetime, date, int), sem ir ao banco.
+    """
+    tarefa = {"id": tarefa_id}
+    for campo in CAMPOS_TAREFA:
+        tarefa[campo] = data.get(campo)
+    tarefa["funcionario"] = data.get("funcionario")
+    tarefa["setor"] = data.get("setor")
     try:
-        conn = pymysql.connect(**db_config)
-        cursor = conn.cursor(DictCursor)
-        query = """
-            SELECT id, titulo, descricao, funcionario, setor, data_criacao, prazo, prioridade, status
-            FROM tarefas
-            ORDER BY id DESC
-        """
-        cursor.execute(query)
-        return cursor.fetchall()
+        if isinstance(tarefa["data_criacao"], str):
+            tarefa["data_criacao"] = datetime.fromisoformat(tarefa["data_criacao"])
+        if isinstance(tarefa["prazo"], str):
+            tarefa["prazo"] = date.fromisoformat(tarefa["prazo"][:10])
+        if isinstance(tarefa["prioridade"], str):
+            tarefa["prioridade"] = int(tarefa["prioridade"])
+    except ValueError:
+        # Formato que o MySQL aceitou mas o Python não reconhece: devolve como veio
+        pass
+    return tarefa
+
+
+# Linha travada por atualizar_tarefa, sem os JOINs: os nomes vêm do payload ou das listagens
+SELECT_TAREFA_PARA_ATUALIZAR = f"SELECT id, {', '.join(CAMPOS_TAREFA)} FROM tarefas WHERE id = %s FOR UPDATE"
+
+
+def tarefa_atualizada(anterior: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Monta a tarefa depois do UPDATE juntando a linha travada antes dele com
+    os campos alterados. Os nomes de funcionário e setor só vêm quando a
+    referência mudou (resolvidos em `data`); os demais ficam None para
+    _completar_nomes.
+    """
+    mesclado = dict(anterior)
+    for campo in CAMPOS_TAREFA:
+        if data.get(campo) is not None:
+            mesclado[campo] = data[campo]
+    for campo in ("funcionario", "setor"):
+        mesclado[campo] = data.get(campo) if data.get(f"{campo}_id") is not None else None
+    return tarefa_gravada(anterior["id"], mesclado)
+
+
+def _condicoes_filtro_tarefa(filtros: Optional[Dict[str, Any]]):
+    # Monta as condições do WHERE (e seus valores) a partir dos filtros de tarefa
+    filtros = filtros or {}
+    condicoes = []
+    valores = []
+    for campo in ["funcionario_id", "setor_id", "status", "prioridade"]:
+        if filtros.get(campo) is not None:
+            condicoes.append(f"t.{campo} = %s")
+            valores.append(filtros[campo])
+    # Filtro pelo nome continua aceito e usa o mesmo índice pelo id
+    if filtros.get("funcionario") is not None:
+        condicoes.append("t.funcionario_id IN (SELECT id FROM usuarios WHERE nome = %s)")
+        valores.append(filtros["funcionario"])
+    if filtros.get("setor") is not None:
+        condicoes.append("t.setor_id IN (SELECT id FROM setores WHERE nome = %s)")
+        valores.append(filtros["setor"])
+    if filtros.get("prazo_de") is not None:
+        condicoes.append("t.prazo >= %s")
+        valores.append(filtros["prazo_de"])
+    if filtros.get("prazo_ate") is not None:
+        condicoes.append("t.prazo <= %s")
+        valores.append(filtros["prazo_ate"])
+    return condicoes, valores
+
+
+@medir_funcao
+def listar_tarefas(filtros: Optional[Dict[str, Any]] = None, apos_id: Optional[int] = None,
+                   limite: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Lista tarefas em ordem decrescente de id.
+    `filtros` aceita funcionario_id, setor_id (ou funcionario, setor pelo nome),
+    status, prioridade, prazo_de e prazo_ate.
+    `apos_id` é o cursor (keyset): retorna só tarefas com id menor que ele.
+    """
+    try:
+        query, valores = _query_listar_tarefas(filtros, apos_id, limite)
+        with obter_conexao_leitura() as conn, conn.cursor(DictCursor) as cursor:
+            cursor.execute(query, valores)
+            return cursor.fetchall()
     except Exception as e:
         print(f"Erro ao listar tarefas: {str(e)}\n{traceback.format_exc()}")
         raise
-    finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
 
 
+def _query_listar_tarefas(filtros: Optional[Dict[str, Any]], apos_id: Optional[int], limite: Optional[int]):
+    condicoes, valores = _condicoes_filtro_tarefa(filtros)
+    if apos_id is not None:
+        condicoes.append("t.id < %s")
+        valores.append(apos_id)
+
+    query = SELECT_TAREFA
+    if condicoes:
+        query += f" WHERE {' AND '.join(condicoes)}"
+    query += " ORDER BY t.id DESC"
+    if limite is not None:
+        query += " LIMIT %s"
+        valores.append(limite)
+    return query, tuple(valores)
+
+
+def termos_busca(texto: str) -> List[str]:
+    """
+    Palavras do texto buscado, sem os operadores de busca e sem repetição.
+    Termos menores que busca_config['tamanho_minimo_termo'] ficam de fora:
+    o índice FULLTEXT não os guarda e nenhum resultado os conteria.
+    """
+    termos = []
+    for termo in re.findall(r"\w+", (texto or "").lower()):
+        if len(termo) >= busca_config['tamanho_minimo_termo'] and termo not in termos:
+            termos.append(termo)
+    return termos[:busca_config['max_termos']]
+
+
+def _query_buscar_tarefas(termos: List[str], filtros: Optional[Dict[str, Any]], apos: Optional[tuple],
+                          limite: Optional[int], sqlite: bool = False):
+    # Todos os termos são obrigatórios e valem como prefixo ("relat" acha "relatório")
+    if sqlite:
+        expressao = " ".join(f'"{termo}"*' for termo in termos)
+        query, valores = SELECT_BUSCA_SQLITE, [expressao]
+    else:
+        expressao = " ".join(f"+{termo}*" for termo in termos)
+        query, valores = SELECT_BUSCA_MYSQL, [expressao, expressao]
+    condicoes, valores_filtro = _condicoes_filtro_tarefa(filtros)
+    for condicao in condicoes:
+        query += f" AND {condicao}"
+    valores += valores_filtro
+
+    # Ordem por (relevancia, id) decrescentes; o cursor é o par da última linha
+    query = f"SELECT * FROM ({query}) b"
+    if apos is not None:
+        query += " WHERE b.relevancia < %s OR (b.relevancia = %s AND b.id < %s)"
+        valores += [apos[0], apos[0], apos[1]]
+    query += " ORDER BY b.relevancia DESC, b.id DESC"
+    if limite is not None:
+        query += " LIMIT %s"
+        valores.append(limite)
+    return query, tuple(valores)
+
+
+@medir_funcao
+def buscar_tarefas(termos: List[str], filtros: Optional[Dict[str, Any]] = None, apos: Optional[tuple] = None,
+                   limite: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Tarefas com todos os `termos` no título ou na descrição, da mais para a
+    menos relevante. Só as tarefas que casam com os termos são lidas (pelo
+    índice textual), então o custo acompanha o número de resultados e não o
+    tamanho da tabela. Aceita os mesmos `filtros` de listar_tarefas; `apos`
+    é o cursor (relevancia, id) da última tarefa da página anterior.
+    """
+    try:
+        query, valores = _query_buscar_tarefas(termos, filtros, apos, limite,
+                                               sqlite=armazenamento_config['backend'] == 'sqlite')
+        with obter_conexao_leitura() as conn, conn.cursor(DictCursor) as cursor:
+            cursor.execute(query, valores)
+            return cursor.fetchall()
+    except Exception as e:
+        print(f"Erro ao buscar tarefas: {str(e)}\n{traceback.format_exc()}")
+        raise
+
+
+@medir_funcao
+def exportar_tarefas(filtros: Optional[Dict[str, Any]] = None, tamanho_bloco: int = 500) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Gera as tarefas filtradas em blocos de até `tamanho_bloco` linhas, lidas
+    com cursor sem buffer (SSDictCursor): o resultado vem do servidor aos
+    poucos, então a memória não cresce com o tamanho da tabela. A conexão
+    fica emprestada do pool até o gerador terminar.
+    """
+    query, valores = _query_listar_tarefas(filtros, None, None)
+    try:
+        with obter_conexao_leitura() as conn:
+            cursor = conn.cursor(SSDictCursor)
+            try:
+                cursor.execute(query, valores)
+                while True:
+                    bloco = cursor.fetchmany(tamanho_bloco)
+                    if not bloco:
+                        break
+                    yield bloco
+            except GeneratorExit:
+                # Cliente desconectou no meio: esvaziar o resultado só para
+                # reaproveitar a conexão leria o resto da tabela; ela é fechada
+                # e o pool a descarta na devolução
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                raise
+            cursor.close()
+    except Exception as e:
+        print(f"Erro ao exportar tarefas: {str(e)}\n{traceback.format_exc()}")
+        raise
+
+
+# Threads de carregar_painel: usuários e setores são lidos enquanto a
+# requisição lê as tarefas
+_executor_painel = ThreadPoolExecutor(max_workers=painel_config['workers'], thread_name_prefix="painel")
+
+
+def _recriar_executor_painel() -> None:
+    # As threads do executor não existem no processo filho: cada worker cria o seu
+    global _executor_painel
+    _executor_painel = ThreadPoolExecutor(max_workers=painel_config['workers'], thread_name_prefix="painel")
+
+
+os.register_at_fork(after_in_child=_recriar_executor_painel)
+
+
+def _consultar_leitura(query: str, valores: tuple = None) -> List[Dict[str, Any]]:
+    with obter_conexao_leitura() as conn, conn.cursor(DictCursor) as cursor:
+        cursor.execute(query, valores)
+        return cursor.fetchall()
+
+
+def _em_outra_conexao(bloco):
+    with soltar_conexao_leitura():
+        return bloco()
+
+
+@medir_funcao
+def carregar_painel(filtros: Optional[Dict[str, Any]] = None, apos_id: Optional[int] = None,
+                    limite: Optional[int] = None, incluir: tuple = ("usuarios", "setores", "tarefas")) -> Dict[str, Any]:
+    """
+    Dados iniciais dos dashboards (usuários, setores e uma página de tarefas).
+    Usuários e setores saem do mesmo cache de listar_usuarios/listar_setores;
+    em caso de falha são lidos em threads de _executor_painel, cada um com a
+    sua conexão do pool, enquanto a requisição lê as tarefas na dela.
+
+    Com réplicas de leitura tudo é lido em sequência na mesma conexão: outra
+    réplica pode estar atrás das versões do ETag lidas nela (routes.com_etag).
+    """
+    try:
+        blocos = {}
+        if "usuarios" in incluir:
+            blocos["usuarios"] = lambda: listar_usuarios.ler_ou_calcular(
+                lambda: _consultar_leitura(QUERY_LISTAR_USUARIOS))
+        if "setores" in incluir:
+            blocos["setores"] = lambda: listar_setores.ler_ou_calcular(
+                lambda: _consultar_leitura(QUERY_LISTAR_SETORES))
+        tarefas = None
+        if "tarefas" in incluir:
+            tarefas = lambda: _consultar_leitura(*_query_listar_tarefas(filtros, apos_id, limite))
+
+        if obter_roteador() is not None or len(blocos) + (tarefas is not None) < 2:
+            with fixar_conexao_leitura():
+                painel = {nome: bloco() for nome, bloco in blocos.items()}
+                if tarefas is not None:
+                    painel["tarefas"] = tarefas()
+            return painel
+
+        # Cada thread leva uma cópia do contexto (cliente e versões do cache),
+        # mas não a conexão fixa da requisição
+        futuros = {nome: _executor_painel.submit(contextvars.copy_context().run, _em_outra_conexao, bloco)
+                   for nome, bloco in blocos.items()}
+        painel = {}
+        if tarefas is not None:
+            painel["tarefas"] = tarefas()
+        for nome, futuro in futuros.items():
+            painel[nome] = futuro.result()
+        return painel
+    except Exception as e:
+        print(f"Erro ao carregar painel: {str(e)}\n{traceback.format_exc()}")
+        raise
+
+
+def _query_estatisticas_tarefas(filtros: Optional[Dict[str, Any]]):
+    condicoes, valores = _condicoes_filtro_tarefa(filtros)
+    query = """
+        SELECT t.status, t.setor_id, s.nome AS setor, t.funcionario_id, u.nome AS funcionario, t.prioridade,
+               COUNT(*) AS total,
+               SUM(t.prazo < CURDATE() AND t.status NOT IN ('concluída', 'cancelada')) AS atrasadas
+        FROM tarefas t
+        LEFT JOIN usuarios u ON u.id = t.funcionario_id
+        LEFT JOIN setores s ON s.id = t.setor_id
+    """
+    if condicoes:
+        query += f" WHERE {' AND '.join(condicoes)}"
+    query += " GROUP BY t.status, t.setor_id, s.nome, t.funcionario_id, u.nome, t.prioridade"
+    return query, tuple(valores)
+
+
+@medir_funcao
+def estatisticas_tarefas(filtros: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Conta as tarefas agrupadas por status, setor, funcionario e prioridade,
+    com o número de atrasadas (prazo vencido e não concluída/cancelada) em cada grupo.
+    Tudo sai de um único GROUP BY; o resumo por dimensão é feito pelo controller.
+    """
+    try:
+        query, valores = _query_estatisticas_tarefas(filtros)
+        with obter_conexao_leitura() as conn, conn.cursor(DictCursor) as cursor:
+            cursor.execute(query, valores)
+            return cursor.fetchall()
+    except Exception as e:
+        print(f"Erro ao calcular estatísticas de tarefas: {str(e)}\n{traceback.format_exc()}")
+        raise
+
+
+@medir_funcao
 def listar_tarefa_por_id(tarefa_id: int) -> Optional[Dict[str, Any]]:
-    conn = None
-    cursor = None
     try:
-        conn = pymysql.connect(**db_config)
-        cursor = conn.cursor(DictCursor)
-        query = """
-            SELECT id, titulo, descricao, funcionario, setor, data_criacao, prazo, prioridade, status
-            FROM tarefas
-            WHERE id = %s
-        """
-        cursor.execute(query, (tarefa_id,))
-        return cursor.fetchone()
+        with obter_conexao_leitura() as conn, conn.cursor(DictCursor) as cursor:
+            query = SELECT_TAREFA + " WHERE t.id = %s"
+            cursor.execute(query, (tarefa_id,))
+            return cursor.fetchone()
     except Exception as e:
         print(f"Erro ao buscar tarefa: {str(e)}\n{traceback.format_exc()}")
         raise
-    finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
 
 
-def atualizar_tarefa(tarefa_id: int, data: Dict[str, Any]) -> None:
+@medir_funcao
+def atualizar_tarefa(tarefa_id: int, data: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
     """
-    Atualiza apenas os campos enviados em `data`.
+    Atualiza apenas os campos enviados em `data` e retorna (tarefa atualizada,
+    linha anterior), ou None se ela não existe. A linha é lida e travada
+    (FOR UPDATE) antes do UPDATE e a resposta sai dela com os campos
+    alterados, sem reler a tarefa; a linha anterior permite ao controller
+    saber o que de fato mudou.
     """
-    conn = None
-    cursor = None
     try:
-        if not data:
-            return
         campos = []
         valores = []
-        for campo in ["titulo", "descricao", "funcionario", "setor", "data_criacao", "prazo", "prioridade", "status"]:
-            if campo in data and data[campo] is not None:
+        for campo in CAMPOS_TAREFA:
+            if campo in (data or {}) and data[campo] is not None:
                 campos.append(f"{campo} = %s")
                 valores.append(data[campo])
 
         if not campos:
-            return
+            # Nada para alterar: só devolve a tarefa como está
+            tarefa = listar_tarefa_por_id(tarefa_id)
+            return (tarefa, tarefa) if tarefa else None
 
-        valores.append(tarefa_id)
+        campos.append("versao = %s")
 
-        conn = pymysql.connect(**db_config)
-        cursor = conn.cursor()
-        query = f"UPDATE tarefas SET {', '.join(campos)} WHERE id = %s"
-        cursor.execute(query, tuple(valores))
-        conn.commit()
+        with obter_conexao() as conn, conn.cursor(DictCursor) as cursor:
+            cursor.execute(SELECT_TAREFA_PARA_ATUALIZAR, (tarefa_id,))
+            anterior = cursor.fetchone()
+            if not anterior:
+                # Tarefa inexistente: nem chega a travar a sequência de versões
+                return None
+            valores.append(_proxima_versao(cursor))
+            valores.append(tarefa_id)
+            query = f"UPDATE tarefas SET {', '.join(campos)} WHERE id = %s"
+            cursor.execute(query, tuple(valores))
+            conn.commit()
+        invalidar("tarefas")
+        tarefa = tarefa_atualizada(anterior, data)
+        _completar_nomes(tarefa)
+        return tarefa, anterior
     except Exception as e:
         print(f"Erro ao atualizar tarefa: {str(e)}\n{traceback.format_exc()}")
         raise
-    finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
 
 
-def deletar_tarefa(tarefa_id: int) -> None:
-    conn = None
-    cursor = None
+@medir_funcao
+def deletar_tarefa(tarefa_id: int) -> bool:
+    """Exclui a tarefa. Retorna False se ela não existia."""
     try:
-        conn = pymysql.connect(**db_config)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM tarefas WHERE id = %s", (tarefa_id,))
-        conn.commit()
+        with obter_conexao() as conn, conn.cursor() as cursor:
+            # O DELETE trava a linha; a versão é reservada depois (ver _proxima_versao)
+            cursor.execute("DELETE FROM tarefas WHERE id = %s", (tarefa_id,))
+            if not cursor.rowcount:
+                return False
+            # Tombstone para os clientes que sincronizam por versão
+            cursor.execute(
+                "INSERT INTO tarefas_excluidas (tarefa_id, versao) VALUES (%s, %s)",
+                (tarefa_id, _proxima_versao(cursor))
+            )
+            conn.commit()
+        invalidar("tarefas")
+        return True
     except Exception as e:
         print(f"Erro ao deletar tarefa: {str(e)}\n{traceback.format_exc()}")
         raise
-    finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
\ No newline at end of file
+
+
+def _blocos(itens: List[Any]):
+    for inicio in range(0, len(itens), TAMANHO_BLOCO_LOTE):
+        yield itens[inicio:inicio + TAMANHO_BLOCO_LOTE]
+
+
+def _travar_tarefas(cursor, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    # Trava as linhas do lote até o commit e informa quais ids existem, com o
+    # status e o responsável de antes da alteração (para o histórico)
+    marcadores = ", ".join(["%s"] * len(ids))
+    cursor.execute(
+        f"SELECT id, status, funcionario_id FROM tarefas WHERE id IN ({marcadores}) FOR UPDATE", tuple(ids)
+    )
+    return {linha[0]: {"status": linha[1], "funcionario_id": linha[2]} for linha in cursor.fetchall()}
+
+
+@medir_funcao
+def cadastrar_tarefas_lote(itens: List[Dict[str, Any]]) -> List[int]:
+    """
+    Insere várias tarefas em uma única transação, com INSERTs de várias linhas.
+    Retorna os ids gerados na mesma ordem de `itens`.
+    """
+    try:
+        if not itens:
+            return []
+        agora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        ids = []
+        with obter_conexao() as conn, conn.cursor() as cursor:
+            versao = _proxima_versao(cursor, len(itens))
+            for bloco in _blocos(itens):
+                valores = []
+                for data in bloco:
+                    linha = {campo: data.get(campo) for campo in CAMPOS_TAREFA}
+                    linha['data_criacao'] = linha['data_criacao'] or agora
+                    valores.extend(linha.values())
+                    valores.append(versao)
+                    versao += 1
+                linhas = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(bloco))
+                cursor.execute(
+                    f"INSERT INTO tarefas ({', '.join(CAMPOS_TAREFA)}, versao) VALUES {linhas}",
+                    tuple(valores)
+                )
+                # Um INSERT de várias linhas recebe ids consecutivos a partir de lastrowid
+                ids.extend(range(cursor.lastrowid, cursor.lastrowid + len(bloco)))
+            conn.commit()
+        invalidar("tarefas")
+        return ids
+    except Exception as e:
+        print(f"Erro ao cadastrar tarefas em lote: {str(e)}\n{traceback.format_exc()}")
+        raise
+
+
+@medir_funcao
+def atualizar_tarefas_lote(itens: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """
+    Aplica vários updates parciais (cada item com `id` e os campos a alterar)
+    em uma única transação, com um UPDATE ... CASE por bloco.
+    Retorna os ids encontrados e atualizados, cada um com o status e o
+    responsável que tinha antes.
+    """
+    try:
+        if not itens:
+            return {}
+        # Itens repetidos para o mesmo id são combinados (o último valor vence)
+        combinados = {}
+        for item in itens:
+            combinados.setdefault(item["id"], {}).update(item)
+        itens = list(combinados.values())
+        atualizados = {}
+        with obter_conexao() as conn, conn.cursor() as cursor:
+            # Todas as linhas do lote são travadas, em ordem de id, antes de reservar
+            # as versões (ver _proxima_versao)
+            existentes = {}
+            for bloco in _blocos(sorted(combinados)):
+                existentes.update(_travar_tarefas(cursor, bloco))
+            itens = [item for item in itens if item["id"] in existentes]
+            versao = _proxima_versao(cursor, len(itens)) if itens else None
+            for bloco in _blocos(itens):
+                atribuicoes = []
+                valores = []
+                for campo in CAMPOS_TAREFA:
+                    com_campo = [item for item in bloco if item.get(campo) is not None]
+                    if not com_campo:
+                        continue
+                    casos = " ".join(["WHEN %s THEN %s"] * len(com_campo))
+                    atribuicoes.append(f"{campo} = CASE id {casos} ELSE {campo} END")
+                    for item in com_campo:
+                        valores.extend([item["id"], item[campo]])
+                casos = " ".join(["WHEN %s THEN %s"] * len(bloco))
+                atribuicoes.append(f"versao = CASE id {casos} END")
+                for item in bloco:
+                    valores.extend([item["id"], versao])
+                    versao += 1
+                ids = [item["id"] for item in bloco]
+                valores.extend(ids)
+                marcadores = ", ".join(["%s"] * len(ids))
+                cursor.execute(
+                    f"UPDATE tarefas SET {', '.join(atribuicoes)} WHERE id IN ({marcadores})",
+                    tuple(valores)
+                )
+                atualizados.update((tarefa_id, existentes[tarefa_id]) for tarefa_id in ids)
+            conn.commit()
+        if atualizados:
+            invalidar("tarefas")
+        return atualizados
+    except Exception as e:
+        print(f"Erro ao atualizar tarefas em lote: {str(e)}\n{traceback.format_exc()}")
+        raise
+
+
+@medir_funcao
+def deletar_tarefas_lote(ids: List[int]) -> set:
+    """
+    Exclui várias tarefas em uma única transação, gravando os tombstones
+    com um INSERT de várias linhas. Retorna o conjunto de ids excluídos.
+    """
+    try:
+        if not ids:
+            return set()
+        excluidos = set()
+        with obter_conexao() as conn, conn.cursor() as cursor:
+            # Todas as linhas do lote são travadas, em ordem de id, antes de reservar
+            # as versões (ver _proxima_versao)
+            encontrados = {}
+            ids = list(dict.fromkeys(ids))
+            for bloco in _blocos(sorted(ids)):
+                encontrados.update(_travar_tarefas(cursor, bloco))
+            ids = [tarefa_id for tarefa_id in ids if tarefa_id in encontrados]
+            versao = _proxima_versao(cursor, len(ids)) if ids else None
+            for existentes in _blocos(ids):
+                marcadores = ", ".join(["%s"] * len(existentes))
+                cursor.execute(f"DELETE FROM tarefas WHERE id IN ({marcadores})", tuple(existentes))
+                tombstones = []
+                for tarefa_id in existentes:
+                    tombstones.extend([tarefa_id, versao])
+                    versao += 1
+                linhas = ", ".join(["(%s, %s)"] * len(existentes))
+                cursor.execute(
+                    f"INSERT INTO tarefas_excluidas (tarefa_id, versao) VALUES {linhas}",
+                    tuple(tombstones)
+                )
+                excluidos.update(existentes)
+            conn.commit()
+        if excluidos:
+            invalidar("tarefas")
+        return excluidos
+    except Exception as e:
+        print(f"Erro ao excluir tarefas em lote: {str(e)}\n{traceback.format_exc()}")
+        raise
+
+
+@medir_funcao
+def cadastrar_historico(alteracoes: List[Dict[str, Any]]) -> None:
+    """Grava alterações do histórico de tarefas com INSERTs de várias linhas (usado por src/historico.py)."""
+    try:
+        if not alteracoes:
+            return
+        with obter_conexao() as conn, conn.cursor() as cursor:
+            for bloco in _blocos(alteracoes):
+                valores = [alteracao.get(coluna) for alteracao in bloco for coluna in COLUNAS_HISTORICO]
+                linhas = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(bloco))
+                cursor.execute(
+                    f"INSERT INTO tarefas_historico ({', '.join(COLUNAS_HISTORICO)}) VALUES {linhas}",
+                    tuple(valores)
+                )
+            conn.commit()
+    except Exception as e:
+        print(f"Erro ao gravar histórico de tarefas: {str(e)}\n{traceback.format_exc()}")
+        raise
+
+
+def _query_historico_tarefa(tarefa_id: int, apos_id: Optional[int], limite: Optional[int]):
+    query, valores = SELECT_HISTORICO, [tarefa_id]
+    if apos_id is not None:
+        query += " AND h.id < %s"
+        valores.append(apos_id)
+    query += " ORDER BY h.id DESC"
+    if limite is not None:
+        query += " LIMIT %s"
+        valores.append(limite)
+    return query, tuple(valores)
+
+
+@medir_funcao
+def listar_historico_tarefa(tarefa_id: int, apos_id: Optional[int] = None,
+                            limite: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Alterações de status e responsável da tarefa, da mais recente para a mais
+    antiga. `apos_id` é o cursor: só entradas com id menor que ele.
+    """
+    try:
+        query, valores = _query_historico_tarefa(tarefa_id, apos_id, limite)
+        with obter_conexao_leitura() as conn, conn.cursor(DictCursor) as cursor:
+            cursor.execute(query, valores)
+            return cursor.fetchall()
+    except Exception as e:
+        print(f"Erro ao listar histórico da tarefa: {str(e)}\n{traceback.format_exc()}")
+        raise
+
+
+@medir_funcao
+def listar_alteracoes_tarefas(desde: int, limite: int) -> Dict[str, Any]:
+    """
+    Alterações de tarefas com versão maior que `desde`, em ordem de versão.
+    Retorna as tarefas alteradas, os ids excluídos, a nova marca d'água
+    (`versao`) e se ainda há alterações além do limite (`mais`).
+    """
+    try:
+        with obter_conexao_leitura() as conn, conn.cursor(DictCursor) as cursor:
+            # As duas leituras rodam na mesma transação (mesmo snapshot do InnoDB)
+            cursor.execute(SELECT_ALTERACOES, (desde, limite + 1))
+            alteradas = cursor.fetchall()
+            cursor.execute(SELECT_EXCLUSOES, (desde, limite + 1))
+            excluidas = cursor.fetchall()
+        return juntar_alteracoes(alteradas, excluidas, desde, limite)
+    except Exception as e:
+        print(f"Erro ao listar alterações de tarefas: {str(e)}\n{traceback.format_exc()}")
+        raise
+
+
+def juntar_alteracoes(alteradas: List[Dict[str, Any]], excluidas: List[Dict[str, Any]],
+                      desde: int, limite: int) -> Dict[str, Any]:
+    # Junta as duas listas por versão e corta no limite
+    eventos = sorted(
+        [("alterada", t["versao"], t) for t in alteradas] +
+        [("excluida", e["versao"], e["tarefa_id"]) for e in excluidas],
+        key=lambda evento: evento[1]
+    )
+    mais = len(eventos) > limite
+    eventos = eventos[:limite]
+    return {
+        "alteradas": [valor for tipo, _, valor in eventos if tipo == "alterada"],
+        "excluidas": [valor for tipo, _, valor in eventos if tipo == "excluida"],
+        "versao": eventos[-1][1] if eventos else desde,
+        "mais": mais,
+    }
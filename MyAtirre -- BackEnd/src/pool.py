@@ -0,0 +1,507 @@
+import contextvars
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from collections import deque, OrderedDict
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Any, List, Optional
+
+import pymysql
+from pymysql.cursors import DictCursor
+
+from src.config import db_config, pool_config, metricas_config, armazenamento_config, replicas_config
+from src.metricas import ConexaoMedida, espera_conexao
+
+
+def _conectar_mysql(**config):
+    # Conexão medida: cada instrução entra nas métricas de /metrics
+    if metricas_config['ativo']:
+        return ConexaoMedida(**config)
+    return pymysql.connect(**config)
+
+
+class PoolEsgotado(Exception):
+    """Nenhuma conexão ficou livre dentro do tempo de espera configurado."""
+
+
+class _ConexaoPool:
+    """Conexão física do pool com os instantes de criação e último uso."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.criada_em = time.monotonic()
+        self.usada_em = self.criada_em
+
+
+class PoolConexoes:
+    """
+    Pool de conexões seguro para várias threads (pymysql por padrão, ou
+    outro backend com a mesma interface via `conectar`).
+    Mantém entre `min_conexoes` e `max_conexoes` conexões abertas, testa a
+    conexão na retirada e recicla as que passaram de `reciclar_apos` segundos.
+    """
+
+    def __init__(self, config: Dict[str, Any], min_conexoes: int = 1, max_conexoes: int = 10,
+                 timeout_espera: float = 5.0, reciclar_apos: float = 1800.0,
+                 testar_apos_ocioso: float = 30.0, conectar: Callable = None,
+                 erros_descarte: tuple = (pymysql.err.OperationalError,)):
+        if max_conexoes < 1 or min_conexoes < 0 or min_conexoes > max_conexoes:
+            raise ValueError("Limites do pool inválidos")
+        self.config = dict(config)
+        self.min_conexoes = min_conexoes
+        self.max_conexoes = max_conexoes
+        self.timeout_espera = timeout_espera
+        self.reciclar_apos = reciclar_apos
+        self.testar_apos_ocioso = testar_apos_ocioso
+        # Fábrica das conexões (pymysql ou outro backend com a mesma interface)
+        # e erros que indicam conexão quebrada
+        self.conectar = conectar or _conectar_mysql
+        self.erros_descarte = erros_descarte
+
+        self._cond = threading.Condition(threading.Lock())
+        self._ociosas = deque()
+        self._em_uso = 0
+        self._total = 0
+
+        # Contadores para dimensionar o pool
+        self._retiradas = 0
+        self._esperas = 0
+        self._tempo_espera_total = 0.0
+        self._tempo_espera_max = 0.0
+        self._timeouts = 0
+        self._criadas = 0
+        self._descartadas = 0
+
+        for _ in range(min_conexoes):
+            self._ociosas.append(self._criar())
+            self._total += 1
+
+    def _criar(self) -> _ConexaoPool:
+        conn = self.conectar(**self.config)
+        self._criadas += 1
+        return _ConexaoPool(conn)
+
+    def _descartar(self, item: _ConexaoPool) -> None:
+        self._descartadas += 1
+        try:
+            item.conn.close()
+        except Exception:
+            pass
+
+    def _valida(self, item: _ConexaoPool) -> bool:
+        agora = time.monotonic()
+        if self.reciclar_apos and agora - item.criada_em > self.reciclar_apos:
+            return False
+        if agora - item.usada_em > self.testar_apos_ocioso:
+            try:
+                item.conn.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    def retirar(self) -> _ConexaoPool:
+        inicio = time.monotonic()
+        limite = inicio + self.timeout_espera
+        with self._cond:
+            esperou = False
+            while True:
+                if self._ociosas:
+                    item = self._ociosas.pop()
+                    self._em_uso += 1
+                    break
+                if self._total < self.max_conexoes:
+                    item = None
+                    self._total += 1
+                    self._em_uso += 1
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._timeouts += 1
+                    raise PoolEsgotado(
+                        f"Nenhuma conexão livre após {self.timeout_espera}s "
+                        f"({self._em_uso}/{self.max_conexoes} em uso)"
+                    )
+                esperou = True
+                self._cond.wait(restante)
+
+            espera = time.monotonic() - inicio
+            self._retiradas += 1
+            if esperou:
+                self._esperas += 1
+            self._tempo_espera_total += espera
+            self._tempo_espera_max = max(self._tempo_espera_max, espera)
+
+        # Abertura e ping ficam fora do lock para não bloquear as outras threads
+        try:
+            if item is not None and not self._valida(item):
+                with self._cond:
+                    self._descartar(item)
+                item = None
+            if item is None:
+                novo = self.conectar(**self.config)
+                item = _ConexaoPool(novo)
+                with self._cond:
+                    self._criadas += 1
+        except Exception:
+            with self._cond:
+                self._em_uso -= 1
+                self._total -= 1
+                self._cond.notify()
+            raise
+        espera_conexao.observar(time.monotonic() - inicio)
+        return item
+
+    def devolver(self, item: _ConexaoPool, descartar: bool = False) -> None:
+        with self._cond:
+            self._em_uso -= 1
+            if descartar or not item.conn.open:
+                self._total -= 1
+                self._descartar(item)
+            else:
+                item.usada_em = time.monotonic()
+                self._ociosas.append(item)
+            self._cond.notify()
+
+    @contextmanager
+    def conexao(self):
+        """
+        Empresta uma conexão do pool. Transações não confirmadas são desfeitas
+        na devolução; conexões que falharam são descartadas.
+        """
+        item = self.retirar()
+        descartar = False
+        try:
+            yield item.conn
+        except self.erros_descarte:
+            descartar = True
+            raise
+        finally:
+            if not descartar:
+                try:
+                    item.conn.rollback()
+                except Exception:
+                    descartar = True
+            self.devolver(item, descartar)
+
+    def fechar(self) -> None:
+        with self._cond:
+            while self._ociosas:
+                self._total -= 1
+                self._descartar(self._ociosas.pop())
+            self._cond.notify_all()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "min_conexoes": self.min_conexoes,
+                "max_conexoes": self.max_conexoes,
+                "total": self._total,
+                "em_uso": self._em_uso,
+                "ociosas": len(self._ociosas),
+                "retiradas": self._retiradas,
+                "esperas": self._esperas,
+                "timeouts": self._timeouts,
+                "tempo_espera_medio_ms": round(self._tempo_espera_total / self._retiradas * 1000, 3)
+                if self._retiradas else 0.0,
+                "tempo_espera_max_ms": round(self._tempo_espera_max * 1000, 3),
+                "criadas": self._criadas,
+                "descartadas": self._descartadas,
+            }
+
+
+class _Replica:
+    def __init__(self, nome: str, pool: PoolConexoes):
+        self.nome = nome
+        self.pool = pool
+        self.ejetada_ate = 0.0
+        self.verificada_em = 0.0
+        self.leituras = 0
+        self.falhas = 0
+        self.ejecoes = 0
+
+
+class RoteadorLeituras:
+    """
+    Distribui as leituras entre as réplicas em round-robin. Uma réplica que
+    falha ao conectar, cai no meio de uma consulta ou passa do atraso máximo
+    de replicação fica fora por `tempo_ejecao` segundos; sem réplica
+    disponível a leitura vai para o primário.
+    Quem acabou de escrever lê do primário por `janela_leitura_propria`
+    segundos, para ver a própria alteração mesmo com atraso na réplica.
+    """
+
+    def __init__(self, primario: PoolConexoes, replicas: List[_Replica], janela_leitura_propria: float = 5.0,
+                 tempo_ejecao: float = 30.0, max_atraso: Optional[float] = None,
+                 intervalo_verificacao: float = 5.0, max_clientes: int = 10000):
+        self.primario = primario
+        self.replicas = replicas
+        self.janela_leitura_propria = janela_leitura_propria
+        self.tempo_ejecao = tempo_ejecao
+        self.max_atraso = max_atraso
+        self.intervalo_verificacao = intervalo_verificacao
+        self.max_clientes = max_clientes
+        self._proxima = itertools.count()
+        self._escritas: "OrderedDict[Any, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.leituras_primario = 0
+        self.leituras_proprias = 0
+
+    def registrar_escrita(self, cliente: Any) -> None:
+        if cliente is None:
+            return
+        with self._lock:
+            self._escritas[cliente] = time.monotonic()
+            self._escritas.move_to_end(cliente)
+            while len(self._escritas) > self.max_clientes:
+                self._escritas.popitem(last=False)
+
+    def _escreveu_recentemente(self, cliente: Any) -> bool:
+        if cliente is None:
+            return False
+        with self._lock:
+            instante = self._escritas.get(cliente)
+        return instante is not None and time.monotonic() - instante < self.janela_leitura_propria
+
+    def _ejetar(self, replica: _Replica, motivo: str) -> None:
+        with self._lock:
+            replica.falhas += 1
+            if replica.ejetada_ate <= time.monotonic():
+                replica.ejecoes += 1
+            replica.ejetada_ate = time.monotonic() + self.tempo_ejecao
+        print(f"Réplica {replica.nome} fora por {self.tempo_ejecao}s: {motivo}")
+
+    def _atrasada(self, replica: _Replica, item: _ConexaoPool) -> bool:
+        # Opcional: exige o privilégio REPLICATION CLIENT na réplica
+        if self.max_atraso is None or time.monotonic() - replica.verificada_em < self.intervalo_verificacao:
+            return False
+        replica.verificada_em = time.monotonic()
+        with item.conn.cursor(DictCursor) as cursor:
+            cursor.execute("SHOW SLAVE STATUS")
+            status = cursor.fetchone()
+        atraso = status.get("Seconds_Behind_Master") if status else None
+        return atraso is None or atraso > self.max_atraso
+
+    def _retirar_replica(self):
+        """Retorna (replica, item) da próxima réplica disponível, ou (None, None)."""
+        agora = time.monotonic()
+        disponiveis = [replica for replica in self.replicas if replica.ejetada_ate <= agora]
+        if not disponiveis:
+            return None, None
+        inicio = next(self._proxima)
+        for deslocamento in range(len(disponiveis)):
+            replica = disponiveis[(inicio + deslocamento) % len(disponiveis)]
+            try:
+                item = replica.pool.retirar()
+            except PoolEsgotado:
+                # Réplica ocupada, não fora do ar: tenta a próxima sem ejetar
+                continue
+            except Exception as e:
+                self._ejetar(replica, str(e))
+                continue
+            try:
+                atrasada = self._atrasada(replica, item)
+            except Exception as e:
+                replica.pool.devolver(item, descartar=True)
+                self._ejetar(replica, str(e))
+                continue
+            if atrasada:
+                replica.pool.devolver(item)
+                self._ejetar(replica, "atraso de replicação acima do limite")
+                continue
+            return replica, item
+        return None, None
+
+    @contextmanager
+    def conexao_leitura(self, cliente: Any = None):
+        if self._escreveu_recentemente(cliente):
+            with self._lock:
+                self.leituras_proprias += 1
+            with self.primario.conexao() as conn:
+                yield conn
+            return
+
+        replica, item = self._retirar_replica()
+        if replica is None:
+            with self._lock:
+                self.leituras_primario += 1
+            with self.primario.conexao() as conn:
+                yield conn
+            return
+
+        with self._lock:
+            replica.leituras += 1
+        descartar = False
+        try:
+            yield item.conn
+        except replica.pool.erros_descarte as e:
+            descartar = True
+            self._ejetar(replica, str(e))
+            raise
+        finally:
+            if not descartar:
+                try:
+                    item.conn.rollback()
+                except Exception:
+                    descartar = True
+            replica.pool.devolver(item, descartar)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        agora = time.monotonic()
+        with self._lock:
+            return {
+                "leituras_primario": self.leituras_primario,
+                "leituras_proprias": self.leituras_proprias,
+                "replicas": [{
+                    "nome": replica.nome,
+                    "disponivel": replica.ejetada_ate <= agora,
+                    "leituras": replica.leituras,
+                    "falhas": replica.falhas,
+                    "ejecoes": replica.ejecoes,
+                    "pool": replica.pool.estatisticas(),
+                } for replica in self.replicas],
+            }
+
+
+_pool: Optional[PoolConexoes] = None
+_roteador: Optional[RoteadorLeituras] = None
+_pool_lock = threading.Lock()
+
+# Quem faz a requisição atual (id do usuário ou IP), para a leitura da própria escrita
+_cliente_atual = contextvars.ContextVar("cliente_leitura", default=None)
+# Conexão de leitura compartilhada pelas leituras de um bloco fixar_conexao_leitura
+_leitura_fixa = contextvars.ContextVar("leitura_fixa", default=None)
+
+
+def _descartar_apos_fork() -> None:
+    # No worker recém-forkado (servir.py carrega o app antes do fork), as
+    # conexões herdadas são do processo pai: só esquece as referências, sem
+    # fechar os sockets, e o worker abre o próprio pool
+    global _pool, _roteador, _pool_lock
+    _pool = None
+    _roteador = None
+    _pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_descartar_apos_fork)
+
+
+def obter_pool() -> PoolConexoes:
+    # O pool é criado na primeira utilização para não exigir o banco no import
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if armazenamento_config['backend'] == 'sqlite':
+                    from src.banco_sqlite import conectar_sqlite
+                    _pool = PoolConexoes({}, conectar=conectar_sqlite,
+                                         erros_descarte=(sqlite3.ProgrammingError,), **pool_config)
+                else:
+                    _pool = PoolConexoes(db_config, **pool_config)
+    return _pool
+
+
+def obter_roteador() -> Optional[RoteadorLeituras]:
+    # Só existe com réplicas configuradas (e nunca no SQLite)
+    global _roteador
+    if _roteador is None and replicas_config['replicas'] and armazenamento_config['backend'] == 'mysql':
+        primario = obter_pool()
+        with _pool_lock:
+            if _roteador is None:
+                replicas = []
+                for indice, ajustes in enumerate(replicas_config['replicas']):
+                    config = {**db_config, **ajustes}
+                    nome = f"{config['host']}:{config.get('port', 3306)}"
+                    # Réplicas abrem conexões sob demanda: uma réplica fora do ar não impede a subida
+                    pool = PoolConexoes(config, **{**pool_config, 'min_conexoes': 0})
+                    replicas.append(_Replica(nome, pool))
+                _roteador = RoteadorLeituras(
+                    primario, replicas,
+                    janela_leitura_propria=replicas_config['janela_leitura_propria'],
+                    tempo_ejecao=replicas_config['tempo_ejecao'],
+                    max_atraso=replicas_config['max_atraso'],
+                    intervalo_verificacao=replicas_config['intervalo_verificacao'],
+                )
+    return _roteador
+
+
+def nova_conexao():
+    """
+    Conexão avulsa, fora do pool, no backend configurado (migrações e
+    scripts de carga). Quem chama deve fechá-la.
+    """
+    if armazenamento_config['backend'] == 'sqlite':
+        from src.banco_sqlite import conectar_sqlite
+        return conectar_sqlite()
+    return pymysql.connect(**db_config)
+
+
+def definir_cliente(cliente: Any) -> None:
+    """Identifica quem faz a requisição atual (chamado pelo before_request das rotas)."""
+    _cliente_atual.set(cliente)
+
+
+@contextmanager
+def obter_conexao():
+    """
+    Atalho usado pelos models: `with obter_conexao() as conn: ...`.
+    Vai sempre ao primário e marca o cliente como recém-escrito, para que as
+    leituras seguintes dele não caiam numa réplica atrasada.
+    """
+    with obter_pool().conexao() as conn:
+        yield conn
+    roteador = obter_roteador()
+    if roteador is not None:
+        roteador.registrar_escrita(_cliente_atual.get())
+
+
+def obter_conexao_leitura():
+    """Conexão para funções que só fazem SELECT: réplica quando houver, senão o primário."""
+    fixa = _leitura_fixa.get()
+    if fixa is not None:
+        return nullcontext(fixa)
+    roteador = obter_roteador()
+    if roteador is None:
+        return obter_pool().conexao()
+    return roteador.conexao_leitura(_cliente_atual.get())
+
+
+@contextmanager
+def fixar_conexao_leitura():
+    """
+    Faz todas as leituras do bloco usarem a mesma conexão (a mesma réplica),
+    p.ex. a versão das tabelas do ETag e os dados da resposta.
+    """
+    if _leitura_fixa.get() is not None:
+        yield _leitura_fixa.get()
+        return
+    with obter_conexao_leitura() as conn:
+        marca = _leitura_fixa.set(conn)
+        try:
+            yield conn
+        finally:
+            _leitura_fixa.reset(marca)
+
+
+@contextmanager
+def soltar_conexao_leitura():
+    """
+    Desfaz fixar_conexao_leitura dentro do bloco: as leituras voltam a pegar
+    a própria conexão. Usado em outras threads, que não podem dividir a
+    conexão fixa com a requisição.
+    """
+    marca = _leitura_fixa.set(None)
+    try:
+        yield
+    finally:
+        _leitura_fixa.reset(marca)
+
+
+def estatisticas_pool() -> Dict[str, Any]:
+    if _pool is None:
+        return {"max_conexoes": pool_config.get("max_conexoes"), "total": 0, "em_uso": 0, "ociosas": 0}
+    estatisticas = _pool.estatisticas()
+    if _roteador is not None:
+        estatisticas["leitura"] = _roteador.estatisticas()
+    return estatisticas
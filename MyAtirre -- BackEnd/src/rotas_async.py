@@ -0,0 +1,86 @@
+"""
+Rotas atendidas no próprio event loop pelo modo ASGI (asgi.py). As demais
+são as de src/routes.py, executadas pelo app Flask em threads.
+
+Só o feed SSE fica aqui: cada conexão aberta é uma corrotina esperando o
+próximo evento, não uma thread presa enquanto o dashboard está aberto.
+"""
+import asyncio
+import json
+from typing import Optional
+
+from src.config import autenticacao_config, eventos_config
+from src.autenticacao import verificar_token, TokenInvalido
+from src.eventos import canal_tarefas, AssinanteAsync, LimiteAssinantes
+
+# CORS igual ao do app Flask (main.py): qualquer origem
+CABECALHOS_CORS = [(b"access-control-allow-origin", b"*")]
+
+
+async def _responder_json(enviar, status: int, corpo) -> None:
+    dados = json.dumps(corpo).encode("utf-8")
+    await enviar({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(dados)).encode())]
+        + CABECALHOS_CORS,
+    })
+    await enviar({"type": "http.response.body", "body": dados})
+
+
+async def autenticar(escopo) -> Optional[str]:
+    """Mesma regra de routes.autenticar; retorna a mensagem do 401, ou None."""
+    cabecalho = dict(escopo["headers"]).get(b"authorization", b"").decode("latin-1")
+    if cabecalho.startswith("Bearer "):
+        try:
+            # Em caso de falha no cache de tokens o usuário é lido do banco: fora do event loop
+            await asyncio.to_thread(verificar_token, cabecalho[7:].strip())
+        except TokenInvalido as e:
+            if autenticacao_config['obrigatoria']:
+                return str(e)
+    elif autenticacao_config['obrigatoria']:
+        return "Token de autenticação ausente"
+    return None
+
+
+async def _aguardar_desconexao(receber) -> None:
+    while (await receber())["type"] != "http.disconnect":
+        pass
+
+
+async def eventos_tarefas(escopo, receber, enviar) -> None:
+    """GET /tarefas/eventos: o mesmo feed de controller.eventos_tarefas_controller."""
+    erro = await autenticar(escopo)
+    if erro:
+        return await _responder_json(enviar, 401, {"error": erro})
+    try:
+        assinante = canal_tarefas.assinar(AssinanteAsync)
+    except LimiteAssinantes as e:
+        return await _responder_json(enviar, 503, {"error": str(e)})
+
+    fluxo = canal_tarefas.transmitir_async(assinante, eventos_config['heartbeat'])
+    # Cliente desconectou: encerra o assinante na hora, sem esperar o próximo heartbeat
+    desconexao = asyncio.ensure_future(_aguardar_desconexao(receber))
+    desconexao.add_done_callback(lambda _: canal_tarefas.cancelar(assinante))
+    try:
+        await enviar({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream; charset=utf-8"), (b"cache-control", b"no-cache"),
+                        (b"x-accel-buffering", b"no")] + CABECALHOS_CORS,
+        })
+        async for parte in fluxo:
+            await enviar({"type": "http.response.body", "body": parte.encode("utf-8"), "more_body": True})
+        if not desconexao.done():
+            await enviar({"type": "http.response.body", "body": b""})
+    finally:
+        desconexao.cancel()
+        await fluxo.aclose()
+        canal_tarefas.cancelar(assinante)
+
+
+# (método, caminho) -> handler ASGI
+ROTAS_ASYNC = {
+    # Feed de eventos (SSE) com as alterações de tarefas em tempo real
+    ("GET", "/tarefas/eventos"): eventos_tarefas,
+}
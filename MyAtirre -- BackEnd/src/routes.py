@@ -1,18 +1,92 @@
-from flask import Blueprint, request, jsonify
+import zlib
+from functools import wraps
+from flask import Blueprint, request, jsonify, make_response, current_app, g
+from src.cache import com_versoes
+from src.config import autenticacao_config
+from src.autenticacao import verificar_token, TokenInvalido
+from src.models import ler_versoes_tabelas
+from src.pool import definir_cliente, fixar_conexao_leitura
 from src.controller import (
     cadastrar_usuario,
     atualizar_senha_usuario,
     listar_todos_usuarios,
     listar_usuario_por_email_controller,
-    login_usuario, cadastrar_setor_controller, listar_setores_controller, cadastrar_tarefa_controller, listar_tarefas_controller,
+    login_usuario, renovar_token, cadastrar_setor_controller, listar_setores_controller, cadastrar_tarefa_controller, listar_tarefas_controller,
     listar_tarefa_por_id_controller, atualizar_tarefa_controller,
-    deletar_tarefa_controller
+    deletar_tarefa_controller, estatisticas_pool_controller, estatisticas_tarefas_controller,
+    estatisticas_cache_controller, eventos_tarefas_controller, cadastrar_tarefas_lote_controller,
+    atualizar_tarefas_lote_controller, deletar_tarefas_lote_controller, painel_controller,
+    exportar_tarefas_controller, buscar_tarefas_controller, listar_historico_tarefa_controller, metricas_controller
 )
 
 rotas = Blueprint('rotas', __name__)
 
+
+def rota_publica(view):
+    """Marca a rota como acessível sem token (login, cadastro, renovação)."""
+    view.publica = True
+    return view
+
+
+@rotas.before_request
+def autenticar():
+    """
+    Verifica o token Bearer e deixa o usuário em `g.usuario`.
+    Tokens já verificados saem do cache em memória, sem decodificar o JWT
+    nem consultar o banco de novo.
+    """
+    g.usuario = None
+    if request.method == 'OPTIONS':
+        return None
+    view = current_app.view_functions.get(request.endpoint)
+    publica = getattr(view, 'publica', False)
+
+    cabecalho = request.headers.get('Authorization', '')
+    if cabecalho.startswith('Bearer '):
+        try:
+            g.usuario = verificar_token(cabecalho[7:].strip())
+        except TokenInvalido as e:
+            if autenticacao_config['obrigatoria'] and not publica:
+                return jsonify({"error": str(e)}), 401
+    elif autenticacao_config['obrigatoria'] and not publica:
+        return jsonify({"error": "Token de autenticação ausente"}), 401
+    # Chave da leitura da própria escrita: o usuário do token, ou o IP sem token
+    definir_cliente(g.usuario["id"] if g.usuario else request.remote_addr)
+    return None
+
+
+def com_etag(*tabelas: str):
+    """
+    Responde 304 Not Modified quando o If-None-Match do cliente ainda bate com
+    a versão das tabelas, sem executar o SELECT nem serializar o JSON.
+    As versões vêm do banco, na mesma conexão (e réplica) que lê os dados,
+    então valem para todos os workers.
+    """
+    def decorador(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            with fixar_conexao_leitura():
+                # A versão é lida antes da consulta: uma escrita concorrente só
+                # pode deixar o ETag mais antigo, nunca mais novo que os dados
+                versoes = ler_versoes_tabelas()
+                filtros = zlib.crc32(request.query_string)
+                etag = "-".join(f"{tabela}-{versoes[tabela]}" for tabela in tabelas) + f"-{filtros:08x}"
+                # Comparação fraca: a compressão marca o ETag como W/"..."
+                if request.if_none_match.contains_weak(etag):
+                    resposta = make_response("", 304)
+                    resposta.set_etag(etag)
+                    return resposta
+                with com_versoes(versoes):
+                    resposta = make_response(view(*args, **kwargs))
+            if resposta.status_code == 200:
+                resposta.set_etag(etag)
+            return resposta
+        return wrapper
+    return decorador
+
 # Rota para cadastrar um novo usuário
 @rotas.route('/usuarios/cadastrar', methods=['POST'])
+@rota_publica
 def rota_cadastrar_usuario():
     """Cadastra um novo usuário."""
     data = request.get_json()
@@ -27,6 +101,7 @@ def rota_atualizar_senha_usuario():
 
 # Rota para listar todos os usuários
 @rotas.route('/usuarios', methods=['GET'])
+@com_etag('usuarios')
 def rota_listar_usuarios():
     """Lista todos os usuários cadastrados."""
     return listar_todos_usuarios()
@@ -39,17 +114,28 @@ def rota_listar_usuario_por_email(email):
 
 # Rota para login de usuário
 @rotas.route('/usuarios/login', methods=['POST'])
+@rota_publica
 def rota_login_usuario():
     """Autentica um usuário e retorna um token JWT."""
     data = request.get_json()
     return login_usuario(data)
 
+# Rota para trocar o token de renovação por um novo token de acesso
+@rotas.route('/usuarios/token/renovar', methods=['POST'])
+@rota_publica
+def rota_renovar_token():
+    """Renova o token JWT sem repetir o login."""
+    data = request.get_json()
+    return renovar_token(data)
+
 @rotas.route('/setores', methods=['POST'])
 def rota_cadastrar_setor():
     return cadastrar_setor_controller(request.get_json())
 
 # Rota para listar os setores
 @rotas.route('/setores', methods=['GET'])
+@rota_publica
+@com_etag('setores')
 def rota_listar_setores():
     return listar_setores_controller()
 
@@ -59,10 +145,46 @@ def rota_listar_setores():
 def rota_cadastrar_tarefa():
     return cadastrar_tarefa_controller(request.get_json())
 
-# Listar todas
+# Listar com filtros (funcionario, setor, status, prioridade, prazo_de, prazo_ate) e cursor
+# ou, com ?since=<versao>, só as alterações e exclusões desde essa versão
 @rotas.route('/tarefas', methods=['GET'])
+@com_etag('tarefas')
 def rota_listar_tarefas():
-    return listar_tarefas_controller()
+    return listar_tarefas_controller(request.args.to_dict())
+
+# Contagens agregadas para os dashboards (aceita os mesmos filtros da listagem)
+@rotas.route('/tarefas/stats', methods=['GET'])
+def rota_estatisticas_tarefas():
+    return estatisticas_tarefas_controller(request.args.to_dict())
+
+# Busca textual em título e descrição (?q=), por relevância e com os mesmos filtros da listagem
+@rotas.route('/tarefas/busca', methods=['GET'])
+@com_etag('tarefas')
+def rota_buscar_tarefas():
+    return buscar_tarefas_controller(request.args.to_dict())
+
+# Exportação completa em streaming (?formato=ndjson|csv|json, mesmos filtros da listagem)
+@rotas.route('/tarefas/exportar', methods=['GET'])
+def rota_exportar_tarefas():
+    return exportar_tarefas_controller(request.args.to_dict())
+
+# Operações em lote (lista de tarefas, de patches com id, ou de ids) em uma transação
+@rotas.route('/tarefas/lote', methods=['POST'])
+def rota_cadastrar_tarefas_lote():
+    return cadastrar_tarefas_lote_controller(request.get_json())
+
+@rotas.route('/tarefas/lote', methods=['PUT'])
+def rota_atualizar_tarefas_lote():
+    return atualizar_tarefas_lote_controller(request.get_json())
+
+@rotas.route('/tarefas/lote', methods=['DELETE'])
+def rota_deletar_tarefas_lote():
+    return deletar_tarefas_lote_controller(request.get_json())
+
+# Feed de eventos (SSE) com as alterações de tarefas em tempo real
+@rotas.route('/tarefas/eventos', methods=['GET'])
+def rota_eventos_tarefas():
+    return eventos_tarefas_controller()
 
 # Obter por ID
 @rotas.route('/tarefas/<int:tarefa_id>', methods=['GET'])
@@ -77,4 +199,34 @@ def rota_atualizar_tarefa(tarefa_id):
 # Excluir
 @rotas.route('/tarefas/<int:tarefa_id>', methods=['DELETE'])
 def rota_deletar_tarefa(tarefa_id):
-    return deletar_tarefa_controller(tarefa_id)
\ No newline at end of file
+    return deletar_tarefa_controller(tarefa_id)
+
+# Histórico de status e responsável da tarefa, paginado por cursor
+@rotas.route('/tarefas/<int:tarefa_id>/historico', methods=['GET'])
+def rota_historico_tarefa(tarefa_id):
+    return listar_historico_tarefa_controller(tarefa_id, request.args.to_dict())
+
+# Carga inicial dos dashboards: usuários, setores e tarefas em uma resposta
+@rotas.route('/painel', methods=['GET'])
+@com_etag('usuarios', 'setores', 'tarefas')
+def rota_painel():
+    return painel_controller(request.args.to_dict())
+
+# Estatísticas do pool de conexões com o banco
+@rotas.route('/pool/estatisticas', methods=['GET'])
+def rota_estatisticas_pool():
+    return estatisticas_pool_controller()
+
+
+# Métricas para o Prometheus: latência por rota, tempo das consultas, pool e bcrypt.
+# Pública, pois o Prometheus não envia token; em produção restrinja /metrics no proxy
+@rotas.route('/metrics', methods=['GET'])
+@rota_publica
+def rota_metricas():
+    return metricas_controller()
+
+
+# Estatísticas do cache de setores e usuários
+@rotas.route('/cache/estatisticas', methods=['GET'])
+def rota_estatisticas_cache():
+    return estatisticas_cache_controller()
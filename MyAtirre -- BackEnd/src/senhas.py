@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturoTimeout
+from typing import Callable
+
+import bcrypt
+
+from src.config import senha_config
+from src.metricas import bcrypt as metrica_bcrypt
+
+
+class SenhasSobrecarregado(Exception):
+    """A fila de hashing está cheia; o cliente deve tentar de novo em instantes."""
+
+
+# Executor dedicado: o bcrypt libera o GIL, então as threads rodam em paralelo
+# sem ocupar as threads que atendem as outras rotas
+_executor = ThreadPoolExecutor(max_workers=senha_config['workers'], thread_name_prefix="bcrypt")
+_vagas = threading.BoundedSemaphore(senha_config['workers'] + senha_config['max_fila'])
+
+
+def _recriar_apos_fork() -> None:
+    # As threads do executor não existem no processo filho: cada worker cria o seu
+    global _executor, _vagas
+    _executor = ThreadPoolExecutor(max_workers=senha_config['workers'], thread_name_prefix="bcrypt")
+    _vagas = threading.BoundedSemaphore(senha_config['workers'] + senha_config['max_fila'])
+
+
+os.register_at_fork(after_in_child=_recriar_apos_fork)
+
+
+def _submeter(funcao: Callable, *args) -> Future:
+    # Sem vaga na fila a requisição é recusada na hora, em vez de esperar
+    if not _vagas.acquire(blocking=False):
+        raise SenhasSobrecarregado("Muitas requisições de autenticação, tente novamente")
+    try:
+        futuro = _executor.submit(funcao, *args)
+    except Exception:
+        _vagas.release()
+        raise
+    futuro.add_done_callback(lambda _: _vagas.release())
+    return futuro
+
+
+def _executar(funcao: Callable, *args):
+    futuro = _submeter(funcao, *args)
+    try:
+        return futuro.result(timeout=senha_config['timeout'])
+    except FuturoTimeout:
+        raise SenhasSobrecarregado("Tempo esgotado aguardando a verificação de senha")
+
+
+def _hash(senha: str) -> str:
+    inicio = time.perf_counter()
+    salt = bcrypt.gensalt(rounds=senha_config['custo_bcrypt'])
+    senha_hash = bcrypt.hashpw(senha.encode('utf-8'), salt).decode('utf-8')
+    metrica_bcrypt.observar(time.perf_counter() - inicio, "hash")
+    return senha_hash
+
+
+def _verificar(senha: str, senha_hash: str) -> bool:
+    inicio = time.perf_counter()
+    valida = bcrypt.checkpw(senha.encode('utf-8'), senha_hash.encode('utf-8'))
+    metrica_bcrypt.observar(time.perf_counter() - inicio, "verificar")
+    return valida
+
+
+def gerar_hash(senha: str) -> str:
+    """Hash bcrypt com o custo configurado, calculado no executor dedicado."""
+    return _executar(_hash, senha)
+
+
+def verificar_senha(senha: str, senha_hash: str) -> bool:
+    return _executar(_verificar, senha, senha_hash)
+
+
+def precisa_rehash(senha_hash: str) -> bool:
+    """True se o hash foi gerado com um custo diferente do configurado."""
+    try:
+        custo = int(senha_hash.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return custo != senha_config['custo_bcrypt']
+
+
+def rehash_em_segundo_plano(senha: str, gravar: Callable[[str], None]) -> bool:
+    """
+    Recalcula o hash com o custo atual sem segurar a requisição. Se a fila
+    estiver cheia a troca fica para o próximo login.
+    """
+    if not _vagas.acquire(blocking=False):
+        return False
+
+    def tarefa():
+        try:
+            gravar(_hash(senha))
+        except Exception as e:
+            print(f"Erro ao atualizar hash de senha: {str(e)}")
+        finally:
+            _vagas.release()
+
+    try:
+        _executor.submit(tarefa)
+    except Exception:
+        _vagas.release()
+        return False
+    return True
@@ -0,0 +1,95 @@
+import decimal
+import uuid
+from datetime import date, datetime, timezone
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+from src.config import json_config
+
+# orjson é opcional: sem ele o provider se comporta como o padrão do Flask
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_DIAS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+_MESES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def _data_http(valor: date) -> str:
+    # Mesmo resultado de werkzeug.http.http_date (datas sem fuso são UTC),
+    # montado direto: o http_date passa pelo email.utils e domina o tempo de serialização
+    if not isinstance(valor, datetime):
+        valor = datetime(valor.year, valor.month, valor.day)
+    elif valor.tzinfo is not None:
+        valor = valor.astimezone(timezone.utc)
+    return (f"{_DIAS[valor.weekday()]}, {valor.day:02d} {_MESES[valor.month - 1]} {valor.year:04d} "
+            f"{valor.hour:02d}:{valor.minute:02d}:{valor.second:02d} GMT")
+
+
+def _padrao(obj):
+    # Tipos que o orjson não serializa sozinho (ou que repassa para manter o formato do Flask)
+    if isinstance(obj, date):
+        return _data_http(obj)
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Objeto do tipo {type(obj).__name__} não é serializável em JSON")
+
+
+class ProvedorJSONRapido(DefaultJSONProvider):
+    """
+    Provider JSON do app baseado no orjson. Datas saem no mesmo formato do
+    jsonify padrão (HTTP date) ou em ISO 8601 conforme json_config.
+    Só sobrescreve a API pública do provider (dumps, loads, response);
+    chamadas com argumentos que o orjson não reproduz (cls, ensure_ascii,
+    indent diferente de 2, ...) usam o encoder padrão.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.ativo = orjson is not None and json_config['rapido']
+        self.formato_datas = json_config['formato_datas']
+
+    def _opcoes(self, indentar: bool) -> int:
+        opcoes = orjson.OPT_NON_STR_KEYS
+        if self.formato_datas == 'http':
+            opcoes |= orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            opcoes |= orjson.OPT_SORT_KEYS
+        if indentar:
+            opcoes |= orjson.OPT_INDENT_2
+        return opcoes
+
+    def dumps(self, obj, **kwargs) -> str:
+        # indent=2 e separators compactos são os argumentos que o próprio Flask passa
+        if not self.ativo or set(kwargs) - {"indent", "separators"} or kwargs.get("indent") not in (None, 2):
+            return super().dumps(obj, **kwargs)
+        indentar = kwargs.get("indent") == 2
+        return orjson.dumps(obj, default=_padrao, option=self._opcoes(indentar)).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if not self.ativo or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if not self.ativo:
+            return super().response(*args, **kwargs)
+        # Mesmos argumentos de jsonify: um valor, vários (lista) ou chaves (dict)
+        if args and kwargs:
+            raise TypeError("jsonify() recebe argumentos posicionais ou nomeados, não os dois")
+        if not args and not kwargs:
+            obj = None
+        elif len(args) == 1:
+            obj = args[0]
+        else:
+            obj = list(args) or kwargs
+        # Mesmo critério do Flask: JSON indentado no modo debug
+        indentar = self.compact is False or (self.compact is None and current_app.debug)
+        # Gera os bytes direto, sem passar por str
+        corpo = orjson.dumps(obj, default=_padrao, option=self._opcoes(indentar) | orjson.OPT_APPEND_NEWLINE)
+        return current_app.response_class(corpo, mimetype=self.mimetype)
@@ -0,0 +1,39 @@
+"""
+Verificação de índices (python migrar.py indices) contra um banco SQLite
+temporário com todas as migrações aplicadas.
+
+Só o SQLite é exercitado aqui (migracoes/sqlite/ e o plano de EXPLAIN QUERY
+PLAN); o ramo do MySQL de verificar_indices, com os scripts de migracoes/,
+precisa de um servidor e é conferido com python migrar.py indices.
+"""
+import sqlite3
+
+import pytest
+
+from src.config import armazenamento_config
+from src.migracoes import migrar, verificar_indices
+
+
+@pytest.fixture
+def banco_sqlite(tmp_path, monkeypatch):
+    caminho = str(tmp_path / "indices.db")
+    monkeypatch.setitem(armazenamento_config, 'backend', 'sqlite')
+    monkeypatch.setitem(armazenamento_config, 'sqlite_caminho', caminho)
+    migrar()
+    return caminho
+
+
+def test_consultas_dos_models_usam_indice(banco_sqlite):
+    assert verificar_indices() == []
+
+
+def test_varredura_completa_de_tarefas_e_acusada(banco_sqlite):
+    conn = sqlite3.connect(banco_sqlite)
+    try:
+        conn.execute("DROP INDEX idx_tarefas_status")
+        conn.commit()
+    finally:
+        conn.close()
+
+    problemas = verificar_indices()
+    assert {(p["consulta"], p["tabela"]) for p in problemas} == {("listar_tarefas (status)", "tarefas")}